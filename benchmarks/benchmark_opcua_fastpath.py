@@ -0,0 +1,58 @@
+import time
+import timeit
+from asyncua.sync import Server, Client, ua
+from sbc_server.opcua_fastpath import AddressSpaceAccess, FastNode
+
+# microbenchmark: SyncNode vs. FastNode (direct address space access) read_value/write_value
+
+LOOPS = 10000
+PORT = 4849
+
+
+class NotificationCounter:
+    """subscription handler counting data change notifications"""
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def datachange_notification(self, node, val, data):
+        self.count += 1
+
+
+def main():
+    server = Server()
+    server.set_endpoint(f"opc.tcp://0.0.0.0:{PORT}")
+    server.start()
+    sync_node = server.nodes.objects.add_variable(
+        ua.NodeId("BenchmarkValue", 2), "BenchmarkValue", 0
+    )
+    fast_node = FastNode(sync_node, AddressSpaceAccess(server))
+    # subscribed client, to check data change notifications of fast path
+    client = Client(f"opc.tcp://127.0.0.1:{PORT}")
+    client.connect()
+    counter = NotificationCounter()
+    subscription = client.create_subscription(10, counter)
+    subscription.subscribe_data_change(client.get_node(ua.NodeId("BenchmarkValue", 2)))
+    time.sleep(0.5)
+
+    for name, node in [("SyncNode", sync_node), ("FastNode", fast_node)]:
+        t_read = timeit.timeit(node.read_value, number=LOOPS)
+        values = iter(range(LOOPS))
+        t_write = timeit.timeit(
+            lambda: node.write_value(next(values), ua.VariantType.Int64), number=LOOPS
+        )
+        print(
+            f"{name}: read_value {1e6 * t_read / LOOPS:.2f} us, write_value {1e6 * t_write / LOOPS:.2f} us"
+        )
+
+    # last fast path write has to reach subscribed client
+    fast_node.write_value(-1, ua.VariantType.Int64)
+    time.sleep(0.5)
+    print(f"data change notifications received: {counter.count}")
+    subscription.delete()
+    client.disconnect()
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
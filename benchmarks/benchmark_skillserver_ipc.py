@@ -0,0 +1,57 @@
+import os
+import time
+import timeit
+import tempfile
+from asyncua.sync import Client, ua
+from sbc_server.baseskill import BaseSkill
+from sbc_server.skillserver_ipc import SkillServer_IPC, SkillClient_IPC
+from sbc_server.skillserver_opcua import SkillServer_OPCUA
+
+# microbenchmark: command and state round trip latency of SkillServer_IPC vs. SkillServer_OPCUA (methods)
+
+LOOPS = 2000
+PORT = 4850
+SKILL_NAME = "BenchmarkSkill"
+
+
+def create_skill() -> BaseSkill:
+    skill = BaseSkill()
+    skill.data.stSkillDataDefault.strName = SKILL_NAME
+    return skill
+
+
+def main():
+    socket_path = os.path.join(tempfile.gettempdir(), "benchmark_skillserver_ipc.sock")
+    ipc_server = SkillServer_IPC([create_skill()], socket_path=socket_path)
+    ipc_server.start()
+    opcua_server = SkillServer_OPCUA([create_skill()], port=PORT, fast_path=True)
+    opcua_server.start()
+    time.sleep(3.0)
+
+    with SkillClient_IPC(socket_path) as client:
+        t_command = timeit.timeit(
+            lambda: client.command(SKILL_NAME, "Reset"), number=LOOPS
+        )
+        t_state = timeit.timeit(lambda: client.get_state(SKILL_NAME), number=LOOPS)
+        print(
+            f"SkillServer_IPC: command {1e6 * t_command / LOOPS:.2f} us, state {1e6 * t_state / LOOPS:.2f} us"
+        )
+
+    with Client(f"opc.tcp://127.0.0.1:{PORT}") as client:
+        skill_node = client.get_node(ua.NodeId(SKILL_NAME, 2))
+        state_node = client.get_node(ua.NodeId(SKILL_NAME + ".stSkillState", 2))
+        t_command = timeit.timeit(
+            lambda: skill_node.call_method(ua.NodeId(SKILL_NAME + ".Reset", 2)),
+            number=LOOPS,
+        )
+        t_state = timeit.timeit(state_node.read_value, number=LOOPS)
+        print(
+            f"SkillServer_OPCUA: command {1e6 * t_command / LOOPS:.2f} us, state {1e6 * t_state / LOOPS:.2f} us"
+        )
+
+    ipc_server.stop()
+    opcua_server.stop()
+
+
+if __name__ == "__main__":
+    main()
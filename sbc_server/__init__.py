@@ -1,7 +1,25 @@
 # import all submodules for better access overview
+from . import allocdiagnostics
 from . import baseskill
+from . import clock
+from . import flightrecorder
+from . import gcscheduler
+from . import macroskills
+from . import metrics
+from . import opcua_codec
+from . import opcua_events
+from . import opcua_fastpath
+from . import profiler
+from . import proxyskill
 from . import runskillserverhelper
+from . import skilldataexchange
+from . import skillrunner
 from . import skillruntimethread
 from . import skillimplementations
+from . import skillpool
+from . import skillstatetable
+from . import skillserver_aggregator
+from . import skillserver_ipc
 from . import skillserver_opcua
 from . import skillserver_opcua_vc
+from . import tracer
@@ -0,0 +1,273 @@
+import gc
+import time
+import threading
+import tracemalloc
+import dataclasses
+from typing import Callable
+
+# phases of skill cycle measured by AllocationDiagnostics
+CYCLE_PHASES = ["read_skill_data_extern", "run_skill", "write_skill_data_extern"]
+
+
+@dataclasses.dataclass
+class Phase_Allocations:
+    """dataclass of allocation statistics of one phase of skill cycles
+
+    Attributes:
+        cycles (int): number of measured cycles
+        alloc_bytes (int): sum of peak allocated bytes above memory at phase start
+        alloc_bytes_max (int): max peak allocated bytes of one cycle
+        net_bytes (int): sum of bytes still allocated after phase
+        gc_objects (int): sum of net new gc tracked objects (gc generation 0 count), not counted in cycles with collection
+    """
+
+    cycles: int = 0
+    alloc_bytes: int = 0
+    alloc_bytes_max: int = 0
+    net_bytes: int = 0
+    gc_objects: int = 0
+
+
+@dataclasses.dataclass
+class GC_Pauses:
+    """dataclass of gc pause statistics of one gc generation
+
+    Attributes:
+        count (int): number of collections
+        total (float): sum of pause durations in seconds
+        max (float): max pause duration in seconds
+        collected (int): number of collected objects
+    """
+
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    collected: int = 0
+
+
+@dataclasses.dataclass
+class Cycle_Overruns:
+    """dataclass of cycle overruns of one skill and gc pauses in them
+
+    Attributes:
+        cycles (int): number of measured cycles
+        overruns (int): number of cycles longer than cycletime
+        overruns_with_gc (int): number of overruns with gc pause during cycle
+        gc_pause (float): sum of gc pauses during cycles in seconds
+        gc_pause_in_overruns (float): sum of gc pauses during overrun cycles in seconds
+    """
+
+    cycles: int = 0
+    overruns: int = 0
+    overruns_with_gc: int = 0
+    gc_pause: float = 0.0
+    gc_pause_in_overruns: float = 0.0
+
+
+class GCMonitor:
+    """measures gc pauses with gc.callbacks, per generation"""
+
+    def __init__(self) -> None:
+        """measures gc pauses with gc.callbacks, per generation"""
+        self.pauses = [GC_Pauses() for _ in range(3)]
+        # sum of all pause durations, for differences over periods
+        self.total_pause = 0.0
+        self._start = 0.0
+        self._installed = False
+
+    def install(self) -> None:
+        """register gc callback"""
+        if not self._installed:
+            gc.callbacks.append(self._callback)
+            self._installed = True
+
+    def uninstall(self) -> None:
+        """unregister gc callback"""
+        if self._installed:
+            gc.callbacks.remove(self._callback)
+            self._installed = False
+
+    def reset(self) -> None:
+        """reset statistics per generation, total_pause keeps counting"""
+        self.pauses = [GC_Pauses() for _ in range(3)]
+
+    def _callback(self, phase: str, info: dict) -> None:
+        """gc callback, collections hold the gil, so only one collection runs at a time"""
+        if phase == "start":
+            self._start = time.perf_counter()
+            return
+        pause = time.perf_counter() - self._start
+        pauses = self.pauses[info["generation"]]
+        pauses.count += 1
+        pauses.total += pause
+        pauses.max = max(pauses.max, pause)
+        pauses.collected += info["collected"]
+        self.total_pause += pause
+
+
+class AllocationDiagnostics:
+    """diagnostic mode measuring allocations per phase of skill cycles (tracemalloc) and gc pauses (gc.callbacks),
+    gc pauses are correlated with cycle overruns. Pass to SkillServer(alloc_diagnostics=...) and start/stop at runtime.
+    While started, tracemalloc traces all allocations (slows down the process) and measured phases of all skill runtime threads
+    are serialised by a lock, so each phase is measured alone. Allocations of other threads (e.g. asyncua loop) during a phase are counted as well.
+    Time waiting for the lock is excluded from cycle durations of the overrun correlation (see lock_wait).
+    """
+
+    def __init__(self) -> None:
+        """diagnostic mode measuring allocations per phase of skill cycles and gc pauses"""
+        self.enabled = False
+        self.gc_monitor = GCMonitor()
+        # allocations by skill name and phase name
+        self.phases: dict[str, dict[str, Phase_Allocations]] = {}
+        self.overruns: dict[str, Cycle_Overruns] = {}
+        self._lock = threading.Lock()
+        # time waited for lock in measure per thread, see lock_wait
+        self._wait = threading.local()
+        self._started_tracemalloc = False
+
+    def start(self, nframes: int = 1) -> None:
+        """reset statistics, start tracemalloc and gc monitor
+
+        Args:
+            nframes (int, optional): number of traceback frames stored by tracemalloc, see top_allocations. Defaults to 1.
+        """
+        self.reset()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(nframes)
+            self._started_tracemalloc = True
+        self.gc_monitor.install()
+        self.enabled = True
+
+    def stop(self) -> None:
+        """stop measuring, statistics are kept"""
+        with self._lock:
+            self.enabled = False
+            self.gc_monitor.uninstall()
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+
+    def reset(self) -> None:
+        """reset statistics, e.g. after warm up"""
+        with self._lock:
+            self.phases = {}
+            self.overruns = {}
+            self.gc_monitor.reset()
+
+    def lock_wait(self) -> float:
+        """get time the calling thread waited in measure for measured phases of other threads, e.g. to exclude it from cycle duration
+
+        Returns:
+            float: total wait time of calling thread in seconds of time.perf_counter
+        """
+        return getattr(self._wait, "total", 0.0)
+
+    def measure(self, skill_name: str, phase: str, func: Callable, *args):
+        """call func and measure its allocations as phase of skill
+
+        Args:
+            skill_name (str): skill name
+            phase (str): phase name, see CYCLE_PHASES
+            func (Callable): phase function
+            *args (): arguments of func
+
+        Returns:
+            (): return value of func
+        """
+        t0 = time.perf_counter()
+        with self._lock:
+            self._wait.total = self.lock_wait() + time.perf_counter() - t0
+            if not self.enabled:
+                return func(*args)
+            gc_count = gc.get_count()[0]
+            gc_pause = self.gc_monitor.total_pause
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            result = func(*args)
+            after, peak = tracemalloc.get_traced_memory()
+            gc_objects = gc.get_count()[0] - gc_count
+            skill_phases = self.phases.setdefault(skill_name, {})
+            allocations = skill_phases.get(phase)
+            if allocations is None:
+                allocations = skill_phases[phase] = Phase_Allocations()
+            allocations.cycles += 1
+            allocations.alloc_bytes += peak - current
+            allocations.alloc_bytes_max = max(
+                allocations.alloc_bytes_max, peak - current
+            )
+            allocations.net_bytes += after - current
+            # gen 0 count is reset by collections
+            if self.gc_monitor.total_pause == gc_pause and gc_objects > 0:
+                allocations.gc_objects += gc_objects
+        return result
+
+    def end_cycle(
+        self, skill_name: str, duration: float, cycletime: float, gc_pause: float
+    ) -> None:
+        """record cycle of skill for correlation of overruns and gc pauses
+
+        Args:
+            skill_name (str): skill name
+            duration (float): cycle duration in seconds of time.perf_counter, without lock_wait
+            cycletime (float): target cycletime in seconds
+            gc_pause (float): gc_monitor.total_pause at cycle start
+        """
+        pause = self.gc_monitor.total_pause - gc_pause
+        with self._lock:
+            overruns = self.overruns.get(skill_name)
+            if overruns is None:
+                overruns = self.overruns[skill_name] = Cycle_Overruns()
+            overruns.cycles += 1
+            overruns.gc_pause += pause
+            if duration > cycletime > 0.0:
+                overruns.overruns += 1
+                if pause > 0.0:
+                    overruns.overruns_with_gc += 1
+                    overruns.gc_pause_in_overruns += pause
+
+    def report(self) -> dict:
+        """get statistics: mean and max allocations per cycle and phase, gc pauses per generation, overruns per skill
+
+        Returns:
+            dict: {"phases": {skill: {phase: {...}}}, "gc": [{...} per generation], "overruns": {skill: {...}}}
+        """
+        with self._lock:
+            phases = {
+                skill_name: {
+                    phase: {
+                        "cycles": allocations.cycles,
+                        "alloc_bytes_mean": allocations.alloc_bytes
+                        / max(allocations.cycles, 1),
+                        "alloc_bytes_max": allocations.alloc_bytes_max,
+                        "net_bytes_mean": allocations.net_bytes
+                        / max(allocations.cycles, 1),
+                        "gc_objects_mean": allocations.gc_objects
+                        / max(allocations.cycles, 1),
+                    }
+                    for phase, allocations in skill_phases.items()
+                }
+                for skill_name, skill_phases in self.phases.items()
+            }
+            overruns = {
+                skill_name: dataclasses.asdict(skill_overruns)
+                for skill_name, skill_overruns in self.overruns.items()
+            }
+        return {
+            "phases": phases,
+            "gc": [dataclasses.asdict(pauses) for pauses in self.gc_monitor.pauses],
+            "overruns": overruns,
+        }
+
+    def top_allocations(self, limit: int = 10) -> list[str]:
+        """get source lines allocating most memory currently traced by tracemalloc, call while started
+
+        Args:
+            limit (int, optional): number of lines. Defaults to 10.
+
+        Returns:
+            list[str]: statistics of source lines, largest first
+        """
+        if not tracemalloc.is_tracing():
+            return []
+        snapshot = tracemalloc.take_snapshot()
+        return [str(stat) for stat in snapshot.statistics("lineno")[:limit]]
@@ -1,10 +1,42 @@
 import time
 import logging
 import uuid
+import dataclasses
+from typing import Callable
 from sbc_statemachine.skillstatemachine import SkillStateMachine
-from sbc_statemachine.skillstatemachinetypes import EStateResult
+from sbc_statemachine.skillstatemachinetypes import (
+    EStateResult,
+    ESkillStates,
+    ESkillCommands,
+)
 from sbc_statemachine.skilldatahandle import SkillDataHandle
 from sbc_statemachine.skilldatatypes import ST_SkillData
+from .skilldataexchange import SkillDataExchange
+
+
+@dataclasses.dataclass
+class SkillEvent:
+    """state transition, accepted command or error of a skill, passed to observer callbacks of BaseSkill
+
+    Attributes:
+        skill_name (str): skill name
+        old_state (ESkillStates): active state before transition, equal to new_state for command and error events
+        new_state (ESkillStates): active state
+        command (ESkillCommands): active command
+        error_id (int): udiErrorID of stSkillState
+        error_msg (str): strErrorMsg of stSkillState
+        timestamp (float): clock time of event (end of skill cycle)
+        old_state_timestamp (float): clock time old_state was entered
+    """
+
+    skill_name: str
+    old_state: ESkillStates
+    new_state: ESkillStates
+    command: ESkillCommands
+    error_id: int = 0
+    error_msg: str = ""
+    timestamp: float = 0.0
+    old_state_timestamp: float = 0.0
 
 
 class BaseSkill(SkillStateMachine):
@@ -31,6 +63,14 @@ class BaseSkill(SkillStateMachine):
                 ).replace("-", ""),
                 strType=str(self.__class__.__name__),
             )
+        # row of skill in state table of server, see SkillStateTable.attach
+        self.state_table = None
+        self.state_table_index = 0
+        # observer callbacks, called in skill runtime from _set_SkillState
+        self.state_change_callbacks: list[Callable[[SkillEvent], None]] = []
+        self.command_callbacks: list[Callable[[SkillEvent], None]] = []
+        self.error_callbacks: list[Callable[[SkillEvent], None]] = []
+        self._observed: tuple[ESkillStates, ESkillCommands, bool, float] = None
         super().__init__(skill_data_handle=data, logger=logger, **kwargs)
         self.data.reset_SkillDataCommand()
         self.data.stSkillState.stCommandEnabled.ResetEnabled = True
@@ -39,9 +79,13 @@ class BaseSkill(SkillStateMachine):
         self.data.stSkillState.stCommandEnabled.HoldEnabled = True
         self.data.stSkillState.stCommandEnabled.UnholdEnabled = True
         self.data.stSkillState.stCommandEnabled.AbortEnabled = True
+        # exchange of commands and skill data snapshots with other threads
+        self.data_exchange = SkillDataExchange(self.data)
 
     def run_cycle(self):
-        """Run skill."""
+        """Run skill. Applies next queued command of data_exchange before
+        and publishes skill data snapshot to data_exchange after skill cycle."""
+        self.data_exchange.apply_command(self.data)
         super().run_cycle(
             reset=self.data.stSkillCommand.stCommand_State.Reset,
             start=self.data.stSkillCommand.stCommand_State.Start,
@@ -61,6 +105,7 @@ class BaseSkill(SkillStateMachine):
         self._set_SkillState()
         self._reset_CommandsMode()
         self._reset_CommandsState()
+        self.data_exchange.publish(self.data)
 
     def _set_SkillState(self) -> None:
         """set strings for mode and state in stSkillState."""
@@ -70,6 +115,108 @@ class BaseSkill(SkillStateMachine):
         self.data.stSkillState.strActiveState = self.state.name
         self.data.stSkillState.eActiveCommand = self.command.value
         self.data.stSkillState.strActiveCommand = self.command.name
+        self._write_state_table()
+        self._notify_observers()
+
+    def _write_state_table(self) -> None:
+        """write stSkillState to row of skill in state table, if attached."""
+        if self.state_table is not None:
+            self.state_table.write(self.state_table_index, self.data.stSkillState)
+
+    def on_state_change(
+        self, callback: Callable[[SkillEvent], None]
+    ) -> Callable[[SkillEvent], None]:
+        """register callback, called once per state transition in skill runtime thread. Usable as decorator.
+
+        Args:
+            callback (Callable[[SkillEvent], None]): callback, must not block
+
+        Returns:
+            Callable[[SkillEvent], None]: callback
+        """
+        self.state_change_callbacks.append(callback)
+        return callback
+
+    def on_command(
+        self, callback: Callable[[SkillEvent], None]
+    ) -> Callable[[SkillEvent], None]:
+        """register callback, called once per accepted command (change of active command) in skill runtime thread. Usable as decorator.
+
+        Args:
+            callback (Callable[[SkillEvent], None]): callback, must not block
+
+        Returns:
+            Callable[[SkillEvent], None]: callback
+        """
+        self.command_callbacks.append(callback)
+        return callback
+
+    def on_error(
+        self, callback: Callable[[SkillEvent], None]
+    ) -> Callable[[SkillEvent], None]:
+        """register callback, called once when bError of stSkillState is set in skill runtime thread. Usable as decorator.
+
+        Args:
+            callback (Callable[[SkillEvent], None]): callback, must not block
+
+        Returns:
+            Callable[[SkillEvent], None]: callback
+        """
+        self.error_callbacks.append(callback)
+        return callback
+
+    def _notify_observers(self) -> None:
+        """call observer callbacks on change of eActiveState, eActiveCommand or bError of stSkillState since last call."""
+        state = self.data.stSkillState
+        new_state = ESkillStates(state.eActiveState)
+        command = ESkillCommands(state.eActiveCommand)
+        error = bool(state.bError)
+        if self._observed is None:
+            self._observed = (new_state, command, error, 0.0)
+            return
+        old_state, old_command, old_error, old_state_timestamp = self._observed
+        if (new_state, command, error) == (old_state, old_command, old_error):
+            return
+        timestamp = self.data_exchange.clock.time()
+        self._observed = (
+            new_state,
+            command,
+            error,
+            timestamp if new_state != old_state else old_state_timestamp,
+        )
+        event = SkillEvent(
+            skill_name=self.data.stSkillDataDefault.strName,
+            old_state=old_state,
+            new_state=new_state,
+            command=command,
+            error_id=state.udiErrorID,
+            error_msg=state.strErrorMsg,
+            timestamp=timestamp,
+            old_state_timestamp=old_state_timestamp,
+        )
+        if new_state != old_state:
+            self._call_observers(self.state_change_callbacks, event)
+        if command != old_command and command != ESkillCommands.Undefined:
+            self._call_observers(self.command_callbacks, event)
+        if error and not old_error:
+            self._call_observers(self.error_callbacks, event)
+
+    def _call_observers(
+        self, callbacks: list[Callable[[SkillEvent], None]], event: SkillEvent
+    ) -> None:
+        """call callbacks, log exceptions of callbacks instead of raising them into the skill cycle."""
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                logging.error(
+                    f"Exception in observer callback of skill '{event.skill_name}': {e}"
+                )
+
+    def shutdown(self) -> None:
+        """release resources of skill (e.g. worker pools), called by the skill runtime after the skill is stopped.
+        Override with subclass"""
+        pass
 
     def _reset_CommandsMode(self) -> None:
         """reset all skill mode commands."""
@@ -0,0 +1,139 @@
+import time
+import heapq
+import threading
+import contextlib
+
+
+class Clock:
+    """time source and sleep of the runtime (CycleTimer, SkillRuntimeThread, SkillServer), see SystemClock and VirtualClock"""
+
+    def time(self) -> float:
+        """get time in seconds
+
+        Returns:
+            float: monotonic time in seconds
+        """
+        raise NotImplementedError
+
+    def sleep(self, seconds: float) -> None:
+        """sleep seconds of clock time
+
+        Args:
+            seconds (float): time to sleep in seconds
+        """
+        raise NotImplementedError
+
+    def attach(self, thread: threading.Thread = None) -> None:
+        """attach thread to clock, call before starting thread. Not used by SystemClock.
+
+        Args:
+            thread (threading.Thread, optional): thread, current thread if None. Defaults to None.
+        """
+
+    def detach(self, thread: threading.Thread = None) -> None:
+        """detach thread from clock, call at end of thread. Not used by SystemClock.
+
+        Args:
+            thread (threading.Thread, optional): thread, current thread if None. Defaults to None.
+        """
+
+    @contextlib.contextmanager
+    def waiting(self):
+        """context of an attached thread waiting for other threads (e.g. join), other threads may run and time may advance meanwhile. Not used by SystemClock."""
+        yield
+
+
+class SystemClock(Clock):
+    """wall clock: time.perf_counter and time.sleep"""
+
+    def time(self) -> float:
+        return time.perf_counter()
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0.0:
+            time.sleep(seconds)
+
+
+SYSTEM_CLOCK = SystemClock()  # default clock of runtime
+
+
+class VirtualClock(Clock):
+    """virtual time for simulation, running faster than real time and deterministic.
+    Time only advances, when all attached threads (e.g. runtime threads, server thread) sleep: it jumps to the earliest wake up time.
+    Attached threads sleeping until the same time are woken one after the other in order of their sleep calls,
+    the next one is woken when the previous one sleeps again or is detached, so attached threads never run concurrently.
+    Threads not attached (e.g. test thread) can sleep as well, but do not hold back time.
+    """
+
+    def __init__(self, start_time: float = 0.0) -> None:
+        """virtual time for simulation, running faster than real time and deterministic.
+
+        Args:
+            start_time (float, optional): initial time in seconds. Defaults to 0.0.
+        """
+        self._time = start_time
+        self._condition = threading.Condition()
+        self._participants: set[threading.Thread] = set()
+        # (wake up time, sleep call number, thread) of sleeping threads
+        self._sleepers: list[tuple[float, int, threading.Thread]] = []
+        self._woken: set[int] = set()
+        # attached thread running after wake up
+        self._running: threading.Thread = None
+        self._sleep_count = 0
+
+    def time(self) -> float:
+        return self._time
+
+    def sleep(self, seconds: float) -> None:
+        thread = threading.current_thread()
+        with self._condition:
+            self._sleep_count += 1
+            sleeper = (self._time + max(seconds, 0.0), self._sleep_count, thread)
+            heapq.heappush(self._sleepers, sleeper)
+            if self._running is thread:
+                self._running = None
+            self._advance()
+            self._condition.wait_for(lambda: sleeper[1] in self._woken)
+            self._woken.discard(sleeper[1])
+
+    def attach(self, thread: threading.Thread = None) -> None:
+        with self._condition:
+            self._participants.add(thread or threading.current_thread())
+
+    def detach(self, thread: threading.Thread = None) -> None:
+        thread = thread or threading.current_thread()
+        with self._condition:
+            self._participants.discard(thread)
+            if self._running is thread:
+                self._running = None
+            self._advance()
+
+    @contextlib.contextmanager
+    def waiting(self):
+        thread = threading.current_thread()
+        with self._condition:
+            attached = thread in self._participants
+        if not attached:
+            yield
+            return
+        self.detach(thread)
+        try:
+            yield
+        finally:
+            self.attach(thread)
+
+    def _advance(self) -> None:
+        """wake next sleeping thread(s), if all attached threads sleep. Call with condition locked."""
+        if self._running is not None:
+            return
+        sleeping = {sleeper[2] for sleeper in self._sleepers}
+        if not self._participants <= sleeping:
+            return  # attached thread running
+        while self._sleepers:
+            wake_time, sleep_count, thread = heapq.heappop(self._sleepers)
+            self._time = max(self._time, wake_time)
+            self._woken.add(sleep_count)
+            if thread in self._participants:
+                self._running = thread
+                break
+        self._condition.notify_all()
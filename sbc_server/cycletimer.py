@@ -1,9 +1,32 @@
-import time
+import math
 import logging
+from .clock import Clock, SYSTEM_CLOCK
+from .gcscheduler import GCScheduler
+
+
+def next_tick(epoch: float, cycletime: float, t: float) -> float:
+    """get next cycle start time after t of cycles aligned to epoch
+
+    Args:
+        epoch (float): clock time of first cycle start
+        cycletime (float): cycletime in seconds
+        t (float): clock time
+
+    Returns:
+        float: first cycle start time epoch + k * cycletime > t
+    """
+    return epoch + (math.floor((t - epoch) / cycletime) + 1) * cycletime
 
 
 class CycleTimer:
-    def __init__(self, cycletime: float = 1.0, use_cycletime_correction=True):
+    def __init__(
+        self,
+        cycletime: float = 1.0,
+        use_cycletime_correction=True,
+        epoch: float = None,
+        clock: Clock = None,
+        gc_scheduler: GCScheduler = None,
+    ):
         """Provides Task to time loops with a cycletime.
         Uses a correction mechanism to compensate calculation time taken by method calls.
         Attention: If you know, that your cycle functionality has highly fluctuating cpu times, dont use cycletime correction (use_cycletime_correction=False)
@@ -11,18 +34,35 @@ class CycleTimer:
         Args:
             cycletime (float, optional): target cycletime in seconds. Defaults to 1.0.
             use_cycletime_correction (bool, optional): correction mechanism to compensate calculation time taken by method calls. Defaults to True.
+            epoch (float, optional): clock time to align cycle starts to (epoch + k * cycletime), so timers with same epoch and cycletime start their cycles together. Correction is not used then. Defaults to None.
+            clock (Clock, optional): time source and sleep, e.g. VirtualClock for simulation. Defaults to None (SYSTEM_CLOCK).
+            gc_scheduler (GCScheduler, optional): runs gc collections in slack at end of cycles, when no cycle of its timers is running. Defaults to None.
         """
         self.cycletime = cycletime
         self.use_cycletime_correction = use_cycletime_correction
+        self.epoch = epoch
+        self.clock = clock or SYSTEM_CLOCK
+        self.gc_scheduler = gc_scheduler
         self.cycletime_correction = 0.0
         self.ts = 0.0
         self.te = 0.0
         self.tec = 0.0
         self.tsleep = 0.0
+        # cycle started and not ended, entered at gc_scheduler
+        self.in_cycle = False
 
     def start_cycle(self) -> None:
         """Start cycle."""
-        self.ts = time.perf_counter()  # get cycle start time
+        self.ts = self.clock.time()  # get cycle start time
+        if self.gc_scheduler is not None and not self.in_cycle:
+            self.gc_scheduler.enter_cycle()
+        self.in_cycle = True
+
+    def cancel_cycle(self) -> None:
+        """End running cycle without waiting, e.g. after exception in cycle, so gc_scheduler does not wait for it."""
+        if self.gc_scheduler is not None and self.in_cycle:
+            self.gc_scheduler.cancel_cycle()
+        self.in_cycle = False
 
     def take_time(self) -> float:
         """takes elapsed time since call of startCycle.
@@ -30,62 +70,56 @@ class CycleTimer:
         Returns:
             float: elapsed time since call of startCycle.
         """
-        return time.perf_counter() - self.ts
+        return self.clock.time() - self.ts
 
     def end_cycle(self, log: bool = False) -> float:
-        """End Cycle and wait (time.sleep) remaining time of cycletime.
+        """End Cycle and wait (clock sleep) remaining time of cycletime.
 
         Args:
             log (bool, optional): print debug message if cycletime is exceeded (>10%). Defaults to False.
 
         Returns:
-            float: remaining waiting time (time.sleep argument) of cycletime.
+            float: remaining waiting time (clock sleep argument) of cycletime.
         """
-        self.te = time.perf_counter()  # get cycle end time
-        self.tsleep = (
-            self.cycletime - (self.te - self.ts) - self.cycletime_correction
-        )  # calculate remaining waiting time including last correction value.
+        self.te = self.clock.time()  # get cycle end time
+        self.tsleep = self.remaining_time(self.te)
+        if (
+            self.gc_scheduler is not None
+            and self.in_cycle
+            and self.gc_scheduler.leave_cycle(self.tsleep) > 0.0
+        ):  # gc collection in slack, wait remaining time after collection
+            self.tsleep = self.remaining_time(self.clock.time())
+        self.in_cycle = False
         if self.tsleep > 0.0:  # check is sleep is possible
-            time.sleep(self.tsleep)
+            self.clock.sleep(self.tsleep)
         if (
             log and self.te - self.ts >= self.cycletime * 1.1
         ):  # print logging warning message
             logging.warning(
                 f"CycleTimer exceeded cycletime: Target Cycletime is {self.cycletime}, last cycletime was {self.te-self.ts} with correction {self.cycletime_correction}"
             )
-        if self.use_cycletime_correction:
+        if self.use_cycletime_correction and self.epoch is None:
             self.tec = (
-                time.perf_counter()
+                self.clock.time()
             )  # get cycle end time for correction, including sleep time
             self.cycletime_correction = max(
                 self.tec - self.ts - self.cycletime, 0.0
             )  # calculate correction time for next cycle
         return self.tsleep
 
+    def remaining_time(self, t: float) -> float:
+        """get remaining waiting time of cycle at clock time t
+
+        Args:
+            t (float): clock time
+
+        Returns:
+            float: time until next cycle start, negative if cycletime is exceeded
+        """
+        if self.epoch is not None:
+            # wait until next aligned cycle start
+            return next_tick(self.epoch, self.cycletime, t) - t
+        return (
+            self.cycletime - (t - self.ts) - self.cycletime_correction
+        )  # calculate remaining waiting time including last correction value.
 
-if __name__ == "__main__":
-    # Usage example with debug information
-    import random
-
-    cycletime = 0.02
-    loops = 10
-    ts0 = 0.0
-    te0 = 0.0
-    dsleeptimes: list = [0.0] * loops
-
-    cycleTimer = CycleTimer(cycletime=cycletime)
-    ts0 = time.perf_counter()
-
-    for i in range(loops):
-        cycleTimer.start_cycle()
-        time.sleep(cycletime / (2.0 + random.random() * 5.0))
-        cycleTimer.end_cycle()
-        dsleeptimes[i] = cycleTimer.cycletime_correction
-
-    te0 = time.perf_counter()
-    dsleeptimes = [dsleeptime * 1e3 for dsleeptime in dsleeptimes]
-    print(f"Time waited: ")
-    print(f"Overall: {1E3*(((te0-ts0)/loops)-cycletime)} ms")
-    print(f"Mean: {sum(dsleeptimes)/len(dsleeptimes)} ms")
-    print(f"Min: {min(dsleeptimes)} ms at {dsleeptimes.index(min(dsleeptimes))}")
-    print(f"Max: {max(dsleeptimes)} ms at {dsleeptimes.index(max(dsleeptimes))}")
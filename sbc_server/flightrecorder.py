@@ -0,0 +1,165 @@
+import os
+import json
+import array
+import logging
+import tempfile
+from datetime import datetime, timezone
+from sbc_statemachine.skillstatemachinetypes import ESkillStates, ESkillCommands
+from .baseskill import BaseSkill
+
+# entering one of these states dumps flight recorder
+DUMP_SKILL_STATES = [ESkillStates.Aborting, ESkillStates.Aborted]
+
+
+class FlightRecorder:
+    """ring buffer of the last cycles of a skill: clock time, state, mode, active command, error, applied command sequence number and changed parameter values.
+    Recorded by the skill runtime thread after each cycle into preallocated arrays, changed parameters are stored as tuple only in cycles they changed.
+    Dumped as json file on exception in the skill cycle, when entering Aborting or Aborted, and on demand (dump).
+    """
+
+    def __init__(
+        self, skill: BaseSkill, capacity: int = 256, dump_dir: str = None
+    ) -> None:
+        """ring buffer of the last cycles of a skill
+
+        Args:
+            skill (BaseSkill): recorded skill
+            capacity (int, optional): number of recorded cycles. Defaults to 256.
+            dump_dir (str, optional): directory of dump files. Defaults to None (temp directory).
+        """
+        self.skill = skill
+        self.skill_name = skill.data.stSkillDataDefault.strName
+        self.capacity = capacity
+        self.dump_dir = dump_dir or tempfile.gettempdir()
+        self.timestamps = array.array("d", [0.0]) * capacity
+        self.states = array.array("i", [0]) * capacity
+        self.modes = array.array("i", [0]) * capacity
+        self.commands = array.array("i", [0]) * capacity
+        self.errors = array.array("b", [0]) * capacity
+        self.error_ids = array.array("L", [0]) * capacity
+        self.command_seqs = array.array("Q", [0]) * capacity
+        # ((name, value), ...) of parameters changed in cycle or None
+        self.parameters: list[tuple] = [None] * capacity
+        # number of recorded cycles
+        self.count = 0
+        self.dump_count = 0
+        self._parameter_values: list[str] = [
+            parameter.strValue
+            for parameter in skill.data.stSkillDataCommand.astParameters
+        ]
+        self._state = skill.data.stSkillState.eActiveState
+
+    def record(self) -> None:
+        """record cycle, call from skill runtime thread after cycle.
+        Dumps when skill entered DUMP_SKILL_STATES (Aborting or directly Aborted)."""
+        state = self.skill.data.stSkillState
+        index = self.count % self.capacity
+        self.timestamps[index] = self.skill.data_exchange.clock.time()
+        self.states[index] = state.eActiveState
+        self.modes[index] = state.eActiveMode
+        self.commands[index] = state.eActiveCommand
+        self.errors[index] = state.bError
+        self.error_ids[index] = state.udiErrorID
+        self.command_seqs[index] = self.skill.data_exchange.applied_seq
+        self.parameters[index] = self._changed_parameters()
+        self.count += 1
+        if state.eActiveState != self._state:
+            entered = (
+                state.eActiveState in DUMP_SKILL_STATES
+                and self._state not in DUMP_SKILL_STATES
+            )
+            self._state = state.eActiveState
+            if entered:
+                self.dump(reason=f"entered state {ESkillStates(self._state).name}")
+
+    def _changed_parameters(self) -> tuple:
+        """get parameters of stSkillDataCommand changed since last call
+
+        Returns:
+            tuple: ((name, value), ...) or None if unchanged
+        """
+        parameters = self.skill.data.stSkillDataCommand.astParameters
+        values = self._parameter_values
+        if len(parameters) != len(values):
+            values[:] = [""] * len(parameters)
+        changed = None
+        for i, parameter in enumerate(parameters):
+            if parameter.strValue != values[i]:
+                values[i] = parameter.strValue
+                if changed is None:
+                    changed = []
+                changed.append((parameter.strName, parameter.strValue))
+        return tuple(changed) if changed else None
+
+    def records(self) -> list[dict]:
+        """get recorded cycles, oldest first
+
+        Returns:
+            list[dict]: recorded cycles
+        """
+        count = self.count
+        records = []
+        for i in range(max(count - self.capacity, 0), count):
+            index = i % self.capacity
+            records.append(
+                {
+                    "timestamp": self.timestamps[index],
+                    "state": _enum_name(ESkillStates, self.states[index]),
+                    "mode": self.modes[index],
+                    "command": _enum_name(ESkillCommands, self.commands[index]),
+                    "error": bool(self.errors[index]),
+                    "error_id": self.error_ids[index],
+                    "command_seq": self.command_seqs[index],
+                    "parameters": dict(self.parameters[index] or ()),
+                }
+            )
+        return records
+
+    def dump(self, path: str = None, reason: str = "on demand") -> str:
+        """write recorded cycles to json file
+
+        Args:
+            path (str, optional): file path. Defaults to None ("<skill name>_flightrecorder_<time>_<dump count>.json" in dump_dir).
+            reason (str, optional): reason of dump, written to file. Defaults to "on demand".
+
+        Returns:
+            str: file path, None if writing failed
+        """
+        now = datetime.now(timezone.utc)
+        self.dump_count += 1
+        if path is None:
+            path = os.path.join(
+                self.dump_dir,
+                f"{self.skill_name}_flightrecorder_{now.strftime('%Y%m%d_%H%M%S')}_{self.dump_count}.json",
+            )
+        dump = {
+            "skill": self.skill_name,
+            "reason": reason,
+            "time": now.isoformat(),
+            "clock_time": self.skill.data_exchange.clock.time(),
+            "state": _enum_name(
+                ESkillStates, self.skill.data.stSkillState.eActiveState
+            ),
+            "error_msg": self.skill.data.stSkillState.strErrorMsg,
+            "records": self.records(),
+        }
+        try:
+            with open(path, "w") as f:
+                json.dump(dump, f, indent=1)
+        except OSError as e:
+            logging.error(
+                f"Error dumping flight recorder of skill '{self.skill_name}' to '{path}': {e}"
+            )
+            return None
+        logging.info(
+            f"Dumped flight recorder of skill '{self.skill_name}' ({reason}) to '{path}'."
+        )
+        return path
+
+
+def _enum_name(enum_type, value: int) -> str:
+    """get name of enum value, value as string if unknown"""
+    try:
+        return enum_type(value).name
+    except ValueError:
+        return str(value)
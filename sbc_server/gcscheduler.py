@@ -0,0 +1,141 @@
+import gc
+import time
+import logging
+import threading
+from .allocdiagnostics import GCMonitor
+
+# gc thresholds while scheduled: net allocations for generation 0, collections of younger generation for generation 1 and 2
+DEFAULT_GC_THRESHOLDS = (10000, 10, 10)
+
+
+class GCScheduler:
+    """gc aware low jitter mode: automatic gc is disabled after startup (objects built so far are frozen, gc.freeze)
+    and collections are run explicitly in the slack at the end of cycles (CycleTimer.end_cycle), only when no cycle of any
+    participating CycleTimer (skill runtime threads, server) is running, so no cycle is paused by the gc.
+    A generation is collected when its count exceeds its threshold, like the automatic gc, older generations only if slack is long enough.
+    If garbage piles up without idle slack (overload), generation 0 is collected anyway at the end of a cycle (forced), to bound memory.
+    """
+
+    def __init__(
+        self,
+        thresholds: tuple[int, int, int] = DEFAULT_GC_THRESHOLDS,
+        min_slack: tuple[float, float, float] = (0.001, 0.002, 0.02),
+        force_factor: int = 10,
+        freeze: bool = True,
+    ) -> None:
+        """gc aware low jitter mode, collections in idle slack at the end of cycles
+
+        Args:
+            thresholds (tuple[int, int, int], optional): collection thresholds of generation 0, 1 and 2, see gc.set_threshold. Defaults to DEFAULT_GC_THRESHOLDS.
+            min_slack (tuple[float, float, float], optional): min remaining cycle time in seconds to collect generation 0, 1 and 2. Defaults to (0.001, 0.002, 0.02).
+            force_factor (int, optional): generation 0 is collected without idle slack, if its count exceeds force_factor * threshold. Defaults to 10.
+            freeze (bool, optional): move all objects existing at start into permanent generation (gc.freeze), not scanned by collections. Defaults to True.
+        """
+        self.thresholds = thresholds
+        self.min_slack = min_slack
+        self.force_factor = force_factor
+        self.freeze = freeze
+        self.enabled = False
+        self.gc_monitor = GCMonitor()
+        # collections run in idle slack by generation and forced collections of generation 0
+        self.idle_collections = [0, 0, 0]
+        self.forced_collections = 0
+        # number of cycles ended while other cycles were running with due collection
+        self.deferred = 0
+        self._active_cycles = 0
+        self._lock = threading.Lock()
+        self._gc_enabled = True
+        self._gc_thresholds = gc.get_threshold()
+
+    def start(self) -> None:
+        """freeze objects, disable automatic gc and start collecting in slack. Call after startup, once skills, nodes and types are built."""
+        self._gc_enabled = gc.isenabled()
+        self._gc_thresholds = gc.get_threshold()
+        gc.collect()
+        if self.freeze:
+            gc.freeze()
+        gc.set_threshold(*self.thresholds)
+        gc.disable()
+        self.gc_monitor.install()
+        self.enabled = True
+        logging.info(
+            f"GCScheduler: automatic gc disabled, {gc.get_freeze_count()} objects frozen, thresholds {self.thresholds}."
+        )
+
+    def stop(self) -> None:
+        """stop collecting in slack, restore automatic gc and thresholds, unfreeze objects"""
+        if not self.enabled:
+            return
+        self.enabled = False
+        self.gc_monitor.uninstall()
+        gc.set_threshold(*self._gc_thresholds)
+        if self.freeze:
+            gc.unfreeze()
+        if self._gc_enabled:
+            gc.enable()
+
+    def enter_cycle(self) -> None:
+        """cycle started, called by CycleTimer.start_cycle"""
+        with self._lock:
+            self._active_cycles += 1
+
+    def cancel_cycle(self) -> None:
+        """cycle ended without leave_cycle (e.g. exception in cycle), called by CycleTimer.cancel_cycle"""
+        with self._lock:
+            self._active_cycles = max(self._active_cycles - 1, 0)
+
+    def leave_cycle(self, slack: float) -> float:
+        """cycle ended, called by CycleTimer.end_cycle before sleeping. Collects, if due and no other cycle is running.
+
+        Args:
+            slack (float): remaining time until next cycle start in seconds
+
+        Returns:
+            float: time spent collecting in seconds
+        """
+        with self._lock:
+            self._active_cycles = max(self._active_cycles - 1, 0)
+            if not self.enabled:
+                return 0.0
+            counts = gc.get_count()
+            if counts[0] <= self.thresholds[0]:
+                return 0.0
+            t0 = time.perf_counter()
+            if self._active_cycles == 0 and slack >= self.min_slack[0]:
+                generation = 0
+                for i in (2, 1):
+                    if counts[i] > self.thresholds[i] and slack >= self.min_slack[i]:
+                        generation = i
+                        break
+                gc.collect(generation)
+                self.idle_collections[generation] += 1
+            elif counts[0] > self.force_factor * self.thresholds[0]:
+                # overload: no idle slack, collect anyway to bound memory
+                gc.collect(0)
+                self.forced_collections += 1
+            else:
+                if self._active_cycles > 0:
+                    self.deferred += 1
+                return 0.0
+            return time.perf_counter() - t0
+
+    def statistics(self) -> dict:
+        """get pause statistics
+
+        Returns:
+            dict: collections in idle slack per generation, forced collections, deferred collections, pauses per generation (count, total, max, collected)
+        """
+        return {
+            "idle_collections": list(self.idle_collections),
+            "forced_collections": self.forced_collections,
+            "deferred": self.deferred,
+            "pauses": [
+                {
+                    "count": pauses.count,
+                    "total": pauses.total,
+                    "max": pauses.max,
+                    "collected": pauses.collected,
+                }
+                for pauses in self.gc_monitor.pauses
+            ],
+        }
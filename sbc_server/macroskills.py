@@ -0,0 +1,255 @@
+import queue
+import dataclasses
+from logging import Logger
+from sbc_statemachine.skilldatahandle import SkillDataHandle, ST_Parameter
+from sbc_statemachine.skilldatatypes import ST_SkillCommand
+from sbc_statemachine.skillstatemachinetypes import EStateResult, ESkillStates
+from .baseskill import BaseSkill
+
+STEP_TIMEOUT = (
+    30.0  # default max time in seconds waiting for skills of a step to be idle
+)
+LINK_PREFIX = "$"  # parameter value "$<skill name>.<parameter name>" links to parameter value of other skill
+
+
+@dataclasses.dataclass
+class MacroStep:
+    """step of a macro skill: group of skills started together, step is done when all skills completed.
+
+    Attributes:
+        skills (list[BaseSkill]): skills of step, run in parallel
+        parameters (dict[str, dict[str, str]]): input parameter values by skill name and parameter name.
+            Values can link to parameters of the macro skill or of skills of previous steps: "$<skill name>.<parameter name>"
+    """
+
+    skills: list[BaseSkill]
+    parameters: dict[str, dict[str, str]] = dataclasses.field(default_factory=dict)
+
+
+class MacroSkill(BaseSkill):
+    """composite skill running a sequence of steps of other skills inside the server, each step is a parallel group.
+    Child skills must be registered at the same server, they are commanded by their command queues.
+    Parameters are passed from the macro skill and from completed skills to inputs of subsequent skills.
+    Stop, Abort, Hold and Unhold are passed to the child skills of the active step.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        steps: list[MacroStep],
+        parameters: list[ST_Parameter] = None,
+        outputs: dict[str, str] = None,
+        step_timeout: float = STEP_TIMEOUT,
+        logger: Logger = None,
+        **kwargs,
+    ) -> None:
+        """composite skill running a sequence of steps of other skills inside the server.
+
+        Args:
+            name (str): skill name
+            steps (list[MacroStep]): steps to run in sequence
+            parameters (list[ST_Parameter], optional): parameters of macro skill, inputs and outputs. Defaults to None.
+            outputs (dict[str, str], optional): links of output parameters of macro skill, set when all steps are done: parameter name -> "$<skill name>.<parameter name>". Defaults to None.
+            step_timeout (float, optional): max time in seconds waiting for all skills of a step to be Idle, error of macro skill after timeout. None waits forever. Defaults to STEP_TIMEOUT.
+            logger (logging.Logger, optional): logger for logging. Defaults to None.
+            **kwargs () : additional keyword arguments for skillstatemachine.SkillStateMachine.__init__
+
+        Raises:
+            KeyError: if output parameter is not a parameter of macro skill
+        """
+        data = SkillDataHandle(skillName=name)
+        data.stSkillDataDefault.strType = self.__class__.__name__
+        for parameter in parameters or []:
+            data.stSkillDataDefault.astParameters.append(parameter)
+            data.stSkillDataDefault.iParameterCount += 1
+        self.steps = steps
+        self.outputs = outputs or {}
+        self.step_timeout = step_timeout
+        parameter_names = [p.strName for p in data.stSkillDataDefault.astParameters]
+        for output_name in self.outputs:
+            if output_name not in parameter_names:
+                raise KeyError(
+                    f"Output '{output_name}' is not a parameter of macro skill '{name}'!"
+                )
+        data.reset_SkillDataCommand()
+        super().__init__(data=data, logger=logger, **kwargs)
+        self.step_index = 0
+        # parameter values of macro skill and completed skills by skill name
+        self._values: dict[str, dict[str, str]] = {}
+        # queued start command sequence number by skill name of active step
+        self._started: dict[str, int] = None
+        # clock time of first try to start active step
+        self._step_wait_start: float = None
+
+    def S01_Starting_Execute(self) -> EStateResult:
+        """take parameters of macro skill, begin with first step"""
+        self.step_index = 0
+        self._started = None
+        self._step_wait_start = None
+        self._values = {
+            self.data.stSkillDataDefault.strName: _parameter_values(
+                self.data.stSkillDataCommand.astParameters
+            )
+        }
+        return EStateResult.Done
+
+    def S02_Execute_Execute(self) -> EStateResult:
+        """run steps: start skills of step when idle, wait for completion, reset skills and go to next step"""
+        if self.step_index >= len(self.steps):
+            return self._set_outputs()
+        step = self.steps[self.step_index]
+        if self._started is None:
+            return self._start_step(step)
+        for skill in step.skills:
+            skill_name = skill.data.stSkillDataDefault.strName
+            snapshot = skill.data_exchange.snapshot()
+            if snapshot.command_seq < self._started[skill_name]:
+                return EStateResult.Busy  # start command not applied yet
+            state = snapshot.stSkillState
+            if state.bError or state.eActiveState in [
+                ESkillStates.Stopping,
+                ESkillStates.Stopped,
+                ESkillStates.Aborting,
+                ESkillStates.Aborted,
+            ]:
+                return self._set_error(
+                    state.udiErrorID,
+                    f"Skill '{skill_name}' of step {self.step_index} failed in state {state.strActiveState}: {state.strErrorMsg}",
+                )
+            if state.eActiveState != ESkillStates.Completed:
+                return EStateResult.Busy
+        # step done: take results, reset skills
+        for skill in step.skills:
+            skill_name = skill.data.stSkillDataDefault.strName
+            self._values[skill_name] = _parameter_values(
+                skill.data_exchange.snapshot().stSkillDataCommand.astParameters
+            )
+            self._post_state_command(skill, "Reset")
+        self.step_index += 1
+        self._started = None
+        self._step_wait_start = None
+        return EStateResult.Busy
+
+    def S08_Holding_Execute(self) -> EStateResult:
+        self._post_active_step("Hold")
+        return EStateResult.Done
+
+    def S10_Unholding_Execute(self) -> EStateResult:
+        self._post_active_step("Unhold")
+        return super().S10_Unholding_Execute()
+
+    def S11_Stopping_Execute(self) -> EStateResult:
+        self._post_active_step("Stop")
+        self._started = None
+        self._step_wait_start = None
+        return EStateResult.Done
+
+    def S13_Aborting_Execute(self) -> EStateResult:
+        self._post_active_step("Abort")
+        self._started = None
+        self._step_wait_start = None
+        return EStateResult.Done
+
+    def _start_step(self, step: MacroStep) -> EStateResult:
+        """start all skills of step with resolved input parameters, if all skills are idle.
+        Error, if skills are not idle within step_timeout."""
+        now = self.data_exchange.clock.time()
+        if self._step_wait_start is None:
+            self._step_wait_start = now
+        for skill in step.skills:
+            state = skill.data_exchange.snapshot().stSkillState
+            if state.eActiveState != ESkillStates.Idle:
+                if (
+                    self.step_timeout is not None
+                    and now - self._step_wait_start > self.step_timeout
+                ):
+                    self._step_wait_start = None
+                    return self._set_error(
+                        1,
+                        f"Skill '{skill.data.stSkillDataDefault.strName}' of step {self.step_index} not Idle within {self.step_timeout} s, state {state.strActiveState}",
+                    )
+                return EStateResult.Busy
+        self._step_wait_start = None
+        self._started = {}
+        for skill in step.skills:
+            skill_name = skill.data.stSkillDataDefault.strName
+            try:
+                parameters = {
+                    name: self._resolve(value)
+                    for name, value in step.parameters.get(skill_name, {}).items()
+                }
+                self._started[skill_name] = self._post_state_command(
+                    skill, "Start", parameters
+                )
+            except (KeyError, queue.Full) as e:
+                # stop skills already started, skills not started stay Idle
+                for started_skill in step.skills:
+                    if started_skill.data.stSkillDataDefault.strName in self._started:
+                        self._post_logged(started_skill, "Stop")
+                self._started = None
+                return self._set_error(1, f"Starting skill '{skill_name}' failed: {e}")
+        return EStateResult.Busy
+
+    def _set_outputs(self) -> EStateResult:
+        """set output parameters of macro skill from linked parameter values"""
+        for output_name, link in self.outputs.items():
+            try:
+                value = self._resolve(link)
+            except KeyError as e:
+                return self._set_error(1, f"Setting output '{output_name}' failed: {e}")
+            self.data.get_Parameter_byName(output_name, False).strValue = value
+        return EStateResult.Done
+
+    def _resolve(self, value: str) -> str:
+        """resolve parameter link "$<skill name>.<parameter name>" or return value
+
+        Raises:
+            KeyError: if linked skill is not completed or parameter unknown
+        """
+        if not value or not value.startswith(LINK_PREFIX):
+            return value
+        skill_name, _, parameter_name = value[len(LINK_PREFIX) :].partition(".")
+        if parameter_name not in self._values.get(skill_name, {}):
+            raise KeyError(f"Link '{value}' not resolvable!")
+        return self._values[skill_name][parameter_name]
+
+    def _post_active_step(self, command_name: str) -> None:
+        """post state command to all skills of active step"""
+        if self._started is None or self.step_index >= len(self.steps):
+            return
+        for skill in self.steps[self.step_index].skills:
+            self._post_logged(skill, command_name)
+
+    def _post_logged(self, skill: BaseSkill, command_name: str) -> None:
+        """post state command to skill, log if command queue is full"""
+        try:
+            self._post_state_command(skill, command_name)
+        except queue.Full as e:
+            if self.logger:
+                self.logger.error(
+                    f"Macro skill '{self.data.stSkillDataDefault.strName}': {command_name} of skill '{skill.data.stSkillDataDefault.strName}' failed, {e}"
+                )
+
+    def _post_state_command(
+        self, skill: BaseSkill, command_name: str, parameters: dict[str, str] = None
+    ) -> int:
+        """queue state command with parameters to skill, returns command sequence number"""
+        command = ST_SkillCommand()
+        setattr(command.stCommand_State, command_name, True)
+        return skill.data_exchange.post_command(command, parameters)
+
+    def _set_error(self, error_id: int, error_msg: str) -> EStateResult:
+        """set error of macro skill"""
+        self.data.stSkillState.bError = True
+        self.data.stSkillState.udiErrorID = error_id
+        self.data.stSkillState.strErrorMsg = error_msg
+        if self.logger:
+            self.logger.error(
+                f"Macro skill '{self.data.stSkillDataDefault.strName}': {error_msg}"
+            )
+        return EStateResult.Error
+
+
+def _parameter_values(parameters: list[ST_Parameter]) -> dict[str, str]:
+    """get parameter values by parameter name"""
+    return {parameter.strName: parameter.strValue for parameter in parameters}
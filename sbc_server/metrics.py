@@ -0,0 +1,344 @@
+import time
+import bisect
+import asyncio
+import logging
+import threading
+import dataclasses
+from typing import Callable
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from sbc_statemachine.skillstatemachinetypes import ESkillStates
+from .baseskill import BaseSkill, SkillEvent
+
+# upper bounds of histogram buckets in seconds
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_METRICS_PORT = 9464
+
+
+class Histogram:
+    """histogram of observed values with fixed buckets, written by one thread"""
+
+    def __init__(self, buckets: tuple[float] = DEFAULT_BUCKETS) -> None:
+        """histogram of observed values with fixed buckets, written by one thread
+
+        Args:
+            buckets (tuple[float], optional): sorted upper bounds of buckets. Defaults to DEFAULT_BUCKETS.
+        """
+        self.buckets = buckets
+        # count of values per bucket, last bucket +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """add value to histogram
+
+        Args:
+            value (float): observed value
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+@dataclasses.dataclass
+class Skill_Metrics:
+    """dataclass of metrics of one skill, written by its skill runtime thread"""
+
+    skill_name: str
+    cycle_duration: Histogram = None
+    read_duration: Histogram = None
+    write_duration: Histogram = None
+    command_latency: Histogram = None
+    # duration of left states by state name
+    state_durations: dict[str, Histogram] = dataclasses.field(default_factory=dict)
+    # number of entries by state name
+    state_entries: dict[str, int] = dataclasses.field(default_factory=dict)
+    exceptions: int = 0
+    applied_seq: int = 0
+
+
+class MetricsExporter:
+    """collects metrics of server and skill runtimes and serves them at http://<host>:<port>/metrics in Prometheus text format.
+    Per skill: cycle duration, read/write skill data duration (e.g. opc ua node reads and writes), command latency (queueing to applying),
+    state durations, state entries, executions and exceptions of run_skill.
+    Server: asyncua loop lag and connected opc ua clients, if running a SkillServer_OPCUA.
+    Metrics are recorded by the threads running the skills, the http server only renders them on scrape.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = DEFAULT_METRICS_PORT,
+        buckets: tuple[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        """collects metrics of server and skill runtimes and serves them at http://<host>:<port>/metrics in Prometheus text format
+
+        Args:
+            host (str, optional): http server host. Defaults to "127.0.0.1".
+            port (int, optional): http server port, 0 for any free port. Defaults to DEFAULT_METRICS_PORT.
+            buckets (tuple[float], optional): upper bounds of histogram buckets in seconds. Defaults to DEFAULT_BUCKETS.
+        """
+        self.host = host
+        self.port = port
+        self.buckets = buckets
+        self.skills: dict[str, Skill_Metrics] = {}
+        self.loop_lag: Histogram = None
+        # returns number of connected clients, set by opc ua server
+        self.session_count: Callable[[], int] = None
+        self.http_server: ThreadingHTTPServer = None
+        self._http_thread: threading.Thread = None
+
+    def add_skill(self, skill: BaseSkill) -> Skill_Metrics:
+        """collect metrics of skill
+
+        Args:
+            skill (BaseSkill): skill
+
+        Returns:
+            Skill_Metrics: metrics of skill, observe cycles with observe_cycle
+        """
+        skill_name = skill.data.stSkillDataDefault.strName
+        skill_metrics = Skill_Metrics(
+            skill_name=skill_name,
+            cycle_duration=Histogram(self.buckets),
+            read_duration=Histogram(self.buckets),
+            write_duration=Histogram(self.buckets),
+            command_latency=Histogram(self.buckets),
+            applied_seq=skill.data_exchange.applied_seq,
+        )
+        self.skills[skill_name] = skill_metrics
+
+        def state_change(event: SkillEvent) -> None:
+            if event.old_state_timestamp > 0.0:
+                if event.old_state.name not in skill_metrics.state_durations:
+                    skill_metrics.state_durations[event.old_state.name] = Histogram(
+                        self.buckets
+                    )
+                skill_metrics.state_durations[event.old_state.name].observe(
+                    event.timestamp - event.old_state_timestamp
+                )
+            skill_metrics.state_entries[event.new_state.name] = (
+                skill_metrics.state_entries.get(event.new_state.name, 0) + 1
+            )
+
+        skill.on_state_change(state_change)
+        return skill_metrics
+
+    def probe_loop(
+        self, loop: asyncio.AbstractEventLoop, interval: float = 0.1
+    ) -> None:
+        """observe lag of asyncio loop (e.g. asyncua loop): a callback is scheduled every interval, lag is its delay
+
+        Args:
+            loop (asyncio.AbstractEventLoop): running loop
+            interval (float, optional): probe interval in seconds. Defaults to 0.1.
+        """
+        self.loop_lag = Histogram(self.buckets)
+
+        def probe(scheduled: float) -> None:
+            now = time.perf_counter()
+            self.loop_lag.observe(max(now - scheduled, 0.0))
+            loop.call_later(interval, probe, now + interval)
+
+        loop.call_soon_threadsafe(probe, time.perf_counter())
+
+    def render(self) -> str:
+        """render all metrics in Prometheus text format
+
+        Returns:
+            str: metrics text
+        """
+        lines = []
+        skills = list(self.skills.values())
+        _render_histograms(
+            lines,
+            "sbc_skill_cycle_duration_seconds",
+            "duration of skill cycles (read skill data, run skill, write skill data)",
+            [({"skill": m.skill_name}, m.cycle_duration) for m in skills],
+        )
+        _render_histograms(
+            lines,
+            "sbc_skill_read_duration_seconds",
+            "duration of reading skill data extern (e.g. opc ua node reads)",
+            [({"skill": m.skill_name}, m.read_duration) for m in skills],
+        )
+        _render_histograms(
+            lines,
+            "sbc_skill_write_duration_seconds",
+            "duration of writing skill data extern (e.g. opc ua node writes)",
+            [({"skill": m.skill_name}, m.write_duration) for m in skills],
+        )
+        _render_histograms(
+            lines,
+            "sbc_skill_command_latency_seconds",
+            "time from queueing to applying of commands",
+            [({"skill": m.skill_name}, m.command_latency) for m in skills],
+        )
+        _render_histograms(
+            lines,
+            "sbc_skill_state_duration_seconds",
+            "time spent in state until transition",
+            [
+                ({"skill": m.skill_name, "state": state}, histogram)
+                for m in skills
+                for state, histogram in list(m.state_durations.items())
+            ],
+        )
+        _render_counters(
+            lines,
+            "sbc_skill_state_entries_total",
+            "number of transitions into state",
+            [
+                ({"skill": m.skill_name, "state": state}, count)
+                for m in skills
+                for state, count in list(m.state_entries.items())
+            ],
+        )
+        _render_counters(
+            lines,
+            "sbc_skill_executions_total",
+            "number of executions (transitions into Execute)",
+            [
+                (
+                    {"skill": m.skill_name},
+                    m.state_entries.get(ESkillStates.Execute.name, 0),
+                )
+                for m in skills
+            ],
+        )
+        _render_counters(
+            lines,
+            "sbc_skill_exceptions_total",
+            "number of exceptions while running skill",
+            [({"skill": m.skill_name}, m.exceptions) for m in skills],
+        )
+        if self.loop_lag is not None:
+            _render_histograms(
+                lines,
+                "sbc_asyncua_loop_lag_seconds",
+                "delay of callbacks in asyncua loop",
+                [({}, self.loop_lag)],
+            )
+        if self.session_count is not None:
+            lines.append("# HELP sbc_opcua_sessions number of connected opc ua clients")
+            lines.append("# TYPE sbc_opcua_sessions gauge")
+            lines.append(f"sbc_opcua_sessions {self.session_count()}")
+        return "\n".join(lines) + "\n"
+
+    def start(self) -> None:
+        """start http server in background thread"""
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", METRICS_CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logging.debug(f"MetricsExporter: {format % args}")
+
+        self.http_server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self.http_server.server_address[1]
+        self._http_thread = threading.Thread(
+            target=self.http_server.serve_forever,
+            name="MetricsExporter_Thread",
+            daemon=True,
+        )
+        self._http_thread.start()
+
+    def stop(self) -> None:
+        """stop http server"""
+        if self.http_server is None:
+            return
+        self.http_server.shutdown()
+        self.http_server.server_close()
+        self._http_thread.join()
+        self.http_server = None
+
+
+def observe_cycle(
+    skill_metrics: Skill_Metrics, skill: BaseSkill, duration: float
+) -> None:
+    """observe skill cycle, call from skill runtime thread after cycle
+
+    Args:
+        skill_metrics (Skill_Metrics): metrics of skill
+        skill (BaseSkill): skill
+        duration (float): execution duration of cycle in seconds of time.perf_counter
+    """
+    skill_metrics.cycle_duration.observe(duration)
+    data_exchange = skill.data_exchange
+    if data_exchange.applied_seq != skill_metrics.applied_seq:
+        skill_metrics.applied_seq = data_exchange.applied_seq
+        skill_metrics.command_latency.observe(data_exchange.applied_latency)
+
+
+def _labels(labels: dict[str, str], **extra: str) -> str:
+    """format labels, e.g. {skill="a",le="0.1"}"""
+    labels = {**labels, **extra}
+    if not labels:
+        return ""
+    values = ",".join(
+        f'{name}="{_escape(str(value))}"' for name, value in labels.items()
+    )
+    return "{" + values + "}"
+
+
+def _escape(value: str) -> str:
+    """escape label value"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _render_histograms(
+    lines: list[str],
+    name: str,
+    help: str,
+    histograms: list[tuple[dict[str, str], Histogram]],
+) -> None:
+    """append histogram metric family with cumulative buckets to lines"""
+    lines.append(f"# HELP {name} {help}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels, histogram in histograms:
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+        lines.append(f"{name}_bucket{_labels(labels, le='+Inf')} {histogram.count}")
+        lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+        lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+
+def _render_counters(
+    lines: list[str],
+    name: str,
+    help: str,
+    counters: list[tuple[dict[str, str], int]],
+) -> None:
+    """append counter metric family to lines"""
+    lines.append(f"# HELP {name} {help}")
+    lines.append(f"# TYPE {name} counter")
+    for labels, value in counters:
+        lines.append(f"{name}{_labels(labels)} {value}")
@@ -0,0 +1,329 @@
+import struct
+import typing
+import weakref
+import threading
+import dataclasses
+from collections import OrderedDict
+from typing import Callable, Iterable
+from asyncua import ua
+from asyncua.ua import ua_binary
+from asyncua.ua.ua_binary import Primitives
+
+# struct format characters of fixed size opc ua types, packed little endian
+FIXED_SIZE_FORMATS = {
+    ua.Boolean: "?",
+    ua.SByte: "b",
+    ua.Byte: "B",
+    ua.Int16: "h",
+    ua.UInt16: "H",
+    ua.Int32: "i",
+    ua.UInt32: "I",
+    ua.Int64: "q",
+    ua.UInt64: "Q",
+    ua.Float: "f",
+    ua.Double: "d",
+}
+
+ENCODED_CACHE_SIZE = 1024  # max number of published values with cached encoding
+
+SERIALIZERS: dict[type, Callable] = {}  # registered serializers
+DESERIALIZERS: dict[type, Callable] = {}  # registered deserializers
+_CODECS: dict[type, tuple[Callable, Callable]] = (
+    {}
+)  # generated (encoder, decoder) per type
+
+_original_create_dataclass_serializer = ua_binary.create_dataclass_serializer
+_original_create_dataclass_deserializer = ua_binary._create_dataclass_deserializer
+
+
+class EncodedBytesCache:
+    """bounded cache of encoded bytes of published values.
+    Only values marked with publish are cached: the skill server creates a new value object for every
+    changed node value and never mutates it after the write, so all subscribed clients share one encoding.
+    Values not marked as published (e.g. values decoded from client writes) are encoded on every call.
+    """
+
+    def __init__(self, maxsize: int = ENCODED_CACHE_SIZE) -> None:
+        """bounded cache of encoded bytes of published values.
+
+        Args:
+            maxsize (int, optional): max number of published values. Defaults to ENCODED_CACHE_SIZE.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[int, list] = OrderedDict()  # id -> [weakref, bytes]
+        self._lock = threading.Lock()
+
+    def publish(self, obj) -> None:
+        """mark obj as published value, obj must not be mutated afterwards
+
+        Args:
+            obj (): value object, e.g. opc ua dataclass written to a node
+        """
+        with self._lock:
+            self._entries[id(obj)] = [weakref.ref(obj), None]
+            self._entries.move_to_end(id(obj))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def encode(self, obj, encoder: Callable) -> bytes:
+        """get encoded bytes of obj, cached if obj is a published value
+
+        Args:
+            obj (): value object
+            encoder (Callable): encoder of type of obj
+
+        Returns:
+            bytes: encoded bytes
+        """
+        with self._lock:
+            entry = self._entries.get(id(obj))
+            if entry is not None and entry[0]() is obj:
+                self._entries.move_to_end(id(obj))
+                if entry[1] is not None:
+                    self.hits += 1
+                    return entry[1]
+                self.misses += 1
+            else:
+                entry = None
+        data = encoder(obj)
+        if entry is not None:
+            entry[1] = data
+        return data
+
+    def clear(self) -> None:
+        """remove all published values"""
+        with self._lock:
+            self._entries.clear()
+
+
+ENCODED_BYTES_CACHE = EncodedBytesCache()
+
+
+def register_skill_type_codecs(types: Iterable[type]) -> None:
+    """generate type specialised binary encoders/decoders for opc ua skill types (ST_*_py)
+    and register them for asyncua's dataclass (de)serializer lookup. Called by register_skill_type_to_asyncua_server
+    for the types it registers, other types are (de)serialized by asyncua as before.
+    Encodings of published values are cached (ENCODED_BYTES_CACHE), other values are encoded on every call.
+    Nested types are encoded inline by the generated code of the outer type.
+
+    Args:
+        types (Iterable[type]): opc ua dataclass types, e.g. values of skillserver_opcua.OPCUA_Types
+    """
+    for cls in types:
+        codec = _create_codec(cls)
+        if codec is None:
+            continue
+        SERIALIZERS[cls] = _create_cached_encoder(codec[0])
+        DESERIALIZERS[cls] = codec[1]
+    # clear cached asyncua (de)serializers, which could reference generic serializers
+    ua_binary.create_type_serializer.cache_clear()
+    ua_binary.create_list_serializer.cache_clear()
+    ua_binary._create_type_deserializer.cache_clear()
+    if ua_binary.create_dataclass_serializer is not _create_dataclass_serializer:
+        ua_binary.create_dataclass_serializer = _create_dataclass_serializer
+        ua_binary._create_dataclass_deserializer = _create_dataclass_deserializer
+
+
+def _create_dataclass_serializer(dataclazz):
+    """asyncua dataclass serializer lookup, returning registered serializers"""
+    serializer = SERIALIZERS.get(dataclazz)
+    if serializer is None:
+        return _original_create_dataclass_serializer(dataclazz)
+    return serializer
+
+
+def _create_dataclass_deserializer(objtype):
+    """asyncua dataclass deserializer lookup, returning registered deserializers"""
+    deserializer = DESERIALIZERS.get(objtype)
+    if deserializer is None:
+        return _original_create_dataclass_deserializer(objtype)
+    return deserializer
+
+
+def _create_cached_encoder(encoder: Callable) -> Callable:
+    """wrap encoder with ENCODED_BYTES_CACHE lookup of published values"""
+
+    def encode_cached(obj) -> bytes:
+        return ENCODED_BYTES_CACHE.encode(obj, encoder)
+
+    return encode_cached
+
+
+def _create_codec(cls) -> tuple[Callable, Callable]:
+    """get generated encoder and decoder of opc ua dataclass cls, generated once per type
+
+    Returns:
+        tuple[Callable, Callable]: (encoder, decoder) or None, if cls contains unsupported field types
+    """
+    if cls in _CODECS:
+        return _CODECS[cls]
+    encoder = _create_encoder(cls)
+    decoder = _create_decoder(cls)
+    if encoder is None or decoder is None:
+        return None
+    _CODECS[cls] = (encoder, decoder)
+    return _CODECS[cls]
+
+
+def _resolve_fields(cls) -> list[tuple[str, object]]:
+    """get field names and resolved types of opc ua dataclass"""
+    try:
+        hints = typing.get_type_hints(cls, {"ua": ua})
+    except NameError:
+        hints = typing.get_type_hints(cls)
+    return [(field.name, hints[field.name]) for field in dataclasses.fields(cls)]
+
+
+def _field_kind(ftype) -> str:
+    """get kind of field type: 'fixed', 'string', 'struct', 'list' or None if not supported"""
+    if ftype in FIXED_SIZE_FORMATS:
+        return "fixed"
+    if ftype is ua.String:
+        return "string"
+    if typing.get_origin(ftype) in (list, typing.List):
+        elem_type = typing.get_args(ftype)[0]
+        if _field_kind(elem_type) in ("struct", "string"):
+            return "list"
+        return None
+    if dataclasses.is_dataclass(ftype) and not issubclass(ftype, ua.UaUnion):
+        return "struct"
+    return None
+
+
+def _create_encoder(cls) -> Callable:
+    """generate encoder function for opc ua dataclass cls.
+    Consecutive fixed size fields are packed with one struct.Struct.
+
+    Returns:
+        Callable: encoder or None, if cls contains unsupported field types
+    """
+    fields = _resolve_fields(cls)
+    if any(name == "Encoding" or _field_kind(ftype) is None for name, ftype in fields):
+        return None
+    namespace = {
+        "_pack_string": Primitives.String.pack,
+        "_pack_int32": Primitives.Int32.pack,
+    }
+    parts = []
+    fixed: list[tuple[str, object]] = []
+
+    def _flush_fixed():
+        if not fixed:
+            return
+        fmt = "<" + "".join(FIXED_SIZE_FORMATS[ftype] for _, ftype in fixed)
+        struct_name = f"_s{len(namespace)}"
+        namespace[struct_name] = struct.Struct(fmt)
+        args = ", ".join(f'd["{name}"]' for name, _ in fixed)
+        parts.append(f"{struct_name}.pack({args})")
+        fixed.clear()
+
+    for name, ftype in fields:
+        kind = _field_kind(ftype)
+        if kind == "fixed":
+            fixed.append((name, ftype))
+            continue
+        _flush_fixed()
+        if kind == "string":
+            parts.append(f'_pack_string(d["{name}"])')
+        elif kind == "struct":
+            codec = _create_codec(ftype)
+            if codec is None:
+                return None
+            enc_name = f"_e{len(namespace)}"
+            namespace[enc_name] = codec[0]
+            parts.append(f'{enc_name}(d["{name}"])')
+        else:
+            elem_type = typing.get_args(ftype)[0]
+            if _field_kind(elem_type) == "string":
+                encoder = Primitives.String.pack
+            else:
+                codec = _create_codec(elem_type)
+                encoder = codec[0] if codec is not None else None
+            if encoder is None:
+                return None
+            enc_name = f"_e{len(namespace)}"
+            namespace[enc_name] = encoder
+            parts.append(
+                f'(_pack_int32(-1) if d["{name}"] is None else '
+                f'_pack_int32(len(d["{name}"])) + b"".join([{enc_name}(v) for v in d["{name}"]]))'
+            )
+    _flush_fixed()
+    if not parts:
+        parts.append('b""')
+    source = (
+        "def encode(obj):\n"
+        "    d = obj.__dict__\n"
+        f"    return b\"\".join(({', '.join(parts)},))\n"
+    )
+    exec(source, namespace)
+    return namespace["encode"]
+
+
+def _create_decoder(cls) -> Callable:
+    """generate decoder function for opc ua dataclass cls.
+    Consecutive fixed size fields are unpacked with one struct.Struct.
+
+    Returns:
+        Callable: decoder or None, if cls contains unsupported field types
+    """
+    fields = _resolve_fields(cls)
+    if any(name == "Encoding" or _field_kind(ftype) is None for name, ftype in fields):
+        return None
+    namespace = {
+        "_cls": cls,
+        "_unpack_string": Primitives.String.unpack,
+        "_unpack_int32": Primitives.Int32.unpack,
+    }
+    lines = []
+    fixed: list[str] = []
+    fixed_formats: list[str] = []
+
+    def _flush_fixed():
+        if not fixed:
+            return
+        struct_name = f"_s{len(namespace)}"
+        namespace[struct_name] = struct.Struct("<" + "".join(fixed_formats))
+        targets = ", ".join(f"v_{name}" for name in fixed) + ","
+        lines.append(
+            f"    {targets} = {struct_name}.unpack(data.read({struct_name}.size))"
+        )
+        fixed.clear()
+        fixed_formats.clear()
+
+    for name, ftype in fields:
+        kind = _field_kind(ftype)
+        if kind == "fixed":
+            fixed.append(name)
+            fixed_formats.append(FIXED_SIZE_FORMATS[ftype])
+            continue
+        _flush_fixed()
+        if kind == "string":
+            lines.append(f"    v_{name} = _unpack_string(data)")
+        elif kind == "struct":
+            codec = _create_codec(ftype)
+            if codec is None:
+                return None
+            dec_name = f"_d{len(namespace)}"
+            namespace[dec_name] = codec[1]
+            lines.append(f"    v_{name} = {dec_name}(data)")
+        else:
+            elem_type = typing.get_args(ftype)[0]
+            if _field_kind(elem_type) == "string":
+                decoder = Primitives.String.unpack
+            else:
+                codec = _create_codec(elem_type)
+                decoder = codec[1] if codec is not None else None
+            if decoder is None:
+                return None
+            dec_name = f"_d{len(namespace)}"
+            namespace[dec_name] = decoder
+            lines.append(
+                f"    v_{name} = [{dec_name}(data) for _ in range(_unpack_int32(data))]"
+            )
+    _flush_fixed()
+    kwargs = ", ".join(f"{name}=v_{name}" for name, _ in fields)
+    source = "def decode(data):\n" + "\n".join(lines) + f"\n    return _cls({kwargs})\n"
+    exec(source, namespace)
+    return namespace["decode"]
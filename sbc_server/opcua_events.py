@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import dataclasses
+from datetime import datetime, timezone
+from asyncua.sync import Server, SyncNode, ua
+from .baseskill import BaseSkill, SkillEvent
+
+SKILL_EVENT_TYPE_NAME = "SkillStateTransitionEventType"
+# (property name, variant type) of skill event type, additional to BaseEventType
+SKILL_EVENT_PROPERTIES = [
+    ("SkillName", ua.VariantType.String),
+    ("OldState", ua.VariantType.Int32),
+    ("NewState", ua.VariantType.Int32),
+    ("Command", ua.VariantType.Int32),
+    ("ErrorID", ua.VariantType.UInt32),
+    ("ErrorMsg", ua.VariantType.String),
+    ("ClockTime", ua.VariantType.Double),
+    ("StateDuration", ua.VariantType.Double),
+]
+SKILL_EVENT_SEVERITY = 100
+SKILL_ERROR_EVENT_SEVERITY = 800
+
+
+@dataclasses.dataclass
+class Skill_Event_Handle:
+    """dataclass for storing event generator of each skill"""
+
+    skill_name: str
+    # asyncua EventGenerators emitting at skill node and at server object
+    generators: list = dataclasses.field(default_factory=list)
+    # serialises triggers, the event objects of the generators are reused
+    lock: asyncio.Lock = dataclasses.field(default_factory=asyncio.Lock)
+    trigger_count: int = 0
+
+
+class SkillEventPublisher:
+    """emits opc ua events of type SkillStateTransitionEventType on every state transition and error of skills.
+    Events are created in the skill runtime thread by observer callbacks of BaseSkill and triggered in the asyncua loop without waiting,
+    so the skill cycle is not blocked. The event time is taken at the transition with microsecond resolution.
+    """
+
+    def __init__(self, server: Server, namespaceIndex: int = 2) -> None:
+        """emits opc ua events of type SkillStateTransitionEventType on every state transition and error of skills.
+
+        Args:
+            server (Server): started asyncua.sync.Server object
+            namespaceIndex (int, optional): opc ua namespace index of event type. Defaults to 2.
+        """
+        self.server = server
+        self.loop = server.tloop.loop
+        self.event_type: SyncNode = SyncNode(
+            server.tloop,
+            server.tloop.post(
+                server.aio_obj.create_custom_event_type(
+                    namespaceIndex,
+                    SKILL_EVENT_TYPE_NAME,
+                    ua.ObjectIds.BaseEventType,
+                    SKILL_EVENT_PROPERTIES,
+                )
+            ),
+        )
+        self.handles: dict[str, Skill_Event_Handle] = {}
+
+    def add_skill(self, skill: BaseSkill, skill_node: SyncNode) -> None:
+        """emit events of skill with skill_node as source node
+
+        Args:
+            skill (BaseSkill): skill
+            skill_node (SyncNode): skill folder node, subscribe events there or at the server object
+        """
+        skill_name = skill.data.stSkillDataDefault.strName
+        handle = Skill_Event_Handle(skill_name=skill_name)
+        for emitting_node in [skill_node, self.server.nodes.server]:
+            generator = self.server.tloop.post(
+                self.server.aio_obj.get_event_generator(
+                    self.event_type.aio_obj, emitting_node.aio_obj
+                )
+            )
+            # skill node is source of events emitted at server object as well
+            generator.event.SourceNode = skill_node.nodeid
+            generator.event.SourceName = skill_name
+            handle.generators.append(generator)
+        self.server.nodes.server.add_reference(skill_node, ua.ObjectIds.HasEventSource)
+        self.handles[skill_name] = handle
+        skill.on_state_change(self._callback(handle, SKILL_EVENT_SEVERITY))
+        skill.on_error(self._callback(handle, SKILL_ERROR_EVENT_SEVERITY))
+
+    def _callback(self, handle: Skill_Event_Handle, severity: int):
+        """create observer callback posting the event to the asyncua loop"""
+
+        def callback(event: SkillEvent) -> None:
+            time = datetime.now(timezone.utc)
+            asyncio.run_coroutine_threadsafe(
+                self._trigger(handle, event, severity, time), self.loop
+            )
+
+        return callback
+
+    async def _trigger(
+        self,
+        handle: Skill_Event_Handle,
+        event: SkillEvent,
+        severity: int,
+        time: datetime,
+    ) -> None:
+        """set fields of event object and trigger event inside asyncua loop"""
+        if severity == SKILL_ERROR_EVENT_SEVERITY:
+            message = f"Skill '{event.skill_name}' error {event.error_id} in state {event.new_state.name}: {event.error_msg}"
+        else:
+            message = f"Skill '{event.skill_name}' {event.old_state.name} -> {event.new_state.name}"
+        async with handle.lock:
+            try:
+                for generator in handle.generators:
+                    ua_event = generator.event
+                    ua_event.SkillName = event.skill_name
+                    ua_event.OldState = int(event.old_state)
+                    ua_event.NewState = int(event.new_state)
+                    ua_event.Command = int(event.command)
+                    ua_event.ErrorID = event.error_id
+                    ua_event.ErrorMsg = event.error_msg
+                    ua_event.ClockTime = event.timestamp
+                    ua_event.StateDuration = event.timestamp - event.old_state_timestamp
+                    ua_event.Severity = severity
+                    await generator.trigger(time_attr=time, message=message)
+                handle.trigger_count += 1
+            except Exception as e:
+                logging.error(
+                    f"Error triggering event of skill '{event.skill_name}': {e}"
+                )
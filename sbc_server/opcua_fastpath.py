@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import threading
+from datetime import datetime, timezone
+from asyncua.sync import Server, SyncNode, ua
+
+
+class AddressSpaceAccess:
+    """direct access to value attributes in the address space of a running asyncua.sync.Server.
+    Reads and writes are done in the calling thread without scheduling a coroutine onto the asyncua loop thread.
+    Data change notifications of subscribed clients are posted to the asyncua loop without waiting.
+    Writes are not synchronised with client writes in the asyncua loop (last write wins), use compare_and_write
+    for nodes written by clients. Nodes with a value_setter are written through the asyncua loop.
+    """
+
+    def __init__(self, server: Server) -> None:
+        """direct access to value attributes in the address space of a running asyncua.sync.Server.
+
+        Args:
+            server (Server): started asyncua.sync.Server object
+        """
+        self.aspace = server.aio_obj.iserver.aspace
+        self.loop = server.tloop.loop
+        self._lock = threading.Lock()
+
+    def read(self, nodeid: ua.NodeId) -> ua.DataValue:
+        """read value attribute of node
+
+        Args:
+            nodeid (ua.NodeId): node id
+
+        Returns:
+            ua.DataValue: data value of node
+        """
+        return self.aspace.read_attribute_value(nodeid, ua.AttributeIds.Value)
+
+    def write(self, nodeid: ua.NodeId, datavalue: ua.DataValue) -> None:
+        """write value attribute of node and notify subscribed clients.
+        The variant type is checked like in the address space's write path.
+
+        Args:
+            nodeid (ua.NodeId): node id
+            datavalue (ua.DataValue): new data value
+
+        Raises:
+            ua.UaStatusCodeError: BadTypeMismatch, if variant type does not match the node's value
+        """
+        node = self.aspace[nodeid]
+        attval = node.attributes[ua.AttributeIds.Value]
+        if attval.value_setter is not None:
+            self.compare_and_write(nodeid, datavalue)
+            return
+        if not self.aspace._is_expected_variant_type(datavalue, attval, node):
+            raise ua.UaStatusCodeError(ua.StatusCodes.BadTypeMismatch)
+        # serialises fast path writers, not client writes in the asyncua loop
+        with self._lock:
+            attval.value = datavalue
+            attval.value_callback = None
+            callbacks = list(attval.datachange_callbacks.items())
+        if callbacks:
+            asyncio.run_coroutine_threadsafe(
+                self._notify(callbacks, datavalue), self.loop
+            )
+
+    def compare_and_write(
+        self,
+        nodeid: ua.NodeId,
+        datavalue: ua.DataValue,
+        expected: ua.DataValue = None,
+    ) -> bool:
+        """write value attribute of node inside the asyncua loop, only if the current data value of the node is expected.
+        Client writes are processed in the asyncua loop as well, so check and write are atomic.
+
+        Args:
+            nodeid (ua.NodeId): node id
+            datavalue (ua.DataValue): new data value
+            expected (ua.DataValue, optional): expected current data value object, e.g. data value read before. None to write unconditionally. Defaults to None.
+
+        Returns:
+            bool: True, if written
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self._compare_and_write(nodeid, datavalue, expected), self.loop
+        )
+        return future.result()
+
+    async def _compare_and_write(
+        self, nodeid: ua.NodeId, datavalue: ua.DataValue, expected: ua.DataValue
+    ) -> bool:
+        """compare and write inside asyncua loop, see compare_and_write"""
+        if (
+            expected is not None
+            and self.aspace.read_attribute_value(nodeid, ua.AttributeIds.Value)
+            is not expected
+        ):
+            return False
+        await self.aspace.write_attribute_value(
+            nodeid, ua.AttributeIds.Value, datavalue
+        )
+        return True
+
+    async def _notify(self, callbacks: list, datavalue: ua.DataValue) -> None:
+        """call data change callbacks (monitored items) inside asyncua loop"""
+        for handle, callback in callbacks:
+            try:
+                await callback(handle, datavalue)
+            except Exception as e:
+                logging.error(f"Error calling datachange callback {handle}: {e}")
+
+
+class FastNode:
+    """node handle with read_value/write_value through AddressSpaceAccess.
+    All other SyncNode methods are delegated to the wrapped SyncNode.
+    """
+
+    def __init__(self, sync_node: SyncNode, access: AddressSpaceAccess) -> None:
+        """node handle with read_value/write_value through AddressSpaceAccess.
+
+        Args:
+            sync_node (SyncNode): node to wrap
+            access (AddressSpaceAccess): direct address space access of server
+        """
+        self.sync_node = sync_node
+        self.access = access
+        self.nodeid = sync_node.nodeid
+
+    def __getattr__(self, name: str):
+        return getattr(self.sync_node, name)
+
+    def read_data_value(self) -> ua.DataValue:
+        """read data value of node"""
+        return self.access.read(self.nodeid)
+
+    def read_value(self):
+        """read value of node"""
+        return self.access.read(self.nodeid).Value.Value
+
+    def write_value(self, value, varianttype: ua.VariantType = None) -> None:
+        """write value of node, see SyncNode.write_value
+
+        Args:
+            value (): python value, ua.Variant or ua.DataValue
+            varianttype (ua.VariantType, optional): variant type of value. Defaults to None.
+        """
+        self.access.write(self.nodeid, to_datavalue(value, varianttype))
+
+
+def to_datavalue(value, varianttype: ua.VariantType = None) -> ua.DataValue:
+    """convert value to data value with source and server timestamp
+
+    Args:
+        value (): python value, ua.Variant or ua.DataValue
+        varianttype (ua.VariantType, optional): variant type of value. Defaults to None.
+
+    Returns:
+        ua.DataValue: data value
+    """
+    if isinstance(value, ua.DataValue):
+        return value
+    if not isinstance(value, ua.Variant):
+        value = ua.Variant(value, varianttype)
+    now = datetime.now(timezone.utc)
+    return ua.DataValue(value, SourceTimestamp=now, ServerTimestamp=now)
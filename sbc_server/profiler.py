@@ -0,0 +1,85 @@
+import io
+import pstats
+import logging
+import cProfile
+import threading
+import dataclasses
+from typing import Callable
+from .clock import Clock
+
+# number of functions in stats summary
+PROFILE_STATS_LINES = 30
+
+
+@dataclasses.dataclass
+class Profile_Request:
+    """dataclass of a profiling request for one runtime thread or the server loop, see SkillServer.profile
+
+    Attributes:
+        target (str): skill name or server name
+        duration (float): profiling duration in seconds of clock time
+        path (str): file path of pstats dump, None for no file
+        end_time (float): clock time profiling ends, set by first profiled cycle
+        profile (cProfile.Profile): profile of profiled cycles
+        stats (str): summary of stats sorted by cumulative time, set when done
+        done (threading.Event): set when profiling is done
+    """
+
+    target: str
+    duration: float
+    path: str = None
+    end_time: float = None
+    profile: cProfile.Profile = None
+    stats: str = ""
+    done: threading.Event = dataclasses.field(default_factory=threading.Event)
+
+
+def profile_cycle(request: Profile_Request, clock: Clock, cycle: Callable) -> bool:
+    """run cycle with cProfile enabled in calling thread, finish request after its duration.
+    Only cycles are profiled, not the sleep between cycles.
+    If cProfile can not be enabled (e.g. other profiler active on python 3.12+), the cycle is run without profiling and the request is finished.
+
+    Args:
+        request (Profile_Request): profiling request
+        clock (Clock): clock of runtime thread
+        cycle (Callable): cycle method, e.g. SkillRuntimeThread.run_cycle
+
+    Returns:
+        bool: True, if request is done
+    """
+    if request.profile is None:
+        request.profile = cProfile.Profile()
+        request.end_time = clock.time() + request.duration
+    try:
+        request.profile.enable()
+    except ValueError as e:
+        logging.error(f"Profiling '{request.target}' failed: {e}")
+        cycle()
+        request.profile = None
+        request.stats = f"Profiling failed: {e}"
+        finish_profile(request)
+        return True
+    try:
+        cycle()
+    finally:
+        request.profile.disable()
+    if clock.time() < request.end_time:
+        return False
+    finish_profile(request)
+    return True
+
+
+def finish_profile(request: Profile_Request) -> None:
+    """write stats of request to file and summary, set done
+
+    Args:
+        request (Profile_Request): profiling request
+    """
+    if request.profile is not None:
+        if request.path:
+            request.profile.dump_stats(request.path)
+        stream = io.StringIO()
+        stats = pstats.Stats(request.profile, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_STATS_LINES)
+        request.stats = stream.getvalue()
+    request.done.set()
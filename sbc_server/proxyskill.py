@@ -0,0 +1,471 @@
+import copy
+import time
+import queue
+import logging
+import collections
+import threading
+import multiprocessing
+from typing import Callable
+from sbc_statemachine.skilldatahandle import SkillDataHandle
+from sbc_statemachine.skilldatatypes import ST_SkillCommand
+from sbc_statemachine.skillstatemachinetypes import ESkillStates
+from .baseskill import BaseSkill
+from .cycletimer import CycleTimer
+from .skilldataexchange import SNAPSHOT_STRUCTS, SkillCommandRequest
+from .skillruntimethread import SkillRuntimeThread
+
+# max time in seconds for worker process to create and to stop its skills
+WORKER_START_TIMEOUT = 30.0
+WORKER_STOP_TIMEOUT = 10.0
+
+
+class SkillWorker:
+    """runs skills in a separate worker process, all skills of the worker share one cycle.
+    Skills are represented in the server process by ProxySkill objects, which exchange commands and skill data with the worker over a pipe.
+    The worker process is restarted by check, if it crashed or stopped sending skill data.
+    Proxy skills are created before the worker process is started (create_proxies), from skills created once in the server process.
+    Skill factories must be picklable (e.g. module level functions or skill classes), the worker process is spawned.
+    """
+
+    def __init__(
+        self,
+        skill_factories: list[Callable[[], BaseSkill]],
+        cycletime: float = 0.1,
+        heartbeat_timeout: float = 5.0,
+        name: str = "SkillWorker",
+        logger: logging.Logger = None,
+    ) -> None:
+        """runs skills in a separate worker process, all skills of the worker share one cycle.
+
+        Args:
+            skill_factories (list[Callable[[], BaseSkill]]): picklable callables creating the skills of worker
+            cycletime (float, optional): cycletime of worker. Defaults to 0.1.
+            heartbeat_timeout (float, optional): restart worker, if no skill data received for this time in seconds. Defaults to 5.0.
+            name (str, optional): name of worker process. Defaults to "SkillWorker".
+            logger (logging.Logger, optional): logger for logging. Defaults to None.
+        """
+        self.skill_factories = skill_factories
+        self.cycletime = cycletime
+        self.heartbeat_timeout = heartbeat_timeout
+        self.name = name
+        self.logger = logger
+        self.process: multiprocessing.Process = None
+        self.proxies: dict[str, ProxySkill] = {}
+        self.restart_count = 0
+        self.last_heartbeat = 0.0
+        self.stopping = False
+        self._connection = None
+        self._receiver: threading.Thread = None
+        self._send_lock = threading.Lock()
+        self._data_lock = threading.Lock()
+        self._latest: dict[str, dict[str, object]] = {}
+        # skill data structs of started worker process and its generation by skill name, taken by proxy skills (take_restart)
+        self._restarted: dict[str, tuple[dict[str, object], int]] = {}
+        # number of worker processes started, commands are sent to the latest
+        self.generation = 0
+        self._restart_thread: threading.Thread = None
+
+    def create_proxies(self) -> dict[str, "ProxySkill"]:
+        """create proxy skills without starting the worker process. Skills are created by the skill factories in the calling process
+        to take their skill data and are shut down right after, start refreshes the proxies with the skill data of the worker.
+
+        Returns:
+            dict[str, ProxySkill]: proxy skills by skill name
+        """
+        for skill_factory in self.skill_factories:
+            skill = skill_factory()
+            skill_name = skill.data.stSkillDataDefault.strName
+            if skill_name not in self.proxies:
+                self.proxies[skill_name] = ProxySkill(self, _skill_structs(skill, {}))
+            skill.shutdown()
+        return self.proxies
+
+    def start(self) -> None:
+        """start worker process and wait for its skills. Creates missing proxy skills,
+        existing proxy skills take the skill data of the started worker in their next cycle (take_restart).
+
+        Raises:
+            RuntimeError: if worker process does not start its skills in time
+        """
+        context = multiprocessing.get_context("spawn")
+        with self._send_lock:
+            self._connection, worker_connection = context.Pipe()
+            self.generation += 1
+        self.process = context.Process(
+            target=_run_worker,
+            args=(worker_connection, self.skill_factories, self.cycletime),
+            name=self.name,
+            daemon=True,
+        )
+        self.stopping = False
+        self.process.start()
+        worker_connection.close()
+        if not self._connection.poll(WORKER_START_TIMEOUT):
+            self.process.kill()
+            raise RuntimeError(f"Worker '{self.name}' did not start its skills!")
+        _, skill_data = self._connection.recv()
+        with self._data_lock:
+            self._latest = {skill_name: {} for skill_name in skill_data}
+            for skill_name, structs in skill_data.items():
+                if skill_name in self.proxies:
+                    self._restarted[skill_name] = (structs, self.generation)
+        for skill_name, structs in skill_data.items():
+            if skill_name not in self.proxies:
+                self.proxies[skill_name] = ProxySkill(self, structs)
+        self.last_heartbeat = time.perf_counter()
+        self._receiver = threading.Thread(
+            target=self._receive, name=self.name + "_Receiver", daemon=True
+        )
+        self._receiver.start()
+
+    def _receive(self) -> None:
+        """receive skill data of worker process until pipe is closed"""
+        connection = self._connection
+        while True:
+            try:
+                _, skill_data = connection.recv()
+            except (EOFError, OSError):
+                break
+            with self._data_lock:
+                for skill_name, structs in skill_data.items():
+                    self._latest[skill_name].update(structs)
+            self.last_heartbeat = time.perf_counter()
+
+    def send_command(
+        self,
+        skill_name: str,
+        command: ST_SkillCommand,
+        parameters: dict[str, str] = None,
+        seq: int = 0,
+    ) -> int:
+        """queue command with parameter values for skill in worker process
+
+        Args:
+            skill_name (str): skill name
+            command (ST_SkillCommand): skill command with command flags set
+            parameters (dict[str, str], optional): parameter values by parameter name. Defaults to None.
+            seq (int, optional): command sequence number of proxy skill, reported back as "command_seq" in skill data when applied by worker. Defaults to 0 (not reported).
+
+        Returns:
+            int: generation of worker process the command was sent to, 0 if dropped
+        """
+        with self._send_lock:
+            if self._connection is None:
+                return 0  # not started
+            try:
+                self._connection.send(("command", skill_name, command, parameters, seq))
+            except (OSError, ValueError) as e:
+                # worker not running, restarted by check
+                if self.logger:
+                    self.logger.warning(
+                        f"Worker '{self.name}': command for skill '{skill_name}' dropped, {e}"
+                    )
+                return 0
+            return self.generation
+
+    def take_data(self, skill_name: str) -> dict[str, object]:
+        """take skill data structs of skill received since last call
+
+        Args:
+            skill_name (str): skill name
+
+        Returns:
+            dict[str, object]: struct name -> struct
+        """
+        with self._data_lock:
+            structs = self._latest[skill_name]
+            self._latest[skill_name] = {}
+        return structs
+
+    def take_restart(self, skill_name: str) -> tuple[dict[str, object], int]:
+        """take skill data structs of skill of (re)started worker process, call from runtime of proxy skill
+
+        Args:
+            skill_name (str): skill name
+
+        Returns:
+            tuple[dict[str, object], int]: struct name -> struct and generation of worker process, None if not (re)started since last call
+        """
+        with self._data_lock:
+            return self._restarted.pop(skill_name, None)
+
+    def is_alive(self) -> bool:
+        """check if worker process is running and sending skill data
+
+        Returns:
+            bool: True, if worker is alive
+        """
+        return (
+            self.process is not None
+            and self.process.is_alive()
+            and time.perf_counter() - self.last_heartbeat < self.heartbeat_timeout
+        )
+
+    def check(self) -> bool:
+        """check health of worker process, restart crashed or hanging worker in a background thread. Call cyclic (e.g. server cycle).
+
+        Returns:
+            bool: True, if restart of worker was started
+        """
+        if self.stopping or self.process is None or self.is_alive():
+            return False
+        if self._restart_thread is not None and self._restart_thread.is_alive():
+            return False
+        if self.logger:
+            self.logger.warning(
+                f"Worker '{self.name}' not alive (exitcode {self.process.exitcode}), restarting."
+            )
+        self._restart_thread = threading.Thread(
+            target=self._restart, name=self.name + "_Restart", daemon=True
+        )
+        self._restart_thread.start()
+        return True
+
+    def _restart(self) -> None:
+        """kill worker process and start it again, failures are logged and retried by next check"""
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self._connection.close()
+        self.restart_count += 1
+        try:
+            self.start()
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"Restart of worker '{self.name}' failed: {e}")
+
+    def stop(self) -> None:
+        """stop skills and worker process"""
+        self.stopping = True
+        if self._restart_thread is not None:
+            self._restart_thread.join()
+        if self.process is None:
+            return
+        with self._send_lock:
+            try:
+                self._connection.send(("stop",))
+            except (OSError, ValueError):
+                pass
+        self.process.join(WORKER_STOP_TIMEOUT)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self._connection.close()
+        if self._receiver is not None:
+            self._receiver.join()
+
+
+class ProxySkill(BaseSkill):
+    """stand-in of a skill running in a worker process, see SkillWorker.
+    Forwards queued commands and changed parameter values to the worker and takes the latest skill data of the worker each cycle.
+    The state machine of the proxy itself is not used, state is taken from stSkillState.
+    """
+
+    def __init__(self, worker: SkillWorker, structs: dict[str, object]) -> None:
+        """stand-in of a skill running in a worker process, see SkillWorker.
+
+        Args:
+            worker (SkillWorker): worker running the skill
+            structs (dict[str, object]): skill data structs of skill in worker
+        """
+        self.worker = worker
+        data = SkillDataHandle()
+        for struct_name, struct in structs.items():
+            setattr(data, struct_name, struct)
+        super().__init__(data=data, logger=worker.logger)
+        # commands forwarded to worker and generation of worker process sent to, not applied yet
+        self._forwarded: collections.deque[tuple[SkillCommandRequest, int]] = (
+            collections.deque()
+        )
+        self.reinit(structs)
+
+    def reinit(self, structs: dict[str, object]) -> None:
+        """take skill data structs of (restarted) skill in worker.
+        Call from skill runtime only (run_cycle) or before skill runtime is started.
+
+        Args:
+            structs (dict[str, object]): skill data structs of skill in worker
+        """
+        for struct_name, struct in structs.items():
+            if struct_name != "stSkillCommand":
+                setattr(self.data, struct_name, copy.deepcopy(struct))
+        self._parameters_sent = _parameter_values(self.data)
+        self.data_exchange.publish(self.data)
+
+    def run_cycle(self):
+        """forward changed parameters and commands to worker, take latest skill data of worker"""
+        skill_name = self.data.stSkillDataDefault.strName
+        # skill data of (re)started worker process
+        restart = self.worker.take_restart(skill_name)
+        if restart is not None:
+            structs, generation = restart
+            self.reinit(structs)
+            # commands not applied by previous worker process are sent again
+            for index, (request, sent_to) in enumerate(self._forwarded):
+                if sent_to != generation:
+                    self._forwarded[index] = (
+                        request,
+                        self.worker.send_command(
+                            skill_name, request.command, request.parameters, request.seq
+                        ),
+                    )
+        # parameter values written by clients
+        parameters = {
+            name: value
+            for name, value in _parameter_values(self.data).items()
+            if self._parameters_sent.get(name) != value
+        }
+        if parameters:
+            self.worker.send_command(skill_name, ST_SkillCommand(), parameters)
+            self._parameters_sent.update(parameters)
+        # command flags set directly in stSkillCommand (e.g. StateComplete, stop_skill)
+        if self.data.stSkillCommand != ST_SkillCommand():
+            self.worker.send_command(skill_name, self.data.stSkillCommand)
+            self.data.stSkillCommand = ST_SkillCommand()
+        # queued commands
+        for request in self.data_exchange.take_commands():
+            generation = self.worker.send_command(
+                skill_name, request.command, request.parameters, request.seq
+            )
+            self._forwarded.append((request, generation))
+        # skill data of worker
+        structs = self.worker.take_data(skill_name)
+        # sequence number of last command applied by worker
+        command_seq = structs.pop("command_seq", None)
+        if command_seq is not None:
+            applied = None
+            while self._forwarded and self._forwarded[0][0].seq <= command_seq:
+                applied, _ = self._forwarded.popleft()
+            if applied is not None:
+                self.data_exchange.set_applied(applied)
+        for struct_name, struct in structs.items():
+            if struct_name != "stSkillCommand":
+                setattr(self.data, struct_name, struct)
+        if "stSkillDataCommand" in structs:
+            self._parameters_sent = _parameter_values(self.data)
+        if not structs:
+            if not self.worker.is_alive():
+                self._set_worker_error()
+            self.data_exchange.clock.sleep(
+                0.001
+            )  # no new data, e.g. in stop_skill loop
+        self._write_state_table()
+        self._notify_observers()
+        self.data_exchange.publish(self.data)
+
+    def _set_worker_error(self) -> None:
+        """set aborted state with error, while worker process is not running"""
+        self.data.stSkillState.eActiveState = ESkillStates.Aborted.value
+        self.data.stSkillState.strActiveState = ESkillStates.Aborted.name
+        self.data.stSkillState.bError = True
+        self.data.stSkillState.strErrorMsg = (
+            f"Worker process '{self.worker.name}' not running!"
+        )
+
+
+def shard_skills(
+    skill_factories: list[Callable[[], BaseSkill]],
+    processes: int,
+    cycletime: float = 0.1,
+    logger: logging.Logger = None,
+) -> list[SkillWorker]:
+    """distribute skills round robin to worker processes
+
+    Args:
+        skill_factories (list[Callable[[], BaseSkill]]): picklable callables creating the skills
+        processes (int): number of worker processes
+        cycletime (float, optional): cycletime of workers. Defaults to 0.1.
+        logger (logging.Logger, optional): logger for logging. Defaults to None.
+
+    Returns:
+        list[SkillWorker]: workers, pass to SkillServer(skill_workers=...)
+    """
+    return [
+        SkillWorker(
+            skill_factories[index::processes],
+            cycletime=cycletime,
+            name=f"SkillWorker_{index + 1}",
+            logger=logger,
+        )
+        for index in range(processes)
+        if skill_factories[index::processes]
+    ]
+
+
+def _parameter_values(data: SkillDataHandle) -> dict[str, str]:
+    """get parameter values of stSkillDataCommand by parameter name"""
+    return {
+        parameter.strName: parameter.strValue
+        for parameter in data.stSkillDataCommand.astParameters
+    }
+
+
+def _skill_structs(skill: BaseSkill, published: dict[str, object]) -> dict[str, object]:
+    """get structs of latest skill data snapshot, which changed since published"""
+    snapshot = skill.data_exchange.latest()
+    structs = {}
+    for struct_name in SNAPSHOT_STRUCTS:
+        struct = getattr(snapshot, struct_name)
+        if struct is not published.get(struct_name):
+            structs[struct_name] = struct
+            published[struct_name] = struct
+    return structs
+
+
+def _run_worker(connection, skill_factories: list[Callable], cycletime: float):
+    """main function of worker process: create skills, run skill cycles, exchange commands and skill data with server process.
+    Sequence number of the last applied command of the proxy skill is sent as "command_seq" with the skill data.
+    """
+    runtimes: dict[str, SkillRuntimeThread] = {}
+    for skill_factory in skill_factories:
+        skill = skill_factory()
+        skill_name = skill.data.stSkillDataDefault.strName
+        # runtime thread objects only used for running skill cycles with error handling
+        runtimes[skill_name] = SkillRuntimeThread(skill=skill, cycletime=cycletime)
+    published = {skill_name: {} for skill_name in runtimes}
+    # (worker command sequence number, proxy command sequence number) of queued commands
+    forwarded = {skill_name: collections.deque() for skill_name in runtimes}
+    connection.send(
+        (
+            "init",
+            {
+                skill_name: _skill_structs(runtime.skill, published[skill_name])
+                for skill_name, runtime in runtimes.items()
+            },
+        )
+    )
+    cycle_timer = CycleTimer(cycletime=cycletime, use_cycletime_correction=False)
+    running = True
+    while running:
+        cycle_timer.start_cycle()
+        while connection.poll():
+            message = connection.recv()
+            if message[0] == "stop":
+                running = False
+            elif message[0] == "command":
+                _, skill_name, command, parameters, seq = message
+                try:
+                    worker_seq = runtimes[skill_name].skill.data_exchange.post_command(
+                        command, parameters
+                    )
+                except (KeyError, queue.Full) as e:
+                    logging.error(f"Command for skill '{skill_name}' dropped: {e}")
+                    continue
+                if seq:
+                    forwarded[skill_name].append((worker_seq, seq))
+        for runtime in runtimes.values():
+            runtime.run_skill()
+        # skill data sent every cycle, also as heartbeat
+        skill_data = {}
+        for skill_name, runtime in runtimes.items():
+            structs = _skill_structs(runtime.skill, published[skill_name])
+            applied_seq = runtime.skill.data_exchange.applied_seq
+            pending = forwarded[skill_name]
+            while pending and pending[0][0] <= applied_seq:
+                structs["command_seq"] = pending.popleft()[1]
+            skill_data[skill_name] = structs
+        connection.send(("data", skill_data))
+        cycle_timer.end_cycle()
+    for runtime in runtimes.values():
+        runtime.stop_skill()
+    connection.close()
@@ -0,0 +1,286 @@
+import copy
+import queue
+import threading
+import collections
+import dataclasses
+from sbc_statemachine.skilldatahandle import SkillDataHandle
+from sbc_statemachine.skilldatatypes import (
+    ST_SkillCommand,
+    ST_SkillState,
+    ST_SkillData,
+)
+from .clock import SYSTEM_CLOCK
+
+SNAPSHOT_STRUCTS = [
+    "stSkillCommand",
+    "stSkillState",
+    "stSkillDataDefault",
+    "stSkillDataCommand",
+]  # skill data structs published in snapshots
+COMMAND_QUEUE_SIZE = 64  # max number of queued commands per skill
+SKILL_COMMAND_METHODS = [
+    "Reset",
+    "Start",
+    "Stop",
+    "Hold",
+    "Unhold",
+    "Pause",
+    "Resume",
+    "Abort",
+    "Restart",
+    "Complete",
+]  # state commands exposed by io layers (e.g. opc ua methods on skill folder)
+
+
+@dataclasses.dataclass
+class SkillCommandRequest:
+    """queued skill command with sequence number and optional parameter values"""
+
+    seq: int = 0
+    command: ST_SkillCommand = dataclasses.field(default_factory=ST_SkillCommand)
+    parameters: dict[str, str] = None
+    # clock time from which command may be applied, to apply commands of several skills in the same cycle
+    release_time: float = 0.0
+    # clock time command was queued
+    post_time: float = 0.0
+
+
+@dataclasses.dataclass
+class SkillDataSnapshot:
+    """consistent copy of skill data, published by skill runtime after each cycle.
+    Structs of a published snapshot are never mutated, treat them as read only.
+    """
+
+    seq: int = 0
+    timestamp: float = 0.0
+    command_seq: int = 0  # sequence number of last applied command
+    stSkillCommand: ST_SkillCommand = dataclasses.field(default_factory=ST_SkillCommand)
+    stSkillState: ST_SkillState = dataclasses.field(default_factory=ST_SkillState)
+    stSkillDataDefault: ST_SkillData = dataclasses.field(default_factory=ST_SkillData)
+    stSkillDataCommand: ST_SkillData = dataclasses.field(default_factory=ST_SkillData)
+
+
+class SkillDataExchange:
+    """lock free exchange of skill data between skill execution and io layer (e.g. opc ua server).
+    Commands posted by any thread are queued and applied one per cycle by the skill runtime, so commands are never lost or torn.
+    The skill runtime publishes a snapshot of its skill data after each cycle into a sequence locked double buffer,
+    readers of other threads get consistent copies without locking the skill runtime.
+    """
+
+    def __init__(
+        self, data: SkillDataHandle, maxsize: int = COMMAND_QUEUE_SIZE
+    ) -> None:
+        """lock free exchange of skill data between skill execution and io layer (e.g. opc ua server).
+
+        Args:
+            data (SkillDataHandle): skill data handle of skill
+            maxsize (int, optional): max number of queued commands. Defaults to COMMAND_QUEUE_SIZE.
+        """
+        self.maxsize = maxsize
+        # time source of release times and snapshot timestamps, set by SkillServer
+        self.clock = SYSTEM_CLOCK
+        self._commands: collections.deque[SkillCommandRequest] = collections.deque()
+        self._command_lock = threading.Lock()
+        self._command_seq = 0
+        self.applied_seq = 0
+        # clock time from queueing to applying of last applied command
+        self.applied_latency = 0.0
+        self._buffers = [SkillDataSnapshot(), SkillDataSnapshot()]
+        self._index = 0
+        self._seq = 0
+        self.publish(data)
+
+    def post_command(
+        self, command: ST_SkillCommand, parameters: dict[str, str] = None
+    ) -> int:
+        """queue command for skill, can be called from any thread.
+        All mode and state command flags set in command are applied together in one skill cycle.
+
+        Args:
+            command (ST_SkillCommand): skill command with command flags set
+            parameters (dict[str, str], optional): parameter values of stSkillDataCommand to set with command, by parameter name. Defaults to None.
+
+        Raises:
+            KeyError: if parameter name is not a parameter of skill
+            queue.Full: if command queue is full
+
+        Returns:
+            int: sequence number of queued command
+        """
+        self.check_parameters(parameters)
+        return self.post_request(
+            SkillCommandRequest(
+                command=copy.deepcopy(command),
+                parameters=dict(parameters) if parameters else None,
+            )
+        )
+
+    def post_request(self, request: SkillCommandRequest) -> int:
+        """queue command request for skill, can be called from any thread.
+        Sequence number of request is set.
+
+        Args:
+            request (SkillCommandRequest): command request, not modified by queue afterwards
+
+        Raises:
+            queue.Full: if command queue is full
+
+        Returns:
+            int: sequence number of queued command
+        """
+        with self._command_lock:
+            if len(self._commands) >= self.maxsize:
+                raise queue.Full(f"Command queue full ({self.maxsize} commands)!")
+            self._command_seq += 1
+            request.seq = self._command_seq
+            request.post_time = self.clock.time()
+            self._commands.append(request)
+            return self._command_seq
+
+    def check_parameters(self, parameters: dict[str, str]) -> None:
+        """check if all parameter names are parameters of skill
+
+        Args:
+            parameters (dict[str, str]): parameter values by parameter name or None
+
+        Raises:
+            KeyError: if parameter name is not a parameter of skill
+        """
+        if not parameters:
+            return
+        names = {
+            parameter.strName
+            for parameter in self.snapshot().stSkillDataCommand.astParameters
+        }
+        for name in parameters:
+            if name not in names:
+                raise KeyError(f"Skill has no parameter '{name}'!")
+
+    def pending_commands(self) -> int:
+        """get number of queued commands
+
+        Returns:
+            int: number of queued commands
+        """
+        return len(self._commands)
+
+    def apply_command(self, data: SkillDataHandle) -> bool:
+        """apply next queued command to skill data, call from skill runtime only.
+        Command flags are merged (set only) into data.stSkillCommand, parameter values are set in data.stSkillDataCommand.
+        Commands with release time in the future are kept in queue, as all commands behind them.
+
+        Args:
+            data (SkillDataHandle): skill data handle of skill
+
+        Returns:
+            bool: True, if a command was applied
+        """
+        if not self._commands:
+            return False
+        if self._commands[0].release_time > self.clock.time():
+            return False
+        request = self._commands.popleft()
+        _merge_command_flags(request.command, data.stSkillCommand)
+        if request.parameters:
+            for parameter in data.stSkillDataCommand.astParameters:
+                if parameter.strName in request.parameters:
+                    parameter.strValue = request.parameters[parameter.strName]
+        self.applied_seq = request.seq
+        self.applied_latency = self.clock.time() - request.post_time
+        return True
+
+    def take_commands(self) -> list[SkillCommandRequest]:
+        """take all released queued commands without applying them, call from skill runtime only.
+        Used for forwarding commands to skills running elsewhere (e.g. worker process),
+        report commands applied there with set_applied.
+
+        Returns:
+            list[SkillCommandRequest]: released commands in queue order
+        """
+        requests = []
+        now = self.clock.time()
+        while self._commands and self._commands[0].release_time <= now:
+            requests.append(self._commands.popleft())
+        return requests
+
+    def set_applied(self, request: SkillCommandRequest) -> None:
+        """report command taken with take_commands as applied by the skill running elsewhere, call from skill runtime only
+
+        Args:
+            request (SkillCommandRequest): applied command request
+        """
+        self.applied_seq = request.seq
+        self.applied_latency = self.clock.time() - request.post_time
+
+    def publish(self, data: SkillDataHandle) -> None:
+        """publish snapshot of skill data, call from skill runtime only.
+        Unchanged structs are shared with the previous snapshot, changed structs are copied.
+
+        Args:
+            data (SkillDataHandle): skill data handle of skill
+        """
+        front = self._buffers[self._index]
+        back = self._buffers[1 - self._index]
+        self._seq += 1  # odd: writing back buffer
+        for struct_name in SNAPSHOT_STRUCTS:
+            value = getattr(data, struct_name)
+            published = getattr(front, struct_name)
+            if value != published:
+                published = copy.deepcopy(value)
+            setattr(back, struct_name, published)
+        back.seq = front.seq + 1
+        back.command_seq = self.applied_seq
+        back.timestamp = self.clock.time()
+        self._index = 1 - self._index
+        self._seq += 1  # even: back buffer is new front buffer
+
+    def latest(self) -> SkillDataSnapshot:
+        """get latest published snapshot without copy. Only consistent if called from skill runtime (writer) thread.
+
+        Returns:
+            SkillDataSnapshot: latest published snapshot
+        """
+        return self._buffers[self._index]
+
+    def snapshot(self) -> SkillDataSnapshot:
+        """get consistent copy of latest published snapshot, can be called from any thread.
+
+        Returns:
+            SkillDataSnapshot: copy of latest published snapshot
+        """
+        while True:
+            seq = self._seq
+            snapshot = copy.copy(self._buffers[self._index])
+            # buffer is only overwritten after writer started a second publish
+            if self._seq - seq < 2:
+                return snapshot
+
+
+def state_command(command_name: str) -> ST_SkillCommand:
+    """create skill command with state command flag command_name set
+
+    Args:
+        command_name (str): name of state command (see SKILL_COMMAND_METHODS) or empty for no command
+
+    Raises:
+        KeyError: if command_name is no state command
+
+    Returns:
+        ST_SkillCommand: skill command
+    """
+    command = ST_SkillCommand()
+    if command_name:
+        if command_name not in SKILL_COMMAND_METHODS:
+            raise KeyError(f"Unknown state command '{command_name}'!")
+        setattr(command.stCommand_State, command_name, True)
+    return command
+
+
+def _merge_command_flags(source, target) -> None:
+    """set all command flags (bool fields) of source, which are True, in target. Recursive for nested structs."""
+    for field in dataclasses.fields(source):
+        value = getattr(source, field.name)
+        if dataclasses.is_dataclass(value):
+            _merge_command_flags(value, getattr(target, field.name))
+        elif isinstance(value, bool) and value:
+            setattr(target, field.name, True)
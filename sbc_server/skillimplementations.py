@@ -1,11 +1,18 @@
 from typing import Callable
 from functools import partial
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+import json
 import time
 from logging import Logger
 from sbc_statemachine.skilldatahandle import SkillDataHandle, ST_Parameter
 from sbc_statemachine.skillstatemachinetypes import EStateResult
 from .baseskill import BaseSkill
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class DelayedSkill(BaseSkill):
     """simple implementation of python skill with delayed Execute state."""
@@ -207,3 +214,196 @@ class PythonFunctionExecuteSkill(BaseSkill):
                         self.RETURN_PARAMETER_NAME + f"_{idx+1}", False
                     ).strValue = str(ret_type(ret[idx]))
         return EStateResult.Done
+
+
+class PythonFunctionBatchExecuteSkill(PythonFunctionExecuteSkill):
+    """Implementation for skill executing single python function for a batch of parameter sets, privided in constructor.
+    Each parameter value can be a json array with one value per parameter set or a single value used for all parameter sets.
+    Return parameters are set to json arrays with one return value per parameter set.
+    Function is called once per parameter set on a worker pool,
+    or once with numpy arrays of all parameter sets if vectorized (requires numpy).
+    Parameter "Progress" shows the percentage of finished parameter sets.
+    """
+
+    PROGRESS_PARAMETER_NAME = "Progress"
+
+    def __init__(
+        self,
+        python_function: Callable,
+        name_suffix: str = "",
+        vectorized: bool = False,
+        max_workers: int = None,
+        executor: Executor = None,
+        logger: Logger = None,
+        **kwargs,
+    ) -> None:
+        """Implementation for skill executing single python function for a batch of parameter sets, privided in constructor.
+
+        Args:
+            python_function (callable): python function to warp with skill.
+            name_suffix (str, optional): suffix of skill name. Defaults to "".
+            vectorized (bool, optional): call function once with numpy arrays of all parameter sets. Defaults to False.
+            max_workers (int, optional): max number of worker threads of default worker pool. Defaults to None.
+            executor (Executor, optional): worker pool for calling function, e.g. ProcessPoolExecutor for cpu bound functions, not shut down by skill. Defaults to ThreadPoolExecutor, shut down with shutdown.
+            logger (logging.Logger, optional): logger for logging. Defaults to None.
+            **kwargs () : additional keyword arguments for skillstatemachine.SkillStateMachine.__init__
+
+        Raises:
+            ImportError: if vectorized and numpy is not installed
+        """
+        if vectorized and numpy is None:
+            raise ImportError("Vectorized batch execution requires numpy!")
+        super().__init__(
+            python_function=python_function,
+            name_suffix=name_suffix,
+            logger=logger,
+            **kwargs,
+        )
+        self.vectorized = vectorized
+        self.max_workers = max_workers
+        # default worker pool is owned by skill, created on start after shutdown
+        self._own_executor = executor is None
+        self.executor = executor if executor is not None else self._create_executor()
+        self._batch: list[tuple] = []
+        self._futures: list[Future] = []
+        # add progress parameter
+        self.data.stSkillDataDefault.astParameters.append(
+            ST_Parameter(
+                strName=self.PROGRESS_PARAMETER_NAME,
+                strDescr="finished parameter sets in percent",
+                strValue="0",
+            )
+        )
+        self.data.stSkillDataDefault.iParameterCount += 1
+        self.data.reset_SkillDataCommand()
+        self.data_exchange.publish(self.data)
+
+    def S01_Starting_Execute(self) -> EStateResult:
+        """get parameter sets, submit function calls to worker pool"""
+        try:
+            self._batch = self._get_batch()
+        except (ValueError, TypeError) as e:
+            return self._set_batch_error(f"Invalid parameter sets: {e}")
+        self._set_progress(0, len(self._batch))
+        if self.executor is None:
+            self.executor = self._create_executor()
+        if not self.vectorized:
+            self._futures = [
+                self.executor.submit(self.python_function, *args)
+                for args in self._batch
+            ]
+        return EStateResult.Done
+
+    def S02_Execute_Execute(self) -> EStateResult:
+        """wait for function calls, set progress and return arrays"""
+        try:
+            if self.vectorized:
+                results = self._call_vectorized()
+            else:
+                finished = sum(future.done() for future in self._futures)
+                self._set_progress(finished, len(self._futures))
+                if finished < len(self._futures):
+                    return EStateResult.Busy
+                results = [future.result() for future in self._futures]
+            self._set_batch_returns(results)
+        except Exception as e:
+            return self._set_batch_error(f"Batch execution failed: {e}")
+        self._futures = []
+        self._set_progress(len(self._batch), len(self._batch))
+        return EStateResult.Done
+
+    def S11_Stopping_Execute(self) -> EStateResult:
+        self._cancel_batch()
+        return EStateResult.Done
+
+    def S13_Aborting_Execute(self) -> EStateResult:
+        self._cancel_batch()
+        return EStateResult.Done
+
+    def shutdown(self) -> None:
+        """cancel batch and shut down default worker pool"""
+        self._cancel_batch()
+        if self._own_executor and self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def _create_executor(self) -> ThreadPoolExecutor:
+        """create default worker pool"""
+        return ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=self.data.stSkillDataDefault.strName,
+        )
+
+    def _get_batch(self) -> list[tuple]:
+        """get argument tuple of each parameter set, single values are used for all parameter sets
+
+        Raises:
+            ValueError: if arrays have different lengths or values are not convertible
+        """
+        columns = []
+        for kwarg_name, kwarg_type in zip(self.kwarg_names, self.kwarg_types):
+            str_value = self.data.get_Parameter_byName(kwarg_name, False).strValue
+            try:
+                value = json.loads(str_value)
+            except (ValueError, TypeError):
+                value = str_value
+            if isinstance(value, list):
+                columns.append([kwarg_type(v) for v in value])
+            else:
+                columns.append(kwarg_type(str_value))
+        lengths = {len(column) for column in columns if isinstance(column, list)}
+        if len(lengths) > 1:
+            raise ValueError(f"Parameter arrays with different lengths {lengths}!")
+        count = lengths.pop() if lengths else 1
+        columns = [
+            column if isinstance(column, list) else [column] * count
+            for column in columns
+        ]
+        return list(zip(*columns)) if columns else [()] * count
+
+    def _call_vectorized(self) -> list:
+        """call function once with numpy arrays of all parameter sets, returns list of return values"""
+        arrays = [numpy.asarray(column) for column in zip(*self._batch)]
+        ret = self.python_function(*arrays)
+        if self.return_type is None:
+            return [None] * len(self._batch)
+        if self.return_type.__name__ == "tuple":
+            return list(zip(*[numpy.asarray(r).tolist() for r in ret]))
+        return numpy.broadcast_to(ret, (len(self._batch),)).tolist()
+
+    def _set_batch_returns(self, results: list) -> None:
+        """set return parameters to json arrays of return values"""
+        if not self.return_type:
+            return
+        if self.return_type.__name__ != "tuple":
+            self.data.get_Parameter_byName(
+                self.RETURN_PARAMETER_NAME, False
+            ).strValue = json.dumps([self.return_type(r) for r in results])
+        else:
+            for idx, ret_type in enumerate(list(self.return_type.__args__)):
+                self.data.get_Parameter_byName(
+                    self.RETURN_PARAMETER_NAME + f"_{idx+1}", False
+                ).strValue = json.dumps([ret_type(r[idx]) for r in results])
+
+    def _set_progress(self, finished: int, count: int) -> None:
+        """set progress parameter in percent"""
+        self.data.get_Parameter_byName(self.PROGRESS_PARAMETER_NAME, False).strValue = (
+            str(round(100.0 * finished / count, 1) if count else 100.0)
+        )
+
+    def _cancel_batch(self) -> None:
+        """cancel not started function calls"""
+        for future in self._futures:
+            future.cancel()
+        self._futures = []
+
+    def _set_batch_error(self, error_msg: str) -> EStateResult:
+        """set skill error and cancel batch"""
+        self._cancel_batch()
+        self.data.stSkillState.bError = True
+        self.data.stSkillState.strErrorMsg = error_msg
+        if self.logger:
+            self.logger.error(
+                f"Skill '{self.data.stSkillDataDefault.strName}': {error_msg}"
+            )
+        return EStateResult.Error
@@ -0,0 +1,151 @@
+import queue
+import threading
+from typing import Callable
+from sbc_statemachine.skilldatatypes import ST_SkillCommand
+from sbc_statemachine.skillstatemachinetypes import ESkillStates
+from .baseskill import BaseSkill
+from .clock import SYSTEM_CLOCK
+
+
+class SkillPool:
+    """pool of replicas of a skill under one logical name.
+    Each replica is a skill with own state machine and runtime thread, named "<name>_<index>".
+    dispatch starts an idle replica, so concurrent requests are executed in parallel.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        skill_factory: Callable[[], BaseSkill],
+        replicas: int = 2,
+        auto_reset_time: float = None,
+    ) -> None:
+        """pool of replicas of a skill under one logical name.
+
+        Args:
+            name (str): logical skill name
+            skill_factory (Callable[[], BaseSkill]): creates one replica, e.g. skill class
+            replicas (int, optional): number of replicas. Defaults to 2.
+            auto_reset_time (float, optional): reset completed replicas after this time in seconds, None to wait for reset by client. Defaults to None.
+        """
+        self.name = name
+        self.auto_reset_time = auto_reset_time
+        # time source of utilisation and auto reset, set by SkillServer
+        self.clock = SYSTEM_CLOCK
+        self.replicas: dict[str, BaseSkill] = {}
+        for index in range(replicas):
+            skill = skill_factory()
+            replica_name = f"{name}_{index + 1}"
+            skill.data.stSkillDataDefault.strName = replica_name
+            skill.data.stSkillDataCommand.strName = replica_name
+            skill.data_exchange.publish(skill.data)
+            self.replicas[replica_name] = skill
+        self._lock = threading.Lock()
+        # start command sequence number of dispatched replicas, until applied
+        self._reserved: dict[str, int] = {}
+        # utilisation: busy time of each replica since start
+        self._busy_time = {replica_name: 0.0 for replica_name in self.replicas}
+        self._completed_since: dict[str, float] = {}
+        # clock time of first and last update
+        self._t_start: float = None
+        self._t_update: float = None
+
+    @property
+    def skills(self) -> list[BaseSkill]:
+        """replica skills to register at skill server"""
+        return list(self.replicas.values())
+
+    def dispatch(self, parameters: dict[str, str] = None) -> tuple[str, int]:
+        """start idle replica with parameter values, can be called from any thread.
+
+        Args:
+            parameters (dict[str, str], optional): parameter values by parameter name. Defaults to None.
+
+        Raises:
+            queue.Full: if no replica is idle
+            KeyError: if parameter is unknown
+
+        Returns:
+            tuple[str, int]: name of started replica, sequence number of start command
+        """
+        with self._lock:
+            for replica_name, skill in self.replicas.items():
+                snapshot = skill.data_exchange.snapshot()
+                if replica_name in self._reserved:
+                    if snapshot.command_seq < self._reserved[replica_name]:
+                        continue  # start not applied yet
+                    del self._reserved[replica_name]
+                if (
+                    snapshot.stSkillState.eActiveState != ESkillStates.Idle
+                    or skill.data_exchange.pending_commands()
+                ):
+                    continue
+                command = ST_SkillCommand()
+                command.stCommand_State.Start = True
+                seq = skill.data_exchange.post_command(command, parameters)
+                self._reserved[replica_name] = seq
+                return replica_name, seq
+        raise queue.Full(f"No idle replica of skill pool '{self.name}'!")
+
+    def idle_replicas(self) -> int:
+        """get number of idle replicas
+
+        Returns:
+            int: number of idle replicas
+        """
+        return sum(
+            skill.data_exchange.snapshot().stSkillState.eActiveState
+            == ESkillStates.Idle
+            for skill in self.replicas.values()
+        )
+
+    def update(self) -> None:
+        """update utilisation and reset completed replicas after auto_reset_time, call cyclic (e.g. server cycle)"""
+        now = self.clock.time()
+        if self._t_start is None:
+            self._t_start = self._t_update = now
+        dt = now - self._t_update
+        self._t_update = now
+        for replica_name, skill in self.replicas.items():
+            state = skill.data_exchange.snapshot().stSkillState.eActiveState
+            if state != ESkillStates.Idle or replica_name in self._reserved:
+                self._busy_time[replica_name] += dt
+            if state != ESkillStates.Completed:
+                self._completed_since.pop(replica_name, None)
+                continue
+            completed_since = self._completed_since.setdefault(replica_name, now)
+            if (
+                self.auto_reset_time is not None
+                and now - completed_since >= self.auto_reset_time
+            ):
+                command = ST_SkillCommand()
+                command.stCommand_State.Reset = True
+                try:
+                    skill.data_exchange.post_command(command)
+                    # reset again after auto_reset_time, if not applied
+                    self._completed_since[replica_name] = now
+                except queue.Full:
+                    pass
+
+    def get_utilisation(self) -> dict[str, float]:
+        """get utilisation (busy time fraction since first update) of each replica
+
+        Returns:
+            dict[str, float]: replica name -> utilisation 0.0 ... 1.0
+        """
+        if self._t_start is None:
+            return {replica_name: 0.0 for replica_name in self._busy_time}
+        elapsed = max(self._t_update - self._t_start, 1e-9)
+        return {
+            replica_name: min(busy_time / elapsed, 1.0)
+            for replica_name, busy_time in self._busy_time.items()
+        }
+
+    def utilisation(self) -> float:
+        """get mean utilisation of all replicas
+
+        Returns:
+            float: utilisation 0.0 ... 1.0
+        """
+        utilisation = self.get_utilisation()
+        return sum(utilisation.values()) / len(utilisation) if utilisation else 0.0
@@ -0,0 +1,187 @@
+import logging
+from sbc_statemachine.skillstatemachinetypes import ESkillStates
+from .baseskill import BaseSkill
+from .skilldataexchange import state_command
+from .skillruntimethread import SkillRuntimeThread
+
+# states in which execute stops waiting for Completed
+EXECUTE_FAILED_SKILL_STATES = [
+    ESkillStates.Stopping,
+    ESkillStates.Stopped,
+    ESkillStates.Aborting,
+    ESkillStates.Aborted,
+]
+
+
+class SkillRunner:
+    """runs skills synchronously in the calling thread: no runtime threads, no server, no sleeps.
+    Each step runs one cycle of every skill in registration order, so runs are deterministic and
+    as fast as the skill implementations allow (e.g. simulation, offline batch jobs, unit tests).
+    Commands are queued to the command queue of the skill and applied in its next cycle, like in SkillServer.
+    """
+
+    def __init__(self, skills: list[BaseSkill], logger: logging.Logger = None) -> None:
+        """runs skills synchronously in the calling thread
+
+        Args:
+            skills (list[BaseSkill]): instance objects of all skills to run
+            logger (logging.Logger, optional): logger for logging. Defaults to None.
+
+        Raises:
+            KeyError: if skills with identical skill names detected.
+        """
+        self.logger = logger
+        self.cycle_count = 0
+        # runtime thread objects only used for running skill cycles with error handling
+        self.skill_runtimes: dict[str, SkillRuntimeThread] = {}
+        for skill in skills:
+            self.add_skill(skill)
+
+    def add_skill(self, skill: BaseSkill) -> None:
+        """add skill to runner
+
+        Args:
+            skill (BaseSkill): instance object of skill
+
+        Raises:
+            KeyError: if skill name already registered
+        """
+        skill_name = skill.data.stSkillDataDefault.strName
+        if skill_name in self.skill_runtimes:
+            raise KeyError(f"Skill with name '{skill_name}' already registered!")
+        self.skill_runtimes[skill_name] = SkillRuntimeThread(skill=skill, cycletime=0)
+
+    def get_skill(self, skill_name: str) -> BaseSkill:
+        """get skill by name
+
+        Raises:
+            KeyError: if skill is not registered
+        """
+        if skill_name not in self.skill_runtimes:
+            raise KeyError(f"Skill '{skill_name}' not registered!")
+        return self.skill_runtimes[skill_name].skill
+
+    def command(
+        self, skill_name: str, command_name: str, parameters: dict[str, str] = None
+    ) -> int:
+        """queue state command and parameter values for skill, applied in next step
+
+        Args:
+            skill_name (str): skill name
+            command_name (str): state command name (see SKILL_COMMAND_METHODS) or empty for parameters only
+            parameters (dict[str, str], optional): parameter values by parameter name. Defaults to None.
+
+        Raises:
+            KeyError: if skill, command or parameter is unknown
+            queue.Full: if command queue of skill is full
+
+        Returns:
+            int: command sequence number
+        """
+        skill = self.get_skill(skill_name)
+        return skill.data_exchange.post_command(state_command(command_name), parameters)
+
+    def start(self, skill_name: str, parameters: dict[str, str] = None) -> int:
+        """queue start command with parameter values for skill, applied in next step
+
+        Args:
+            skill_name (str): skill name
+            parameters (dict[str, str], optional): parameter values by parameter name. Defaults to None.
+
+        Returns:
+            int: command sequence number
+        """
+        return self.command(skill_name, "Start", parameters)
+
+    def step(self, cycles: int = 1) -> None:
+        """run cycles of all skills back to back
+
+        Args:
+            cycles (int, optional): number of cycles. Defaults to 1.
+        """
+        runtimes = list(self.skill_runtimes.values())
+        for _ in range(cycles):
+            for runtime in runtimes:
+                runtime.run_skill()
+            self.cycle_count += 1
+
+    def state(self, skill_name: str) -> ESkillStates:
+        """get active state of skill
+
+        Args:
+            skill_name (str): skill name
+
+        Returns:
+            ESkillStates: active state
+        """
+        return self.get_skill(skill_name).state
+
+    def run_until(
+        self,
+        skill_name: str,
+        states: ESkillStates | list[ESkillStates],
+        max_cycles: int = 10000,
+    ) -> int:
+        """run cycles of all skills until skill is in one of states
+
+        Args:
+            skill_name (str): skill name
+            states (ESkillStates | list[ESkillStates]): state or states to reach
+            max_cycles (int, optional): max number of cycles. Defaults to 10000.
+
+        Raises:
+            TimeoutError: if state not reached within max_cycles
+
+        Returns:
+            int: number of cycles run
+        """
+        if isinstance(states, ESkillStates):
+            states = [states]
+        skill = self.get_skill(skill_name)
+        for cycles in range(max_cycles + 1):
+            if skill.state in states and not skill.data_exchange.pending_commands():
+                return cycles
+            if cycles < max_cycles:
+                self.step()
+        raise TimeoutError(
+            f"Skill '{skill_name}' in state {skill.state.name} after {max_cycles} cycles, expected {[state.name for state in states]}!"
+        )
+
+    def execute(
+        self,
+        skill_name: str,
+        parameters: dict[str, str] = None,
+        max_cycles: int = 10000,
+    ) -> dict[str, str]:
+        """execute skill once: start with parameters, run until completed, reset to idle
+
+        Args:
+            skill_name (str): skill name
+            parameters (dict[str, str], optional): parameter values by parameter name. Defaults to None.
+            max_cycles (int, optional): max number of cycles for each state to reach. Defaults to 10000.
+
+        Raises:
+            RuntimeError: if skill stopped or aborted instead of completing
+            TimeoutError: if state not reached within max_cycles
+
+        Returns:
+            dict[str, str]: parameter values of stSkillDataCommand after completion
+        """
+        skill = self.get_skill(skill_name)
+        self.start(skill_name, parameters)
+        self.run_until(
+            skill_name,
+            [ESkillStates.Completed] + EXECUTE_FAILED_SKILL_STATES,
+            max_cycles,
+        )
+        if skill.state != ESkillStates.Completed:
+            raise RuntimeError(
+                f"Skill '{skill_name}' not completed, state {skill.state.name}: {skill.data.stSkillState.strErrorMsg}"
+            )
+        results = {
+            parameter.strName: parameter.strValue
+            for parameter in skill.data.stSkillDataCommand.astParameters
+        }
+        self.command(skill_name, "Reset")
+        self.run_until(skill_name, ESkillStates.Idle, max_cycles)
+        return results
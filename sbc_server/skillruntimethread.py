@@ -4,6 +4,13 @@ import logging
 import threading
 from sbc_statemachine.skillstatemachinetypes import ESkillStates
 from .cycletimer import CycleTimer
+from .clock import Clock, SYSTEM_CLOCK
+from .tracer import Tracer
+from .profiler import Profile_Request, profile_cycle, finish_profile
+from .metrics import Skill_Metrics, observe_cycle
+from .flightrecorder import FlightRecorder
+from .allocdiagnostics import AllocationDiagnostics
+from .gcscheduler import GCScheduler
 from .baseskill import BaseSkill
 
 
@@ -26,6 +33,11 @@ class SkillRuntimeThread(threading.Thread):
         read_skill_data_extern: Callable[[BaseSkill], None] = None,
         write_skill_data_extern: Callable[[BaseSkill], None] = None,
         cycletime: float = 0.1,
+        epoch: float = None,
+        clock: Clock = None,
+        tracer: Tracer = None,
+        alloc_diagnostics: AllocationDiagnostics = None,
+        gc_scheduler: GCScheduler = None,
         **kwargs,
     ) -> None:
         """Runs skill implemented by BaseSkill class with a fixed cycletime as a thread.
@@ -35,6 +47,11 @@ class SkillRuntimeThread(threading.Thread):
             read_skill_data_extern (Callable[[str], None], optional): external method for reading skill data before running skill cycle. Defaults to None.
             write_skill_data_extern (Callable[[str], None], optional): external method for writing skill data after running skill cycle. Defaults to None.
             cycletime (float, optional): cycletime for skill run call. Defaults to 0.1.
+            epoch (float, optional): clock time to align cycle starts to, see CycleTimer. Defaults to None.
+            clock (Clock, optional): time source and sleep, e.g. VirtualClock for simulation. Defaults to None (SYSTEM_CLOCK).
+            tracer (Tracer, optional): records spans of cycle phases while recording is started. Defaults to None.
+            alloc_diagnostics (AllocationDiagnostics, optional): measures allocations of cycle phases and gc pauses while started. Defaults to None.
+            gc_scheduler (GCScheduler, optional): runs gc collections in slack after cycles, see CycleTimer. Defaults to None.
             **kwargs (): additional arguments for threading.Thread.__init__
         """
         super().__init__(**kwargs)
@@ -42,23 +59,136 @@ class SkillRuntimeThread(threading.Thread):
         self.read_skill_data_extern: Callable[[str], None] = read_skill_data_extern
         self.write_skill_data_extern: Callable[[str], None] = write_skill_data_extern
         self.cycletime = cycletime
+        self.epoch = epoch
+        self.clock = clock or SYSTEM_CLOCK
+        self.tracer = tracer
+        self.alloc_diagnostics = alloc_diagnostics
+        self.gc_scheduler = gc_scheduler
+        # pending profiling request, see SkillServer.profile
+        self.profile_request: Profile_Request = None
+        # metrics of skill, set by SkillServer with MetricsExporter
+        self.metrics: Skill_Metrics = None
+        # records last cycles of skill, set by SkillServer
+        self.flight_recorder: FlightRecorder = None
         self.running = False
 
     def run(self) -> None:
         """Overrided method from Thread class. Will run when thread is started with .start()"""
         cycle_timer = CycleTimer(
-            cycletime=self.cycletime, use_cycletime_correction=False
+            cycletime=self.cycletime,
+            use_cycletime_correction=False,
+            epoch=self.epoch,
+            clock=self.clock,
+            gc_scheduler=self.gc_scheduler,
         )
         self.running = True
-        while self.running:
-            cycle_timer.start_cycle()
-            if self.read_skill_data_extern is not None:
-                self.read_skill_data_extern(self.skill)
-            self.run_skill()
-            if self.write_skill_data_extern is not None:
-                self.write_skill_data_extern(self.skill)
-            cycle_timer.end_cycle()
-        self.stop_skill()
+        try:
+            while self.running:
+                cycle_timer.start_cycle()
+                # execution duration of cycle for metrics, clock time does not advance in cycle under virtual clock
+                t0 = time.perf_counter()
+                if self.profile_request is not None:
+                    self.run_cycle_profiled()
+                else:
+                    self.run_cycle_instrumented()
+                if self.metrics is not None:
+                    observe_cycle(self.metrics, self.skill, time.perf_counter() - t0)
+                if self.flight_recorder is not None:
+                    self.flight_recorder.record()
+                cycle_timer.end_cycle()
+            self.stop_skill()
+        finally:
+            # cycle ended by exception
+            cycle_timer.cancel_cycle()
+            if self.profile_request is not None:
+                finish_profile(self.profile_request)
+                self.profile_request = None
+            self.clock.detach(self)
+
+    def run_cycle(self) -> None:
+        """run one cycle: read skill data extern, run skill, write skill data extern"""
+        if self.read_skill_data_extern is not None:
+            self.read_skill_data_extern(self.skill)
+        self.run_skill()
+        if self.write_skill_data_extern is not None:
+            self.write_skill_data_extern(self.skill)
+
+    def run_cycle_instrumented(self) -> None:
+        """run one cycle with the enabled diagnostic tools: run_cycle_diagnosed if alloc_diagnostics is enabled
+        (also recording tracer spans, if tracer is enabled), run_cycle_traced if only tracer is enabled, else run_cycle
+        """
+        if self.alloc_diagnostics is not None and self.alloc_diagnostics.enabled:
+            self.run_cycle_diagnosed()
+        elif self.tracer is not None and self.tracer.enabled:
+            self.run_cycle_traced()
+        else:
+            self.run_cycle()
+
+    def run_cycle_traced(self) -> None:
+        """run one cycle like run_cycle and record spans of its phases to tracer,
+        run_skill spans are named after the active state, whose state method is called
+        """
+        tracer = self.tracer
+        t0 = tracer.time()
+        if self.read_skill_data_extern is not None:
+            self.read_skill_data_extern(self.skill)
+        t1 = tracer.time()
+        state_name = self.skill.data.stSkillState.strActiveState
+        self.run_skill()
+        t2 = tracer.time()
+        if self.write_skill_data_extern is not None:
+            self.write_skill_data_extern(self.skill)
+        t3 = tracer.time()
+        self._record_spans(state_name, t0, t1, t2, t3)
+
+    def _record_spans(self, state_name: str, t0: float, t1: float, t2: float, t3: float) -> None:
+        """record spans of cycle phases to tracer, times of tracer.time (time.perf_counter)"""
+        tracer = self.tracer
+        if self.read_skill_data_extern is not None:
+            tracer.record("read_skill_data_extern", "skill", t0, t1)
+        tracer.record("run_skill:" + state_name, "skill", t1, t2)
+        if self.write_skill_data_extern is not None:
+            tracer.record("write_skill_data_extern", "skill", t2, t3)
+        tracer.record("cycle", "skill", t0, t3)
+
+    def run_cycle_diagnosed(self) -> None:
+        """run one cycle like run_cycle, measure allocations of its phases and gc pauses with alloc_diagnostics.
+        If tracer is enabled, spans of the phases are recorded like in run_cycle_traced, including the measuring overhead.
+        """
+        diagnostics = self.alloc_diagnostics
+        skill_name = self.skill.data.stSkillDataDefault.strName
+        # real time like gc pauses and tracer spans, lock wait for measured phases of other skills excluded
+        t0 = time.perf_counter()
+        lock_wait = diagnostics.lock_wait()
+        gc_pause = diagnostics.gc_monitor.total_pause
+        if self.read_skill_data_extern is not None:
+            diagnostics.measure(
+                skill_name,
+                "read_skill_data_extern",
+                self.read_skill_data_extern,
+                self.skill,
+            )
+        t1 = time.perf_counter()
+        state_name = self.skill.data.stSkillState.strActiveState
+        diagnostics.measure(skill_name, "run_skill", self.run_skill)
+        t2 = time.perf_counter()
+        if self.write_skill_data_extern is not None:
+            diagnostics.measure(
+                skill_name,
+                "write_skill_data_extern",
+                self.write_skill_data_extern,
+                self.skill,
+            )
+        t3 = time.perf_counter()
+        duration = t3 - t0 - (diagnostics.lock_wait() - lock_wait)
+        diagnostics.end_cycle(skill_name, duration, self.cycletime, gc_pause)
+        if self.tracer is not None and self.tracer.enabled:
+            self._record_spans(state_name, t0, t1, t2, t3)
+
+    def run_cycle_profiled(self) -> None:
+        """run one cycle like run_cycle_instrumented with cProfile enabled, until profile_request is done"""
+        if profile_cycle(self.profile_request, self.clock, self.run_cycle_instrumented):
+            self.profile_request = None
 
     def run_skill(self) -> bool:
         """call skill run method and check for exceptions
@@ -73,14 +203,18 @@ class SkillRuntimeThread(threading.Thread):
             logging.error(
                 f"Exception while running skill '{self.skill.data.stSkillDataDefault.strName}' in state {self.skill.data.stSkillState.strActiveState}: {e}"
             )
+            if self.metrics is not None:
+                self.metrics.exceptions += 1
             if self.skill.state in ERROR_HOLD_SKILL_STATES:
                 self.skill.state = ESkillStates.Holding
             else:
                 self.skill.state = ESkillStates.Stopping
+            if self.flight_recorder is not None:
+                self.flight_recorder.dump(reason=f"exception: {e}")
             return False
 
     def stop_skill(self) -> None:
-        """set stop command to skill and wait for stopped or aborted state"""
+        """set stop command to skill and wait for stopped or aborted state, then shutdown skill"""
         self.skill.data.stSkillCommand.stCommand_State.Stop = True
         while not (
             self.skill.data.stSkillState.eActiveState == ESkillStates.Stopped
@@ -88,9 +222,11 @@ class SkillRuntimeThread(threading.Thread):
         ):
             if not self.run_skill():
                 break
+        self.skill.shutdown()
 
     def start(self):
         """Start the thread's activity. also wait for running"""
+        self.clock.attach(self)
         super().start()
         while not self.running:
             time.sleep(0.001)
@@ -98,4 +234,5 @@ class SkillRuntimeThread(threading.Thread):
     def stop(self):
         """external method for stopping skill runtime thread"""
         self.running = False
-        self.join()
+        with self.clock.waiting():
+            self.join()
@@ -1,8 +1,37 @@
+import os
+import copy
+import math
+import queue
 import threading
 import time
 import logging
+import tempfile
+import dataclasses
+from sbc_statemachine.skilldatatypes import ST_Base, ST_SkillState, ST_SkillCommand
 from .skillruntimethread import SkillRuntimeThread, BaseSkill
-from .cycletimer import CycleTimer
+from .cycletimer import CycleTimer, next_tick
+from .clock import Clock, SYSTEM_CLOCK
+from .tracer import Tracer
+from .profiler import Profile_Request, profile_cycle, finish_profile
+from .metrics import MetricsExporter
+from .flightrecorder import FlightRecorder
+from .allocdiagnostics import AllocationDiagnostics
+from .gcscheduler import GCScheduler
+from .skilldataexchange import SkillCommandRequest
+from .skillpool import SkillPool
+from .proxyskill import SkillWorker
+from .skillstatetable import SkillStateTable, numpy
+
+
+@dataclasses.dataclass
+class ST_SkillStatus(ST_Base):
+    """compact status record of one skill, for monitoring all skills at once"""
+
+    strName: str = ""
+    eActiveState: int = 0
+    eActiveMode: int = 0
+    bError: bool = False
+    udiErrorID: int = 0
 
 
 class SkillServer(threading.Thread):
@@ -15,6 +44,17 @@ class SkillServer(threading.Thread):
         server_cycletime: float = 0.1,
         server_name: str = "SkillServer",
         logger: logging.Logger = None,
+        skill_pools: list[SkillPool] = None,
+        skill_workers: list[SkillWorker] = None,
+        clock: Clock = None,
+        aligned_cycles: bool = False,
+        tracer: Tracer = None,
+        profile_dir: str = None,
+        metrics: MetricsExporter = None,
+        flight_recorder_cycles: int = 0,
+        flight_recorder_dir: str = None,
+        alloc_diagnostics: AllocationDiagnostics = None,
+        gc_scheduler: GCScheduler = None,
         **kwargs,
     ) -> None:
         """Base server class holding and running skills
@@ -25,6 +65,17 @@ class SkillServer(threading.Thread):
             server_cycletime (float, optional): server cycletime. Will be set to skill_cycletime/2 if longer! Defaults to 1.0.
             server_name (str, optional): server name. Defaults to "SkillServer".
             logger (logging.Logger, optional): logger for logging. Defaults to None.
+            skill_pools (list[SkillPool], optional): pools of skill replicas, replicas are run as skills. Defaults to None.
+            skill_workers (list[SkillWorker], optional): worker processes running skills, see proxyskill.shard_skills. Their proxy skills are run as skills, workers are started by start_server. Defaults to None.
+            clock (Clock, optional): time source and sleep of server and skill runtime threads, e.g. VirtualClock for simulation. Defaults to None (SYSTEM_CLOCK).
+            aligned_cycles (bool, optional): skill runtime threads start their cycles aligned to a common epoch (see CycleTimer), so commands of submit_commands are applied in the same cycle. Defaults to False.
+            tracer (Tracer, optional): records timeline spans of server and skill cycles while recording is started (tracer.start, tracer.stop, tracer.dump). Defaults to None.
+            profile_dir (str, optional): directory of pstats files written by profile. Defaults to None (temp directory).
+            metrics (MetricsExporter, optional): collects metrics of skill runtimes and serves them over http while server runs. Defaults to None.
+            flight_recorder_cycles (int, optional): number of last cycles recorded per skill by a FlightRecorder, dumped on exception, abort and by dump_flight_recorder. 0 disables. Defaults to 0.
+            flight_recorder_dir (str, optional): directory of flight recorder dumps. Defaults to None (temp directory).
+            alloc_diagnostics (AllocationDiagnostics, optional): measures allocations per phase of skill cycles and gc pauses while started (alloc_diagnostics.start, stop, report). Defaults to None.
+            gc_scheduler (GCScheduler, optional): gc aware low jitter mode: started after start_server (freezes objects, disables automatic gc), collections run in slack after server and skill cycles, stopped and pause statistics logged when server stops. Defaults to None.
             **kwargs (): additional arguments for threading.Thread.__init__
 
         Raises:
@@ -36,6 +87,36 @@ class SkillServer(threading.Thread):
         if server_cycletime >= skill_cycletime:
             server_cycletime = skill_cycletime / 2.0
         self.server_cycletime = server_cycletime
+        self.skill_cycletime = skill_cycletime
+        self.clock = clock or SYSTEM_CLOCK
+        # common cycle start of all skill runtime threads if aligned, see submit_commands
+        self.epoch = self.clock.time() if aligned_cycles else None
+        self.tracer = tracer
+        self.profile_dir = profile_dir or tempfile.gettempdir()
+        self.metrics = metrics
+        self.gc_scheduler = gc_scheduler
+        self.alloc_diagnostics = alloc_diagnostics
+        # read and write skill data extern of skill runtime threads, measured with metrics
+        read_skill_data_extern = self.read_skill_data
+        write_skill_data_extern = self.write_skill_data
+        if self.metrics is not None:
+            read_skill_data_extern = self._read_skill_data_measured
+            write_skill_data_extern = self._write_skill_data_measured
+        # pending profiling request of server loop and all profiling requests, see profile
+        self.server_profile_request: Profile_Request = None
+        self.profile_requests: list[Profile_Request] = []
+        # skill pools, replicas are run as skills
+        self.skill_pools: dict[str, SkillPool] = {}
+        for skill_pool in skill_pools or []:
+            if skill_pool.name in self.skill_pools:
+                raise KeyError(f"Skill pool '{skill_pool.name}' already registered!")
+            self.skill_pools[skill_pool.name] = skill_pool
+            skill_pool.clock = self.clock
+            skills = skills + skill_pool.skills
+        # skills in worker processes, represented by proxy skills
+        self.skill_workers: list[SkillWorker] = skill_workers or []
+        for skill_worker in self.skill_workers:
+            skills = skills + list(skill_worker.create_proxies().values())
         # generate skill runtime threads
         self.skill_runtime_threads: dict[str, SkillRuntimeThread] = {}
         for skill in skills:
@@ -44,11 +125,37 @@ class SkillServer(threading.Thread):
                 raise KeyError(f"Skill with name '{skill_name}' already registered!")
             self.skill_runtime_threads[skill_name] = SkillRuntimeThread(
                 skill=skill,
-                read_skill_data_extern=self.read_skill_data,
-                write_skill_data_extern=self.write_skill_data,
+                read_skill_data_extern=read_skill_data_extern,
+                write_skill_data_extern=write_skill_data_extern,
                 cycletime=skill_cycletime,
+                epoch=self.epoch,
+                clock=self.clock,
+                tracer=self.tracer,
+                alloc_diagnostics=alloc_diagnostics,
+                gc_scheduler=gc_scheduler,
                 name=skill_name + "_RuntimeThread",
             )
+            skill.data_exchange.clock = self.clock
+            if self.metrics is not None:
+                self.skill_runtime_threads[skill_name].metrics = self.metrics.add_skill(
+                    skill
+                )
+            if flight_recorder_cycles > 0:
+                self.skill_runtime_threads[skill_name].flight_recorder = FlightRecorder(
+                    skill, flight_recorder_cycles, flight_recorder_dir
+                )
+        # compact status records of all skills, see update_skill_status
+        self.skill_status: dict[str, ST_SkillStatus] = {
+            skill_name: ST_SkillStatus(strName=skill_name)
+            for skill_name in self.skill_runtime_threads
+        }
+        self._skill_status_published: dict[str, ST_SkillState] = {}
+        # state table of all skills written by skill runtimes, None without numpy
+        self.skill_state_table: SkillStateTable = None
+        if numpy is not None:
+            self.skill_state_table = SkillStateTable(list(self.skill_runtime_threads))
+            for skill_runtime_thread in self.skill_runtime_threads.values():
+                self.skill_state_table.attach(skill_runtime_thread.skill)
         self.running = False
         self.logger = logger
 
@@ -57,38 +164,316 @@ class SkillServer(threading.Thread):
         1. start server
         2. run server cycle until self.running is set to False
         3. stop server"""
-        self.start_server()
-        cycle_timer = CycleTimer(
-            cycletime=self.server_cycletime, use_cycletime_correction=False
-        )
-        self.running = True
-        while self.running:
-            cycle_timer.start_cycle()
-            self.server_cycle()
-            cycle_timer.end_cycle()
-        self.stop_server()
+        cycle_timer: CycleTimer = None
+        try:
+            self.start_server()
+            if self.gc_scheduler is not None:
+                # skills, nodes and types are built
+                self.gc_scheduler.start()
+            cycle_timer = CycleTimer(
+                cycletime=self.server_cycletime,
+                use_cycletime_correction=False,
+                clock=self.clock,
+                gc_scheduler=self.gc_scheduler,
+            )
+            self.running = True
+            while self.running:
+                cycle_timer.start_cycle()
+                if self.server_profile_request is not None:
+                    if profile_cycle(
+                        self.server_profile_request, self.clock, self._run_server_cycle
+                    ):
+                        self.server_profile_request = None
+                else:
+                    self._run_server_cycle()
+                cycle_timer.end_cycle()
+            self.stop_server()
+        finally:
+            if cycle_timer is not None:
+                # cycle ended by exception
+                cycle_timer.cancel_cycle()
+            if self.server_profile_request is not None:
+                finish_profile(self.server_profile_request)
+                self.server_profile_request = None
+            if self.gc_scheduler is not None and self.gc_scheduler.enabled:
+                self.gc_scheduler.stop()
+                if self.logger:
+                    self.logger.info(
+                        f"SkillServer {self.server_name}: gc statistics {self.gc_scheduler.statistics()}."
+                    )
+            self.clock.detach(self)
 
     def start_server(self):
         """server start method.  Can be overrided with subclass but also call this method!"""
+        self._start_skill_workers()
         # start skill_runtime_threads
         self._start_skill_runtime_threads()
+        if self.metrics is not None:
+            self.metrics.start()
+            if self.logger:
+                self.logger.info(
+                    f"SkillServer {self.server_name}: serving metrics at http://{self.metrics.host}:{self.metrics.port}/metrics."
+                )
         if self.logger:
             self.logger.info(f"SkillServer {self.server_name}: server started.")
 
+    def _start_skill_workers(self):
+        """starts all skill_workers, already started workers are stopped if one fails
+
+        Raises:
+            RuntimeError: if a worker process does not start its skills in time
+        """
+        for index, skill_worker in enumerate(self.skill_workers):
+            try:
+                skill_worker.start()
+            except RuntimeError:
+                for started_worker in self.skill_workers[:index]:
+                    started_worker.stop()
+                raise
+
     def _start_skill_runtime_threads(self):
         """starts all skill_runtime_threads"""
+        # attach all before first start, so no thread runs ahead in virtual time
+        for skill_runtime_thread in self.skill_runtime_threads.values():
+            self.clock.attach(skill_runtime_thread)
         for skill_name in self.skill_runtime_threads:
             self.skill_runtime_threads[skill_name].start()
 
+    def _run_server_cycle(self) -> None:
+        """run server_cycle, recorded as span to tracer if tracer is enabled"""
+        if self.tracer is not None and self.tracer.enabled:
+            t0 = self.tracer.time()
+            self.server_cycle()
+            self.tracer.record("server_cycle", "server", t0, self.tracer.time())
+        else:
+            self.server_cycle()
+
     def server_cycle(self):
-        """server cycle method. Override with subclass."""
+        """server cycle method. Override with subclass but also call this method!"""
+        for skill_pool in self.skill_pools.values():
+            skill_pool.update()
+        for skill_worker in self.skill_workers:
+            skill_worker.check()
+        for request in [
+            request for request in self.profile_requests if request.done.is_set()
+        ]:
+            self.profile_requests.remove(request)
+            self.profile_done(request)
         if self.logger:
             self.logger.debug(f"SkillServer {self.server_name}: server cycle called.")
 
+    def update_skill_status(self) -> bool:
+        """update compact status records of all skills from skill state table,
+        or from published skill data snapshots without numpy.
+
+        Returns:
+            bool: True, if status of any skill changed
+        """
+        changed = False
+        if self.skill_state_table is not None:
+            indices, rows = self.skill_state_table.changed_rows()
+            for index, row in zip(indices, rows):
+                skill_name = self.skill_state_table.skill_names[index]
+                status = ST_SkillStatus(
+                    strName=skill_name,
+                    eActiveState=int(row["eActiveState"]),
+                    eActiveMode=int(row["eActiveMode"]),
+                    bError=bool(row["bError"]),
+                    udiErrorID=int(row["udiErrorID"]),
+                )
+                if status != self.skill_status[skill_name]:
+                    self.skill_status[skill_name] = status
+                    changed = True
+            return changed
+        for skill_name, skill_runtime_thread in self.skill_runtime_threads.items():
+            state = skill_runtime_thread.skill.data_exchange.snapshot().stSkillState
+            # published structs are only replaced on change
+            if state is self._skill_status_published.get(skill_name):
+                continue
+            self._skill_status_published[skill_name] = state
+            status = ST_SkillStatus(
+                strName=skill_name,
+                eActiveState=int(state.eActiveState),
+                eActiveMode=int(state.eActiveMode),
+                bError=bool(state.bError),
+                udiErrorID=int(state.udiErrorID),
+            )
+            if status != self.skill_status[skill_name]:
+                self.skill_status[skill_name] = status
+                changed = True
+        return changed
+
+    def check_commands(
+        self, entries: list[tuple[str, ST_SkillCommand, dict[str, str]]]
+    ) -> list[Exception]:
+        """check batch of skill commands for submit_commands
+
+        Args:
+            entries (list[tuple[str, ST_SkillCommand, dict[str, str]]]): (skill name, command, parameter values or None) entries
+
+        Returns:
+            list[Exception]: error of each entry, None if entry is valid
+        """
+        errors = []
+        counts: dict[str, int] = {}
+        for skill_name, command, parameters in entries:
+            if skill_name not in self.skill_runtime_threads:
+                errors.append(KeyError(f"Skill '{skill_name}' not registered!"))
+                continue
+            data_exchange = self.skill_runtime_threads[skill_name].skill.data_exchange
+            try:
+                data_exchange.check_parameters(parameters)
+            except KeyError as e:
+                errors.append(e)
+                continue
+            counts[skill_name] = counts.get(skill_name, 0) + 1
+            if (
+                data_exchange.pending_commands() + counts[skill_name]
+                > data_exchange.maxsize
+            ):
+                errors.append(
+                    queue.Full(f"Command queue of skill '{skill_name}' full!")
+                )
+                continue
+            errors.append(None)
+        return errors
+
+    def submit_commands(
+        self, entries: list[tuple[str, ST_SkillCommand, dict[str, str]]]
+    ) -> list[int]:
+        """submit batch of skill commands, applied together in the same skill cycle with aligned_cycles.
+        With aligned_cycles, skill runtime threads start their cycles aligned to a common epoch and all commands are released for the next cycle start after submission.
+        Otherwise all commands are released at once after queueing and applied in the next cycle of each skill.
+        Either all or no command is queued.
+
+        Args:
+            entries (list[tuple[str, ST_SkillCommand, dict[str, str]]]): (skill name, command, parameter values or None) entries
+
+        Raises:
+            KeyError: if skill or parameter is unknown
+            queue.Full: if command queue of a skill is full
+
+        Returns:
+            list[int]: command sequence number of each entry (per skill)
+        """
+        for error in self.check_commands(entries):
+            if error is not None:
+                raise error
+        requests: list[SkillCommandRequest] = []
+        try:
+            for skill_name, command, parameters in entries:
+                # hold back commands until all are queued
+                request = SkillCommandRequest(
+                    command=copy.deepcopy(command),
+                    parameters=dict(parameters) if parameters else None,
+                    release_time=math.inf,
+                )
+                self.skill_runtime_threads[skill_name].skill.data_exchange.post_request(
+                    request
+                )
+                requests.append(request)
+        except queue.Full:
+            # queue filled concurrently, cancel already queued commands
+            for request in requests:
+                request.command = ST_SkillCommand()
+                request.parameters = None
+                request.release_time = 0.0
+            raise
+        release_time = self.clock.time()
+        if self.epoch is not None:
+            release_time = next_tick(self.epoch, self.skill_cycletime, release_time)
+        for request in requests:
+            request.release_time = release_time
+        return [request.seq for request in requests]
+
+    def profile(
+        self, target: str, duration: float, path: str = None
+    ) -> Profile_Request:
+        """profile cycles of skill runtime thread or server loop with cProfile for duration, without waiting.
+        Profiling is enabled in the profiled thread for its cycles only, threads not profiled run without overhead.
+        Only one target is profiled at a time, cProfile allows one active profiler per process on python 3.12+.
+
+        Args:
+            target (str): skill name or server name (server loop)
+            duration (float): profiling duration in seconds
+            path (str, optional): file path of pstats dump. Defaults to None ("<target>_<time>.prof" in profile_dir).
+
+        Raises:
+            KeyError: if target is no skill name or server name
+            RuntimeError: if profiling of any target is active
+
+        Returns:
+            Profile_Request: request, request.done is set when profiling is done, summary in request.stats
+        """
+        if path is None:
+            path = os.path.join(
+                self.profile_dir, f"{target}_{time.strftime('%Y%m%d_%H%M%S')}.prof"
+            )
+        active = [
+            request.target
+            for request in self.profile_requests
+            if not request.done.is_set()
+        ]
+        if active:
+            raise RuntimeError(f"Profiling of '{active[0]}' is active!")
+        request = Profile_Request(target=target, duration=duration, path=path)
+        if target == self.server_name:
+            if self.server_profile_request is not None:
+                raise RuntimeError(f"Server loop '{target}' is already profiled!")
+            self.server_profile_request = request
+        elif target in self.skill_runtime_threads:
+            skill_runtime_thread = self.skill_runtime_threads[target]
+            if skill_runtime_thread.profile_request is not None:
+                raise RuntimeError(f"Skill '{target}' is already profiled!")
+            skill_runtime_thread.profile_request = request
+        else:
+            raise KeyError(f"Unknown skill or server '{target}'!")
+        self.profile_requests.append(request)
+        if self.logger:
+            self.logger.info(
+                f"SkillServer {self.server_name}: profiling '{target}' for {duration} s to '{path}'."
+            )
+        return request
+
+    def profile_done(self, request: Profile_Request):
+        """method called in server cycle when profiling request is done. Can be overrided with subclass but also call this method!
+
+        Args:
+            request (Profile_Request): done profiling request
+        """
+        if self.logger:
+            self.logger.info(
+                f"SkillServer {self.server_name}: profiling '{request.target}' done."
+            )
+
+    def dump_flight_recorder(self, skill_name: str, path: str = None) -> str:
+        """dump last cycles of skill recorded by its flight recorder to json file
+
+        Args:
+            skill_name (str): skill name
+            path (str, optional): file path. Defaults to None (file in flight_recorder_dir).
+
+        Raises:
+            KeyError: if skill is not registered or has no flight recorder (flight_recorder_cycles=0)
+
+        Returns:
+            str: file path, None if writing failed
+        """
+        if skill_name not in self.skill_runtime_threads:
+            raise KeyError(f"Skill '{skill_name}' not registered!")
+        flight_recorder = self.skill_runtime_threads[skill_name].flight_recorder
+        if flight_recorder is None:
+            raise KeyError(f"Skill '{skill_name}' has no flight recorder!")
+        return flight_recorder.dump(path)
+
     def stop_server(self):
         """server stop method. Can be overrided with subclass but also call this method!"""
         # stop skill_runtime_threads
         self._stop_skill_runtime_threads()
+        for skill_worker in self.skill_workers:
+            skill_worker.stop()
+        if self.metrics is not None:
+            self.metrics.stop()
         if self.logger:
             self.logger.info(f"SkillServer {self.server_name}: server stopped.")
 
@@ -96,8 +481,9 @@ class SkillServer(threading.Thread):
         """stops all skill_runtime_threads"""
         for skill_name in self.skill_runtime_threads:
             self.skill_runtime_threads[skill_name].running = False
-        for skill_name in self.skill_runtime_threads:
-            self.skill_runtime_threads[skill_name].join()
+        with self.clock.waiting():
+            for skill_name in self.skill_runtime_threads:
+                self.skill_runtime_threads[skill_name].join()
 
     def read_skill_data(self, skill_name: str):
         """method for skill to read data from server. Override with subclass
@@ -115,8 +501,25 @@ class SkillServer(threading.Thread):
         """
         pass
 
+    def _read_skill_data_measured(self, skill: BaseSkill):
+        """read_skill_data, execution duration (time.perf_counter, also under virtual clock) observed by metrics"""
+        t0 = time.perf_counter()
+        self.read_skill_data(skill)
+        self.metrics.skills[
+            skill.data.stSkillDataDefault.strName
+        ].read_duration.observe(time.perf_counter() - t0)
+
+    def _write_skill_data_measured(self, skill: BaseSkill):
+        """write_skill_data, execution duration (time.perf_counter, also under virtual clock) observed by metrics"""
+        t0 = time.perf_counter()
+        self.write_skill_data(skill)
+        self.metrics.skills[
+            skill.data.stSkillDataDefault.strName
+        ].write_duration.observe(time.perf_counter() - t0)
+
     def start(self):
         """Start the thread's activity. also wait for running"""
+        self.clock.attach(self)
         super().start()
         while not self.running:
             time.sleep(0.001)
@@ -124,4 +527,5 @@ class SkillServer(threading.Thread):
     def stop(self):
         """external method for stopping server"""
         self.running = False
-        self.join()
+        with self.clock.waiting():
+            self.join()
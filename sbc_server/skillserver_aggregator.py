@@ -0,0 +1,368 @@
+import logging
+import dataclasses
+from asyncua.sync import Server, Client, SyncNode, Subscription, ua
+from asyncua.ua.ua_binary import struct_from_binary
+from asyncua.common.utils import Buffer
+from sbc_statemachine.skilldatatypes import ST_Skill
+from .opcua_codec import ENCODED_BYTES_CACHE
+from .opcua_fastpath import AddressSpaceAccess, to_datavalue
+from .skillserver import SkillServer, ST_SkillStatus
+from .skillserver_opcua import (
+    OPCUA_Types,
+    SERVER_FOLDER_NAME,
+    register_skill_type_to_asyncua_server,
+    _method_error,
+)
+
+# child variable of downstream folders, which are skill folders
+SKILL_FOLDER_MARKER = "stSkillState"
+
+
+@dataclasses.dataclass
+class Downstream_Handle:
+    """dataclass for storing client, subscription and mirrored skills of each downstream skill server"""
+
+    url: str
+    client: Client = None
+    subscription: Subscription = None
+    skill_names: list[str] = dataclasses.field(default_factory=list)
+    # downstream variable node id -> mirrored node id, data type node id
+    mirrored_nodes: dict[ua.NodeId, tuple[ua.NodeId, ua.NodeId]] = dataclasses.field(
+        default_factory=dict
+    )
+    connected: bool = False
+    last_connect_time: float = 0.0
+
+
+class SkillServer_Aggregator(SkillServer):
+    """opc ua server aggregating the skills of several downstream skill servers (e.g. SkillServer_OPCUA) behind one endpoint.
+    Connects as client to each downstream server, mirrors its skill folders (variables and methods) into own namespace
+    and forwards method calls (commands) to the downstream server.
+    Downstream value changes arrive by one subscription per downstream server and are written directly to the mirrored nodes.
+    Aggregator clients command skills by methods (e.g. Start, SetParameters), mirrored variables are read only.
+    """
+
+    def __init__(
+        self,
+        downstream_urls: list[str],
+        server_cycletime: float = 0.1,
+        server_name: str = "SkillServer Aggregator",
+        hostname: str = "0.0.0.0",
+        port: int = 4840,
+        namespaceIndex: int = 2,
+        subscription_period: float = 50,
+        reconnect_interval: float = 5.0,
+        logger: logging.Logger = None,
+        **kwargs,
+    ) -> None:
+        """opc ua server aggregating the skills of several downstream skill servers behind one endpoint.
+
+        Args:
+            downstream_urls (list[str]): endpoint urls of downstream skill servers, e.g. "opc.tcp://localhost:4841"
+            server_cycletime (float, optional): server cycletime. Defaults to 0.1.
+            server_name (str, optional): opc ua server name. Defaults to "SkillServer Aggregator".
+            hostname (str, optional): hostname like ip. Defaults to "0.0.0.0".
+            port (int, optional): opc ua server port. Defaults to 4840.
+            namespaceIndex (int, optional): opc ua namespace index for mirrored skill nodes. Defaults to 2.
+            subscription_period (float, optional): publishing interval of downstream subscriptions in milliseconds. Defaults to 50.
+            reconnect_interval (float, optional): min time between connection attempts to lost downstream server in seconds. Defaults to 5.0.
+            logger (logging.Logger, optional): logger for logging. Defaults to None.
+            **kwargs (): additional arguments for threading.Thread.__init__
+        """
+        super().__init__(
+            skills=[],
+            skill_cycletime=server_cycletime * 2.0,
+            server_cycletime=server_cycletime,
+            server_name=server_name,
+            logger=logger,
+            **kwargs,
+        )
+        self.hostname = hostname
+        self.port = port
+        self.namespaceIndex = namespaceIndex
+        self.subscription_period = subscription_period
+        self.reconnect_interval = reconnect_interval
+        self.server = Server()  # create opc ua server
+        self.address_space_access: AddressSpaceAccess = None
+        self.downstreams = [Downstream_Handle(url=url) for url in downstream_urls]
+        # mirrored skill name -> downstream handle
+        self.skill_downstreams: dict[str, Downstream_Handle] = {}
+
+    def start_server(self):
+        """start opc ua server, register skill types, connect to downstream servers and mirror their skills"""
+        self.server.set_endpoint(f"opc.tcp://{self.hostname}:{self.port}")
+        self.server.set_server_name(self.server_name)
+        self.server.start()
+        self.address_space_access = AddressSpaceAccess(self.server)
+        # register skill types, mirrored values are decoded to these types
+        register_skill_type_to_asyncua_server(
+            cls=ST_Skill,
+            server=self.server,
+            OPCUA_Types=OPCUA_Types,
+            logger=self.logger,
+        )
+        register_skill_type_to_asyncua_server(
+            cls=ST_SkillStatus,
+            server=self.server,
+            OPCUA_Types=OPCUA_Types,
+            logger=self.logger,
+        )
+        for downstream in self.downstreams:
+            self._connect(downstream)
+        if self.logger:
+            self.logger.info(
+                f"Started OPC UA Server '{self.server_name}' with endpoint 'opc.tcp://{self.hostname}:{self.port}', "
+                f"mirroring {len(self.skill_downstreams)} skills of {len(self.downstreams)} servers."
+            )
+        super().start_server()
+
+    def server_cycle(self):
+        """server cycle, reconnects to lost downstream servers"""
+        super().server_cycle()
+        for downstream in self.downstreams:
+            if (
+                not downstream.connected
+                and self.clock.time() - downstream.last_connect_time
+                >= self.reconnect_interval
+            ):
+                self._connect(downstream)
+
+    def stop_server(self):
+        """stop"""
+        super().stop_server()
+        for downstream in self.downstreams:
+            self._disconnect(downstream)
+        self.server.stop()
+        if self.logger:
+            self.logger.info(
+                f"Stopped OPC UA Server '{self.server_name}' with endpoint 'opc.tcp://{self.hostname}:{self.port}'."
+            )
+
+    def _connect(self, downstream: Downstream_Handle) -> None:
+        """connect to downstream server, mirror its skill folders (missing nodes only) and subscribe to mirrored variables"""
+        self._disconnect(downstream)
+        downstream.last_connect_time = self.clock.time()
+        downstream.client = Client(downstream.url)
+        try:
+            downstream.client.connect()
+            variable_nodes = []
+            for folder in self._downstream_skill_folders(downstream.client):
+                try:
+                    variable_nodes += self._mirrorSkill(downstream, folder)
+                except KeyError as e:
+                    # duplicate skill name, skill is not mirrored
+                    if self.logger:
+                        self.logger.error(
+                            f"Mirroring skill of downstream skill server '{downstream.url}' failed: {e}"
+                        )
+            downstream.subscription = downstream.client.create_subscription(
+                self.subscription_period, _DownstreamHandler(self, downstream)
+            )
+            downstream.subscription.subscribe_data_change(variable_nodes)
+        except (OSError, TimeoutError, ua.UaError) as e:
+            if self.logger:
+                self.logger.warning(
+                    f"Connecting downstream skill server '{downstream.url}' failed: {e}"
+                )
+            self._disconnect(downstream)
+            return
+        downstream.connected = True
+        if self.logger:
+            self.logger.info(
+                f"Connected downstream skill server '{downstream.url}' with skills {downstream.skill_names}."
+            )
+
+    def _disconnect(self, downstream: Downstream_Handle) -> None:
+        """disconnect from downstream server, if connected"""
+        downstream.connected = False
+        if downstream.client is None:
+            return
+        try:
+            downstream.client.disconnect()
+        except Exception:
+            pass  # connection already lost
+        downstream.client = None
+        downstream.subscription = None
+
+    def _downstream_skill_folders(self, client: Client) -> list[SyncNode]:
+        """get skill folders of downstream server: objects with child variable stSkillState"""
+        folders = []
+        for description in client.nodes.objects.get_children_descriptions():
+            if (
+                description.NodeId.NamespaceIndex == 0
+                or description.BrowseName.Name == SERVER_FOLDER_NAME
+            ):
+                continue
+            folder = client.get_node(description.NodeId)
+            if any(
+                child.BrowseName.Name == SKILL_FOLDER_MARKER
+                for child in folder.get_children_descriptions()
+            ):
+                folders.append(folder)
+        return folders
+
+    def _mirrorSkill(
+        self, downstream: Downstream_Handle, folder: SyncNode
+    ) -> list[SyncNode]:
+        """mirror skill folder of downstream server: variables as read only nodes, methods forwarding calls.
+        Only nodes missing in own address space are created, so reconnects complete partly mirrored skills.
+
+        Args:
+            downstream (Downstream_Handle): downstream server
+            folder (SyncNode): skill folder of downstream server
+
+        Raises:
+            KeyError: if skill name is already mirrored from other downstream server
+
+        Returns:
+            list[SyncNode]: downstream variable nodes to subscribe
+        """
+        skill_name = folder.read_browse_name().Name
+        owner = self.skill_downstreams.get(skill_name)
+        if owner is None:
+            self.skill_downstreams[skill_name] = downstream
+            downstream.skill_names.append(skill_name)
+        elif owner is not downstream:
+            raise KeyError(f"Skill with name '{skill_name}' already registered!")
+        skill_node_id = ua.NodeId(skill_name, self.namespaceIndex)
+        if self._has_node(skill_node_id):
+            skill_node = self.server.get_node(skill_node_id)
+        else:
+            skill_node = self.server.nodes.objects.add_folder(skill_node_id, skill_name)
+        variable_nodes = []
+        for description in folder.get_children_descriptions():
+            node = downstream.client.get_node(description.NodeId)
+            node_id = ua.NodeId(
+                skill_name + "." + description.BrowseName.Name, self.namespaceIndex
+            )
+            if description.NodeClass == ua.NodeClass.Variable:
+                datatype = node.read_data_type()
+                if not self._has_node(node_id):
+                    skill_node.add_variable(
+                        node_id,
+                        description.BrowseName.Name,
+                        _mirror_variant(node.read_data_value().Value, datatype),
+                        datatype=datatype,
+                    )
+                downstream.mirrored_nodes[description.NodeId] = (node_id, datatype)
+                variable_nodes.append(node)
+            elif description.NodeClass == ua.NodeClass.Method and not self._has_node(
+                node_id
+            ):
+                skill_node.add_method(
+                    node_id,
+                    description.BrowseName.Name,
+                    self._forward_method(downstream, folder.nodeid, description.NodeId),
+                    _method_arguments(node, "InputArguments"),
+                    _method_arguments(node, "OutputArguments"),
+                )
+        return variable_nodes
+
+    def _has_node(self, node_id: ua.NodeId) -> bool:
+        """check if node exists in own address space"""
+        return node_id in self.address_space_access.aspace
+
+    def _forward_method(
+        self, downstream: Downstream_Handle, object_id: ua.NodeId, method_id: ua.NodeId
+    ):
+        """create opc ua method callback, calling method of downstream server with same arguments and returning its result"""
+
+        def call(parent, *args):
+            client = downstream.client
+            if not downstream.connected or client is None:
+                return _method_error(ua.StatusCodes.BadCommunicationError)
+            request = ua.CallMethodRequest()
+            request.ObjectId = object_id
+            request.MethodId = method_id
+            request.InputArguments = list(args)
+            try:
+                return client.tloop.post(client.aio_obj.uaclient.call([request]))[0]
+            except (OSError, TimeoutError, ua.UaError) as e:
+                if self.logger:
+                    self.logger.warning(
+                        f"Forwarding method call to '{downstream.url}' failed: {e}"
+                    )
+                return _method_error(ua.StatusCodes.BadCommunicationError)
+
+        return call
+
+    def mirror_value(
+        self, downstream: Downstream_Handle, nodeid: ua.NodeId, dv: ua.DataValue
+    ):
+        """write data value of downstream node to mirrored node, called by subscription
+
+        Args:
+            downstream (Downstream_Handle): downstream server
+            nodeid (ua.NodeId): downstream node id
+            dv (ua.DataValue): new data value of downstream node
+        """
+        mirrored = downstream.mirrored_nodes.get(nodeid)
+        if mirrored is None:
+            return
+        mirrored_node_id, datatype = mirrored
+        self.address_space_access.write(
+            mirrored_node_id, to_datavalue(_mirror_variant(dv.Value, datatype))
+        )
+
+    def get_skill_names(self) -> list[str]:
+        """get names of mirrored skills
+
+        Returns:
+            list[str]: skill names
+        """
+        return list(self.skill_downstreams)
+
+
+class _DownstreamHandler:
+    """subscription handler of downstream server, called in asyncua client loop thread"""
+
+    def __init__(
+        self, aggregator: SkillServer_Aggregator, downstream: Downstream_Handle
+    ) -> None:
+        self.aggregator = aggregator
+        self.downstream = downstream
+
+    def datachange_notification(self, node: SyncNode, val, data) -> None:
+        self.aggregator.mirror_value(
+            self.downstream, node.nodeid, data.monitored_item.Value
+        )
+
+    def status_change_notification(self, status) -> None:
+        # connection lost, reconnected by server cycle
+        self.downstream.connected = False
+
+
+def _method_arguments(method_node: SyncNode, property_name: str) -> list[ua.Argument]:
+    """read input or output arguments of method node, empty if method has no arguments"""
+    try:
+        return list(method_node.get_child("0:" + property_name).read_value())
+    except ua.UaError:
+        return []
+
+
+def _mirror_variant(variant: ua.Variant, datatype: ua.NodeId) -> ua.Variant:
+    """decode structures not decoded by client (encoding node ids of downstream server unknown) to own types of data type"""
+    cls = ua.extension_objects_by_datatype.get(datatype)
+    value = variant.Value
+    if cls is None:
+        return variant
+    if isinstance(value, ua.ExtensionObject):
+        value = struct_from_binary(cls, Buffer(value.Body))
+    elif isinstance(value, list) and any(
+        isinstance(v, ua.ExtensionObject) for v in value
+    ):
+        value = [
+            (
+                struct_from_binary(cls, Buffer(v.Body))
+                if isinstance(v, ua.ExtensionObject)
+                else v
+            )
+            for v in value
+        ]
+    else:
+        return variant
+    # decoded values are only written to the mirrored node, their encoding is shared by all subscribed clients
+    for v in value if isinstance(value, list) else [value]:
+        if dataclasses.is_dataclass(v):
+            ENCODED_BYTES_CACHE.publish(v)
+    return ua.Variant(value, ua.VariantType.ExtensionObject)
@@ -0,0 +1,422 @@
+import os
+import enum
+import queue
+import socket
+import struct
+import logging
+import threading
+import dataclasses
+from sbc_statemachine.skilldatatypes import ST_SkillCommand
+from .baseskill import BaseSkill
+from .skillserver import SkillServer
+from .skilldataexchange import SKILL_COMMAND_METHODS, state_command
+
+DEFAULT_SOCKET_PATH = "/tmp/sbc_server.sock"
+
+# frame header: message type, status, skill index, payload length
+FRAME_HEADER = struct.Struct("<BBHI")
+# state payload: eActiveState, eActiveMode, eActiveCommand, bError, udiErrorID, command sequence number, followed by strErrorMsg
+STATE_PAYLOAD = struct.Struct("<iiiBIQ")
+# command payload: state command bits (bit i: SKILL_COMMAND_METHODS[i]), followed by parameter name/value strings
+COMMAND_PAYLOAD = struct.Struct("<H")
+# command response payload: command sequence number
+SEQ_PAYLOAD = struct.Struct("<Q")
+# utf-8 string prefix: byte length
+STRING_LENGTH = struct.Struct("<H")
+
+
+class EIPCMessage(enum.IntEnum):
+    """message types of skill server ipc protocol"""
+
+    Skills = 1  # response: skill names, index in list is skill index
+    # queue state command and parameter values, response: command sequence number
+    Command = 2
+    State = 3  # response: state of skill
+    Parameters = 4  # response: parameter names and values of stSkillDataCommand
+
+
+class EIPCStatus(enum.IntEnum):
+    """response status of skill server ipc protocol"""
+
+    Good = 0
+    UnknownSkill = 1
+    InvalidArgument = 2
+    QueueFull = 3
+    BadMessage = 4
+    InternalError = (
+        5  # response not encodable, e.g. value out of range of payload field
+    )
+
+
+@dataclasses.dataclass
+class IPC_Skill_State:
+    """state of skill received by SkillClient_IPC"""
+
+    eActiveState: int = 0
+    eActiveMode: int = 0
+    eActiveCommand: int = 0
+    bError: bool = False
+    udiErrorID: int = 0
+    command_seq: int = 0
+    strErrorMsg: str = ""
+
+
+class SkillServer_IPC(SkillServer):
+    """skill server for orchestrators on the same host: commands, state and parameters over a unix domain socket
+    with compact binary framing (see FRAME_HEADER) instead of opc ua.
+    Requests are answered directly from the skill data exchange of the skills (command queue, published snapshots)
+    in a thread per connection, so they do not wait for skill or server cycles. See SkillClient_IPC.
+    """
+
+    def __init__(
+        self,
+        skills: list[BaseSkill],
+        skill_cycletime: float = 0.5,
+        server_cycletime: float = 0.1,
+        server_name: str = "BaseSkilldControl IPC Server",
+        socket_path: str = DEFAULT_SOCKET_PATH,
+        logger: logging.Logger = None,
+        **kwargs,
+    ) -> None:
+        """skill server for orchestrators on the same host: commands, state and parameters over a unix domain socket.
+
+        Args:
+            skills (list[BaseSkill]): instance objects of all skills to run
+            skill_cycletime (float, optional): skill runtime thread cycletime. Defaults to 0.5.
+            server_cycletime (float, optional): server cycletime. Will be set to skill_cycletime/2 if longer! Defaults to 0.1.
+            server_name (str, optional): server name. Defaults to "BaseSkilldControl IPC Server".
+            socket_path (str, optional): path of unix domain socket, existing file is replaced. Defaults to DEFAULT_SOCKET_PATH.
+            logger (logging.Logger, optional): logger for logging. Defaults to None.
+            **kwargs (): additional arguments for threading.Thread.__init__
+        """
+        super().__init__(
+            skills=skills,
+            skill_cycletime=skill_cycletime,
+            server_cycletime=server_cycletime,
+            server_name=server_name,
+            logger=logger,
+            **kwargs,
+        )
+        self.socket_path = socket_path
+        # skill index of protocol -> skill
+        self.skills: list[BaseSkill] = [
+            skill_runtime_thread.skill
+            for skill_runtime_thread in self.skill_runtime_threads.values()
+        ]
+        self._skill_names_payload = _pack_strings(list(self.skill_runtime_threads))
+        self._socket: socket.socket = None
+        self._accept_thread: threading.Thread = None
+        self._connections: list[socket.socket] = []
+        self._connections_lock = threading.Lock()
+
+    def start_server(self):
+        """start skill runtime threads and listen on unix domain socket"""
+        super().start_server()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.bind(self.socket_path)
+        self._socket.listen()
+        self._accept_thread = threading.Thread(
+            target=self._accept, name=self.server_name + "_Accept", daemon=True
+        )
+        self._accept_thread.start()
+        if self.logger:
+            self.logger.info(
+                f"Started IPC Server '{self.server_name}' on socket '{self.socket_path}'."
+            )
+
+    def stop_server(self):
+        """close socket and connections, stop skill runtime threads"""
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)  # wakes up blocking accept
+        except OSError:
+            pass
+        self._socket.close()
+        with self._connections_lock:
+            for connection in self._connections:
+                try:
+                    connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass  # already closed by client
+        self._accept_thread.join()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        super().stop_server()
+        if self.logger:
+            self.logger.info(
+                f"Stopped IPC Server '{self.server_name}' on socket '{self.socket_path}'."
+            )
+
+    def _accept(self) -> None:
+        """accept connections until socket is closed, serve each connection in own thread"""
+        while True:
+            try:
+                connection, _ = self._socket.accept()
+            except OSError:
+                break
+            with self._connections_lock:
+                self._connections.append(connection)
+            threading.Thread(
+                target=self._serve,
+                args=(connection,),
+                name=self.server_name + "_Connection",
+                daemon=True,
+            ).start()
+
+    def _serve(self, connection: socket.socket) -> None:
+        """answer requests of connection until closed"""
+        try:
+            while True:
+                header = _recv_exact(connection, FRAME_HEADER.size)
+                message_type, _, skill_index, length = FRAME_HEADER.unpack(header)
+                payload = _recv_exact(connection, length) if length else b""
+                status, response = self.handle_message(
+                    message_type, skill_index, payload
+                )
+                connection.sendall(
+                    FRAME_HEADER.pack(message_type, status, skill_index, len(response))
+                    + response
+                )
+        except (ConnectionError, OSError):
+            pass  # connection closed
+        finally:
+            with self._connections_lock:
+                self._connections.remove(connection)
+            connection.close()
+
+    def handle_message(
+        self, message_type: int, skill_index: int, payload: bytes
+    ) -> tuple[EIPCStatus, bytes]:
+        """handle request message
+
+        Args:
+            message_type (int): EIPCMessage
+            skill_index (int): index of skill in skill list (see EIPCMessage.Skills)
+            payload (bytes): request payload
+
+        Returns:
+            tuple[EIPCStatus, bytes]: response status, response payload
+        """
+        if message_type == EIPCMessage.Skills:
+            return EIPCStatus.Good, self._skill_names_payload
+        if skill_index >= len(self.skills):
+            return EIPCStatus.UnknownSkill, b""
+        skill = self.skills[skill_index]
+        if message_type == EIPCMessage.Command:
+            try:
+                (bits,) = COMMAND_PAYLOAD.unpack_from(payload)
+                strings = _unpack_strings(payload, COMMAND_PAYLOAD.size)
+            except (struct.error, UnicodeDecodeError):
+                return EIPCStatus.BadMessage, b""
+            command = ST_SkillCommand()
+            for i, command_name in enumerate(SKILL_COMMAND_METHODS):
+                if bits & (1 << i):
+                    setattr(command.stCommand_State, command_name, True)
+            parameters = dict(zip(strings[0::2], strings[1::2])) or None
+            try:
+                seq = skill.data_exchange.post_command(command, parameters)
+            except KeyError:
+                return EIPCStatus.InvalidArgument, b""
+            except queue.Full:
+                return EIPCStatus.QueueFull, b""
+            return EIPCStatus.Good, SEQ_PAYLOAD.pack(seq)
+        snapshot = skill.data_exchange.snapshot()
+        try:
+            if message_type == EIPCMessage.State:
+                state = snapshot.stSkillState
+                return (
+                    EIPCStatus.Good,
+                    STATE_PAYLOAD.pack(
+                        state.eActiveState,
+                        state.eActiveMode,
+                        state.eActiveCommand,
+                        state.bError,
+                        state.udiErrorID,
+                        snapshot.command_seq,
+                    )
+                    + _pack_strings([state.strErrorMsg]),
+                )
+            if message_type == EIPCMessage.Parameters:
+                strings = []
+                for parameter in snapshot.stSkillDataCommand.astParameters:
+                    strings += [parameter.strName, parameter.strValue]
+                return EIPCStatus.Good, _pack_strings(strings)
+        except struct.error as e:
+            if self.logger:
+                self.logger.error(
+                    f"IPC Server '{self.server_name}': {EIPCMessage(message_type).name} of skill '{skill.data.stSkillDataDefault.strName}' not encodable, {e}"
+                )
+            return EIPCStatus.InternalError, b""
+        return EIPCStatus.BadMessage, b""
+
+
+class SkillClient_IPC:
+    """client of SkillServer_IPC, one request at a time per client (thread safe)"""
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH) -> None:
+        """client of SkillServer_IPC
+
+        Args:
+            socket_path (str, optional): path of unix domain socket of server. Defaults to DEFAULT_SOCKET_PATH.
+        """
+        self.socket_path = socket_path
+        self.skill_names: list[str] = []
+        self._skill_index: dict[str, int] = {}
+        self._socket: socket.socket = None
+        self._lock = threading.Lock()
+
+    def connect(self) -> None:
+        """connect to server and get skill names"""
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(self.socket_path)
+        self.skill_names = _unpack_strings(self._request(EIPCMessage.Skills, 0))
+        self._skill_index = {name: i for i, name in enumerate(self.skill_names)}
+
+    def close(self) -> None:
+        """close connection"""
+        self._socket.close()
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def command(
+        self, skill_name: str, command_name: str = "", parameters: dict[str, str] = None
+    ) -> int:
+        """queue state command and parameter values for skill
+
+        Args:
+            skill_name (str): skill name
+            command_name (str, optional): state command name (see SKILL_COMMAND_METHODS) or empty for parameters only. Defaults to "".
+            parameters (dict[str, str], optional): parameter values by parameter name. Defaults to None.
+
+        Raises:
+            KeyError: if skill, command or parameter is unknown
+            queue.Full: if command queue of skill is full
+
+        Returns:
+            int: command sequence number
+        """
+        state_command(command_name)  # raises KeyError for unknown command
+        bits = 1 << SKILL_COMMAND_METHODS.index(command_name) if command_name else 0
+        strings = []
+        for name, value in (parameters or {}).items():
+            strings += [name, value]
+        payload = COMMAND_PAYLOAD.pack(bits) + _pack_strings(strings)
+        response = self._request(EIPCMessage.Command, skill_name, payload)
+        return SEQ_PAYLOAD.unpack(response)[0]
+
+    def get_state(self, skill_name: str) -> IPC_Skill_State:
+        """get state of skill of latest published skill data snapshot
+
+        Args:
+            skill_name (str): skill name
+
+        Raises:
+            KeyError: if skill is unknown
+            RuntimeError: if server failed to encode response
+
+        Returns:
+            IPC_Skill_State: state of skill
+        """
+        response = self._request(EIPCMessage.State, skill_name)
+        values = STATE_PAYLOAD.unpack_from(response)
+        (error_msg,) = _unpack_strings(response, STATE_PAYLOAD.size)
+        return IPC_Skill_State(
+            eActiveState=values[0],
+            eActiveMode=values[1],
+            eActiveCommand=values[2],
+            bError=bool(values[3]),
+            udiErrorID=values[4],
+            command_seq=values[5],
+            strErrorMsg=error_msg,
+        )
+
+    def get_parameters(self, skill_name: str) -> dict[str, str]:
+        """get parameter values of stSkillDataCommand of latest published skill data snapshot
+
+        Args:
+            skill_name (str): skill name
+
+        Raises:
+            KeyError: if skill is unknown
+            RuntimeError: if server failed to encode response
+
+        Returns:
+            dict[str, str]: parameter values by parameter name
+        """
+        strings = _unpack_strings(self._request(EIPCMessage.Parameters, skill_name))
+        return dict(zip(strings[0::2], strings[1::2]))
+
+    def _request(
+        self, message_type: EIPCMessage, skill_name: str | int, payload: bytes = b""
+    ) -> bytes:
+        """send request and receive response payload, raise error of response status"""
+        if isinstance(skill_name, str):
+            if skill_name not in self._skill_index:
+                raise KeyError(f"Skill '{skill_name}' not registered!")
+            skill_index = self._skill_index[skill_name]
+        else:
+            skill_index = skill_name
+        with self._lock:
+            self._socket.sendall(
+                FRAME_HEADER.pack(message_type, 0, skill_index, len(payload)) + payload
+            )
+            header = _recv_exact(self._socket, FRAME_HEADER.size)
+            _, status, _, length = FRAME_HEADER.unpack(header)
+            response = _recv_exact(self._socket, length) if length else b""
+        if status == EIPCStatus.UnknownSkill:
+            raise KeyError(f"Skill '{skill_name}' not registered!")
+        if status == EIPCStatus.InvalidArgument:
+            raise KeyError(f"Unknown parameter for skill '{skill_name}'!")
+        if status == EIPCStatus.QueueFull:
+            raise queue.Full(f"Command queue of skill '{skill_name}' full!")
+        if status == EIPCStatus.InternalError:
+            raise RuntimeError(
+                f"Server failed to encode {EIPCMessage(message_type).name} of skill '{skill_name}'!"
+            )
+        if status != EIPCStatus.Good:
+            raise ValueError(f"Bad message {EIPCMessage(message_type).name}!")
+        return response
+
+
+def _recv_exact(connection: socket.socket, size: int) -> bytes:
+    """receive exactly size bytes
+
+    Raises:
+        ConnectionError: if connection is closed
+    """
+    data = connection.recv(size)
+    if len(data) == size:
+        return data
+    buffer = bytearray(data)
+    while len(buffer) < size:
+        data = connection.recv(size - len(buffer))
+        if not data:
+            raise ConnectionError("Connection closed!")
+        buffer += data
+    return bytes(buffer)
+
+
+def _pack_strings(strings: list[str]) -> bytes:
+    """pack strings as utf-8 with length prefix"""
+    parts = []
+    for string in strings:
+        encoded = string.encode("utf-8")
+        parts += [STRING_LENGTH.pack(len(encoded)), encoded]
+    return b"".join(parts)
+
+
+def _unpack_strings(payload: bytes, offset: int = 0) -> list[str]:
+    """unpack utf-8 strings with length prefix from offset to end of payload"""
+    strings = []
+    while offset < len(payload):
+        (length,) = STRING_LENGTH.unpack_from(payload, offset)
+        offset += STRING_LENGTH.size
+        strings.append(payload[offset : offset + length].decode("utf-8"))
+        offset += length
+    return strings
@@ -1,5 +1,6 @@
 import enum
-import time
+import json
+import queue
 import logging
 import dataclasses
 from asyncua.sync import Server, SyncNode, ua, new_struct
@@ -13,13 +14,34 @@ from sbc_statemachine.skilldatatypes import (
     ST_Base,
 )
 from .mapVar import mapVar, copy
-from .skillserver import SkillServer
+from .opcua_codec import register_skill_type_codecs, ENCODED_BYTES_CACHE
+from .opcua_fastpath import AddressSpaceAccess, FastNode, to_datavalue
+from .opcua_events import SkillEventPublisher
+from .skillserver import SkillServer, ST_SkillStatus
+from .profiler import Profile_Request
+from .skillpool import SkillPool
 from .baseskill import BaseSkill
+from .skilldataexchange import (
+    SKILL_COMMAND_METHODS,
+    SkillDataSnapshot,
+    state_command,
+)
 
 OPCUA_TYPE_SUFFIX = "_py"  # type suffix for multi vendor servers
 
 OPCUA_Types = {}  # dict for storing opc ua skill types
 
+FLAT_NODE_STRUCTS = [
+    "stSkillCommand",
+    "stSkillState",
+    "stSkillDataCommand",
+]  # skill data structs exposed as flattened per-field nodes
+FLAT_NODE_WRITABLE_STRUCTS = [
+    "stSkillCommand",
+    "stSkillDataCommand",
+]  # flattened per-field nodes writable by clients
+SERVER_FOLDER_NAME = "SkillServer"  # folder of server level nodes and methods
+
 
 @dataclasses.dataclass
 class Skill_Node_Handle:
@@ -37,6 +59,34 @@ class Skill_Node_Handle:
     stSkillDataCommand_marker: ST_SkillData = dataclasses.field(
         default_factory=ST_SkillData
     )
+    # last read or written node data values, to detect unchanged nodes on read
+    # and client writes since last read (compare and write)
+    stSkillCommand_datavalue: ua.DataValue = None
+    stSkillDataCommand_datavalue: ua.DataValue = None
+    # last written snapshot structs
+    stSkillState_published: ST_SkillState = None
+    stSkillDataDefault_published: ST_SkillData = None
+    # number of struct node reads and reads skipped because node was unchanged
+    read_count: int = 0
+    read_skipped_count: int = 0
+    flat_nodes: dict[tuple, SyncNode] = dataclasses.field(default_factory=dict)
+    flat_values: dict[tuple, object] = dataclasses.field(default_factory=dict)
+    flat_datavalues: dict[tuple, ua.DataValue] = dataclasses.field(default_factory=dict)
+    # sequence number of last applied queued command
+    command_seq_node: SyncNode = None
+    command_seq_published: int = None
+
+
+@dataclasses.dataclass
+class Skill_Pool_Node_Handle:
+    """dataclass for storing opc ua node handles for each skill pool"""
+
+    pool_name: str
+    pool_node: SyncNode = None
+    utilisation_node: SyncNode = None
+    idle_replicas_node: SyncNode = None
+    utilisation_published: float = None
+    idle_replicas_published: int = None
 
 
 class SkillServer_OPCUA(SkillServer):
@@ -49,6 +99,10 @@ class SkillServer_OPCUA(SkillServer):
         hostname: str = "0.0.0.0",
         port: int = 4840,
         namespaceIndex: int = 2,
+        flat_nodes: bool = False,
+        fast_path: bool = False,
+        state_events: bool = False,
+        profiling: bool = False,
         logger: logging.Logger = None,
         **kwargs,
     ) -> None:
@@ -62,8 +116,15 @@ class SkillServer_OPCUA(SkillServer):
             hostname (str, optional): hostname like ip. Defaults to "0.0.0.0".
             port (int, optional): opc ua server port. Defaults to 4840.
             namespaceIndex (int, optional): opc ua namespace index for skill nodes. Defaults to 2.
+            flat_nodes (bool, optional): additionally expose each scalar field of stSkillCommand, stSkillState and each parameter of stSkillDataCommand as own variable node. Defaults to False.
+            fast_path (bool, optional): read and write skill node values directly in the server address space instead of asyncua.sync calls. Defaults to False.
+            state_events (bool, optional): emit opc ua events of type SkillStateTransitionEventType on every state transition and error of skills at skill folder and server object. Defaults to False.
+            profiling (bool, optional): add opc ua method Profile and node ProfileStats to skill folders and server folder, clients can profile cycles (see SkillServer.profile) and write pstats files to profile_dir. Defaults to False.
             logger (logging.Logger, optional): logger for logging. Defaults to None.
             **kwargs (): additional arguments for threading.Thread.__init__
+
+        Raises:
+            KeyError: if skills with identical skill names or skills or skill pools with reserved names (SERVER_FOLDER_NAME) detected.
         """
         super().__init__(
             skills=skills,
@@ -73,13 +134,41 @@ class SkillServer_OPCUA(SkillServer):
             logger=logger,
             **kwargs,
         )
+        # skill and pool folders share the namespace with the server folder
+        for name in list(self.skill_runtime_threads) + list(self.skill_pools):
+            if name == SERVER_FOLDER_NAME:
+                raise KeyError(
+                    f"Skill or skill pool name '{name}' is reserved for server nodes!"
+                )
         self.hostname = hostname
         self.port = port
         self.server_name = server_name
         self.server = Server()  # create opc ua server
-        self.skillNodeHandles = self._init_skill_node_handles(skills)
+        self.skillNodeHandles = self._init_skill_node_handles(
+            [
+                skill_runtime_thread.skill
+                for skill_runtime_thread in self.skill_runtime_threads.values()
+            ]
+        )
+        self.skillPoolNodeHandles: dict[str, Skill_Pool_Node_Handle] = {
+            pool_name: Skill_Pool_Node_Handle(pool_name=pool_name)
+            for pool_name in self.skill_pools
+        }
         # write_change_struct_markers
         self.namespaceIndex = namespaceIndex
+        self.flat_nodes = flat_nodes
+        self.fast_path = fast_path
+        self.address_space_access: AddressSpaceAccess = None
+        self.state_events = state_events
+        self.event_publisher: SkillEventPublisher = None
+        self.profiling = profiling
+        # ProfileStats nodes by skill name and server name
+        self.profile_stats_nodes: dict[str, SyncNode] = {}
+        # aggregated status of all skills
+        self.server_node: SyncNode = None
+        self.skill_status_node: SyncNode = None
+        self._skill_status_values: dict[str, tuple[ST_SkillStatus, object]] = {}
+        self._skill_status_variant = ua.Variant([], ua.VariantType.ExtensionObject)
 
     def _init_skill_node_handles(
         self, skills: list[BaseSkill]
@@ -115,6 +204,16 @@ class SkillServer_OPCUA(SkillServer):
         self.server.set_server_name(self.server_name)
         # start opc ua server
         self.server.start()
+        self.address_space_access = AddressSpaceAccess(self.server)
+        # record asyncua loop lag as spans
+        if self.tracer is not None:
+            self.tracer.probe_loop(self.server.tloop.loop)
+        # asyncua loop lag and connected clients as metrics
+        if self.metrics is not None:
+            self.metrics.probe_loop(self.server.tloop.loop)
+            self.metrics.session_count = lambda: len(
+                self.server.aio_obj.bserver.clients
+            )
         if self.logger:
             self.logger.info(
                 f"Started OPC UA Server '{self.server_name}' with endpoint 'opc.tcp://{self.hostname}:{self.port}'."
@@ -126,6 +225,12 @@ class SkillServer_OPCUA(SkillServer):
             OPCUA_Types=OPCUA_Types,
             logger=self.logger,
         )
+        register_skill_type_to_asyncua_server(
+            cls=ST_SkillStatus,
+            server=self.server,
+            OPCUA_Types=OPCUA_Types,
+            logger=self.logger,
+        )
         if self.logger:
             self.logger.info(
                 f"Registered skill types to OPC UA Server '{self.server_name}' with endpoint 'opc.tcp://{self.hostname}:{self.port}'."
@@ -135,11 +240,26 @@ class SkillServer_OPCUA(SkillServer):
             self._addSkill(skill_name=skill_name)
             if self.logger:
                 self.logger.info(f"Added skill '{skill_name}' to OPC UA Server.")
+        # emit state transition events
+        if self.state_events:
+            self.event_publisher = SkillEventPublisher(self.server, self.namespaceIndex)
+            for skill_name, skill_node_handle in self.skillNodeHandles.items():
+                self.event_publisher.add_skill(
+                    self.skill_runtime_threads[skill_name].skill,
+                    skill_node_handle.skill_node,
+                )
         # write skill data
         for skill_name in self.skill_runtime_threads:
             self.write_skill_data_force(
                 self.skill_runtime_threads[skill_name].skill, True
             )
+        # add skill pool nodes
+        for pool_name in self.skillPoolNodeHandles:
+            self._addSkillPool(pool_name=pool_name)
+        # add server level nodes
+        self._addServerNodes()
+        self.update_skill_status()
+        self._write_skill_status()
         if self.logger:
             self.logger.info(
                 f"Added skill nodes to OPC UA Server '{self.server_name}' with endpoint 'opc.tcp://{self.hostname}:{self.port}'."
@@ -147,12 +267,25 @@ class SkillServer_OPCUA(SkillServer):
         # call super method
         super().start_server()
         # wait 2 seconds for opc ua server backgroudn start up
-        time.sleep(2.0)
+        self.clock.sleep(2.0)
+
+    def server_cycle(self):
+        """server cycle, updates aggregated skill status node if status of any skill changed"""
+        super().server_cycle()
+        if self.update_skill_status():
+            self._write_skill_status()
+        for pool_name in self.skillPoolNodeHandles:
+            self._write_skill_pool(pool_name)
 
     def stop_server(self):
         """stop"""
         # call super method
         super().stop_server()
+        if self.logger:
+            for skill_name, skill_node_handle in self.skillNodeHandles.items():
+                self.logger.info(
+                    f"Skill '{skill_name}': skipped {skill_node_handle.read_skipped_count} of {skill_node_handle.read_count} unchanged node reads."
+                )
         # stop opc ua server
         self.server.stop()
         if self.logger:
@@ -200,6 +333,470 @@ class SkillServer_OPCUA(SkillServer):
             )
         )
         self.skillNodeHandles[skill_name].skill_DataCommand_node.set_writable()
+        # add command methods
+        self._addCommandMethods(skill_name=skill_name)
+        if self.profiling:
+            self._addProfileNodes(skill_node, skill_name, skill_name)
+        if self.skill_runtime_threads[skill_name].flight_recorder is not None:
+            skill_node.add_method(
+                ua.NodeId(skill_name + ".DumpFlightRecorder", self.namespaceIndex),
+                "DumpFlightRecorder",
+                self._dump_flight_recorder_method(skill_name),
+                [],
+                [_method_argument("Path", ua.VariantType.String, "file path of dump")],
+            )
+        # add flattened per-field nodes
+        if self.flat_nodes:
+            self._addFlatNodes(skill_name=skill_name)
+        # use direct address space access for skill nodes
+        if self.fast_path:
+            skill_node_handle = self.skillNodeHandles[skill_name]
+            skill_node_handle.skill_Command_node = self._fast_node(
+                skill_node_handle.skill_Command_node
+            )
+            skill_node_handle.skill_State_node = self._fast_node(
+                skill_node_handle.skill_State_node
+            )
+            skill_node_handle.skill_DataDefault_node = self._fast_node(
+                skill_node_handle.skill_DataDefault_node
+            )
+            skill_node_handle.skill_DataCommand_node = self._fast_node(
+                skill_node_handle.skill_DataCommand_node
+            )
+            skill_node_handle.command_seq_node = self._fast_node(
+                skill_node_handle.command_seq_node
+            )
+            for path, flat_node in skill_node_handle.flat_nodes.items():
+                skill_node_handle.flat_nodes[path] = self._fast_node(flat_node)
+
+    def _addServerNodes(self):
+        """add server level folder with aggregated status node of all skills and method GetSkillStatus"""
+        self.server_node = self.server.nodes.objects.add_folder(
+            ua.NodeId(SERVER_FOLDER_NAME, self.namespaceIndex),
+            SERVER_FOLDER_NAME,
+        )
+        self.skill_status_node = self._fast_node(
+            self.server_node.add_variable(
+                ua.NodeId(SERVER_FOLDER_NAME + ".astSkillStatus", self.namespaceIndex),
+                "astSkillStatus",
+                self._skill_status_variant,
+                datatype=ua.NodeId(ST_SkillStatus.__name__ + OPCUA_TYPE_SUFFIX, 2),
+            )
+        )
+        self.server_node.add_method(
+            ua.NodeId(SERVER_FOLDER_NAME + ".GetSkillStatus", self.namespaceIndex),
+            "GetSkillStatus",
+            lambda parent: [self._skill_status_variant],
+            [],
+            [
+                _method_argument(
+                    "astSkillStatus",
+                    ua.NodeId(ST_SkillStatus.__name__ + OPCUA_TYPE_SUFFIX, 2),
+                    "status of all skills",
+                    array=True,
+                )
+            ],
+        )
+        self.server_node.add_method(
+            ua.NodeId(SERVER_FOLDER_NAME + ".SubmitCommands", self.namespaceIndex),
+            "SubmitCommands",
+            self._submit_commands_method,
+            [
+                _method_argument(
+                    "SkillNames", ua.VariantType.String, "skill names", array=True
+                ),
+                _method_argument(
+                    "Commands",
+                    ua.VariantType.String,
+                    "state command names (e.g. 'Start') or empty",
+                    array=True,
+                ),
+                _method_argument(
+                    "Parameters",
+                    ua.VariantType.String,
+                    "parameter values as json object or empty, optional",
+                    array=True,
+                ),
+            ],
+            [
+                _method_argument(
+                    "Results",
+                    ua.VariantType.StatusCode,
+                    "result of each entry",
+                    array=True,
+                ),
+                _method_argument(
+                    "CommandSeqs",
+                    ua.VariantType.UInt32,
+                    "sequence number of queued command of each entry, 0 if not queued",
+                    array=True,
+                ),
+            ],
+        )
+        if self.profiling:
+            self._addProfileNodes(
+                self.server_node, SERVER_FOLDER_NAME, self.server_name
+            )
+        if self.tracer is not None:
+            self._addTraceMethods()
+
+    def _addProfileNodes(self, folder_node: SyncNode, prefix: str, target: str):
+        """add opc ua method Profile (see SkillServer.profile) and node ProfileStats with stats summary of last profiling to folder
+
+        Args:
+            folder_node (SyncNode): skill folder or server folder
+            prefix (str): node id prefix, skill name or server folder name
+            target (str): skill name or server name
+        """
+
+        def call(parent, duration: ua.Variant):
+            if not duration.Value or duration.Value <= 0.0:
+                return _method_error(ua.StatusCodes.BadInvalidArgument)
+            try:
+                request = self.profile(target, duration.Value)
+            except RuntimeError:
+                return _method_error(ua.StatusCodes.BadInvalidState)
+            return [ua.Variant(request.path, ua.VariantType.String)]
+
+        folder_node.add_method(
+            ua.NodeId(prefix + ".Profile", self.namespaceIndex),
+            "Profile",
+            call,
+            [
+                _method_argument(
+                    "Duration", ua.VariantType.Double, "profiling duration in seconds"
+                )
+            ],
+            [
+                _method_argument(
+                    "Path", ua.VariantType.String, "file path of pstats dump"
+                )
+            ],
+        )
+        self.profile_stats_nodes[target] = folder_node.add_variable(
+            ua.NodeId(prefix + ".ProfileStats", self.namespaceIndex),
+            "ProfileStats",
+            ua.Variant("", ua.VariantType.String),
+        )
+
+    def _dump_flight_recorder_method(self, skill_name: str):
+        """create opc ua method callback, dumping flight recorder of skill"""
+
+        def call(parent):
+            path = self.dump_flight_recorder(skill_name)
+            if path is None:
+                return _method_error(ua.StatusCodes.BadInternalError)
+            return [ua.Variant(path, ua.VariantType.String)]
+
+        return call
+
+    def profile_done(self, request: Profile_Request):
+        """write stats summary of done profiling request to its node ProfileStats
+
+        Args:
+            request (Profile_Request): done profiling request
+        """
+        super().profile_done(request)
+        if request.target in self.profile_stats_nodes:
+            self.profile_stats_nodes[request.target].write_value(
+                request.stats, ua.VariantType.String
+            )
+
+    def _addTraceMethods(self):
+        """add opc ua methods StartTrace and StopTrace to server folder, starting and stopping recording of tracer at runtime"""
+
+        def start_trace(parent):
+            self.tracer.start()
+            return []
+
+        def stop_trace(parent):
+            self.tracer.stop()
+            return [ua.Variant(self.tracer.dump(), ua.VariantType.String)]
+
+        self.server_node.add_method(
+            ua.NodeId(SERVER_FOLDER_NAME + ".StartTrace", self.namespaceIndex),
+            "StartTrace",
+            start_trace,
+            [],
+            [],
+        )
+        self.server_node.add_method(
+            ua.NodeId(SERVER_FOLDER_NAME + ".StopTrace", self.namespaceIndex),
+            "StopTrace",
+            stop_trace,
+            [],
+            [
+                _method_argument(
+                    "Path",
+                    ua.VariantType.String,
+                    "file path of recorded trace in Chrome trace event format",
+                )
+            ],
+        )
+
+    def _submit_commands_method(
+        self,
+        parent,
+        skill_names: ua.Variant,
+        commands: ua.Variant,
+        parameters: ua.Variant,
+    ):
+        """opc ua method callback of SubmitCommands, see SkillServer.submit_commands.
+        Commands are only queued, if all entries are valid.
+        """
+        skill_names = skill_names.Value or []
+        commands = commands.Value or []
+        parameters = parameters.Value or []
+        if len(commands) != len(skill_names) or len(parameters) not in (
+            0,
+            len(skill_names),
+        ):
+            return _method_error(ua.StatusCodes.BadInvalidArgument)
+        entries = []
+        results = []
+        for i, skill_name in enumerate(skill_names):
+            try:
+                command = state_command(commands[i])
+                entry_parameters = (
+                    json.loads(parameters[i]) if parameters and parameters[i] else None
+                )
+                if entry_parameters is not None:
+                    entry_parameters = {
+                        str(name): str(value)
+                        for name, value in entry_parameters.items()
+                    }
+            except (KeyError, ValueError, AttributeError):
+                command = ST_SkillCommand()
+                entry_parameters = None
+                results.append(ua.StatusCodes.BadInvalidArgument)
+            else:
+                results.append(ua.StatusCodes.Good)
+            entries.append((skill_name, command, entry_parameters))
+        for i, error in enumerate(self.check_commands(entries)):
+            if error is not None and results[i] == ua.StatusCodes.Good:
+                results[i] = _error_status_code(error)
+        seqs = [0] * len(entries)
+        if all(result == ua.StatusCodes.Good for result in results):
+            try:
+                seqs = self.submit_commands(entries)
+            except (KeyError, queue.Full) as e:
+                results = [_error_status_code(e)] * len(entries)
+        return [
+            ua.Variant(
+                [ua.StatusCode(result) for result in results],
+                ua.VariantType.StatusCode,
+            ),
+            ua.Variant(seqs, ua.VariantType.UInt32),
+        ]
+
+    def _addSkillPool(self, pool_name: str):
+        """add skill pool folder with method Dispatch and utilisation nodes"""
+        skill_pool = self.skill_pools[pool_name]
+        pool_node_handle = self.skillPoolNodeHandles[pool_name]
+        pool_node_handle.pool_node = self.server.nodes.objects.add_folder(
+            ua.NodeId(pool_name, self.namespaceIndex), pool_name
+        )
+        pool_node_handle.pool_node.add_method(
+            ua.NodeId(pool_name + ".Dispatch", self.namespaceIndex),
+            "Dispatch",
+            self._dispatch_method(skill_pool),
+            [
+                _method_argument(
+                    "Names", ua.VariantType.String, "parameter names", array=True
+                ),
+                _method_argument(
+                    "Values", ua.VariantType.String, "parameter values", array=True
+                ),
+            ],
+            [
+                _method_argument(
+                    "ReplicaName", ua.VariantType.String, "name of started replica"
+                ),
+                _method_argument(
+                    "CommandSeq",
+                    ua.VariantType.UInt32,
+                    "sequence number of start command",
+                ),
+            ],
+        )
+        pool_node_handle.utilisation_node = self._fast_node(
+            pool_node_handle.pool_node.add_variable(
+                ua.NodeId(pool_name + ".Utilisation", self.namespaceIndex),
+                "Utilisation",
+                ua.Variant(0.0, ua.VariantType.Double),
+            )
+        )
+        pool_node_handle.idle_replicas_node = self._fast_node(
+            pool_node_handle.pool_node.add_variable(
+                ua.NodeId(pool_name + ".IdleReplicas", self.namespaceIndex),
+                "IdleReplicas",
+                ua.Variant(0, ua.VariantType.UInt32),
+            )
+        )
+        self._write_skill_pool(pool_name)
+
+    def _dispatch_method(self, skill_pool: SkillPool):
+        """create opc ua method callback, starting idle replica of skill pool"""
+
+        def call(parent, names: ua.Variant, values: ua.Variant):
+            names = names.Value or []
+            values = values.Value or []
+            if len(names) != len(values):
+                return _method_error(ua.StatusCodes.BadInvalidArgument)
+            try:
+                replica_name, seq = skill_pool.dispatch(dict(zip(names, values)))
+            except (queue.Full, KeyError) as e:
+                return _method_error(_error_status_code(e))
+            return [
+                ua.Variant(replica_name, ua.VariantType.String),
+                ua.Variant(seq, ua.VariantType.UInt32),
+            ]
+
+        return call
+
+    def _write_skill_pool(self, pool_name: str):
+        """write utilisation and number of idle replicas of skill pool, if changed"""
+        skill_pool = self.skill_pools[pool_name]
+        pool_node_handle = self.skillPoolNodeHandles[pool_name]
+        utilisation = round(skill_pool.utilisation(), 3)
+        if utilisation != pool_node_handle.utilisation_published:
+            pool_node_handle.utilisation_node.write_value(
+                utilisation, ua.VariantType.Double
+            )
+            pool_node_handle.utilisation_published = utilisation
+        idle_replicas = skill_pool.idle_replicas()
+        if idle_replicas != pool_node_handle.idle_replicas_published:
+            pool_node_handle.idle_replicas_node.write_value(
+                idle_replicas, ua.VariantType.UInt32
+            )
+            pool_node_handle.idle_replicas_published = idle_replicas
+
+    def _write_skill_status(self):
+        """write aggregated status of all skills, unchanged status values are reused"""
+        for skill_name, status in self.skill_status.items():
+            # status records are replaced on change
+            written = self._skill_status_values.get(skill_name)
+            if written is None or written[0] is not status:
+                value = mapVar(status, OPCUA_Types[ST_SkillStatus]())
+                ENCODED_BYTES_CACHE.publish(value)
+                self._skill_status_values[skill_name] = (status, value)
+        self._skill_status_variant = ua.Variant(
+            [value for _, value in self._skill_status_values.values()],
+            ua.VariantType.ExtensionObject,
+        )
+        self.skill_status_node.write_value(self._skill_status_variant)
+
+    def _addCommandMethods(self, skill_name: str):
+        """add opc ua methods for queueing state commands and parameter values to skill folder.
+        Methods return the sequence number of the queued command, node 'CommandSeqApplied' shows the sequence number of the last applied command.
+        """
+        skill_node_handle = self.skillNodeHandles[skill_name]
+        skill = self.skill_runtime_threads[skill_name].skill
+        seq_argument = _method_argument(
+            "CommandSeq", ua.VariantType.UInt32, "sequence number of queued command"
+        )
+        for command_name in SKILL_COMMAND_METHODS:
+            skill_node_handle.skill_node.add_method(
+                ua.NodeId(skill_name + "." + command_name, self.namespaceIndex),
+                command_name,
+                self._command_method(skill, command_name),
+                [],
+                [seq_argument],
+            )
+        skill_node_handle.skill_node.add_method(
+            ua.NodeId(skill_name + ".SetParameters", self.namespaceIndex),
+            "SetParameters",
+            self._set_parameters_method(skill),
+            [
+                _method_argument(
+                    "Names", ua.VariantType.String, "parameter names", array=True
+                ),
+                _method_argument(
+                    "Values", ua.VariantType.String, "parameter values", array=True
+                ),
+            ],
+            [seq_argument],
+        )
+        skill_node_handle.command_seq_node = skill_node_handle.skill_node.add_variable(
+            ua.NodeId(skill_name + ".CommandSeqApplied", self.namespaceIndex),
+            "CommandSeqApplied",
+            ua.Variant(0, ua.VariantType.UInt32),
+        )
+
+    def _command_method(self, skill: BaseSkill, command_name: str):
+        """create opc ua method callback, queueing state command command_name for skill"""
+
+        def call(parent):
+            return self._post_command(skill, state_command(command_name))
+
+        return call
+
+    def _set_parameters_method(self, skill: BaseSkill):
+        """create opc ua method callback, queueing parameter values for skill"""
+
+        def call(parent, names: ua.Variant, values: ua.Variant):
+            if not names.Value or len(names.Value) != len(values.Value or []):
+                return _method_error(ua.StatusCodes.BadInvalidArgument)
+            return self._post_command(
+                skill, ST_SkillCommand(), dict(zip(names.Value, values.Value))
+            )
+
+        return call
+
+    def _post_command(
+        self,
+        skill: BaseSkill,
+        command: ST_SkillCommand,
+        parameters: dict[str, str] = None,
+    ):
+        """queue command of opc ua method call, returns method output arguments or error result"""
+        try:
+            seq = skill.data_exchange.post_command(command, parameters)
+        except (queue.Full, KeyError) as e:
+            return _method_error(_error_status_code(e))
+        return [ua.Variant(seq, ua.VariantType.UInt32)]
+
+    def _fast_node(self, node: SyncNode) -> SyncNode:
+        """wrap node for direct address space access, if fast_path is enabled
+
+        Args:
+            node (SyncNode): node of this server
+
+        Returns:
+            SyncNode: FastNode or node, if fast_path is disabled
+        """
+        if self.fast_path:
+            return FastNode(node, self.address_space_access)
+        return node
+
+    def _addFlatNodes(self, skill_name: str):
+        """add one variable node for each scalar field of stSkillCommand and stSkillState
+        and for each parameter value of stSkillDataCommand as child of the struct node.
+        """
+        skill_node_handle = self.skillNodeHandles[skill_name]
+        struct_nodes = {
+            "stSkillCommand": skill_node_handle.skill_Command_node,
+            "stSkillState": skill_node_handle.skill_State_node,
+            "stSkillDataCommand": skill_node_handle.skill_DataCommand_node,
+        }
+        data = self.skill_runtime_threads[skill_name].skill.data
+        for path, value in get_flat_fields(data, FLAT_NODE_STRUCTS):
+            if path[1] == "astParameters":
+                # name parameter nodes by parameter name instead of list index
+                browse_name = get_path_value(data, path[:3]).strName
+                node_name = ".".join([path[0], path[1], browse_name])
+            else:
+                browse_name = ".".join(path[1:])
+                node_name = ".".join(path)
+            flat_node = struct_nodes[path[0]].add_variable(
+                ua.NodeId(skill_name + "." + node_name, self.namespaceIndex),
+                browse_name,
+                ua.Variant(_flat_value(value), _flat_variant_type(value)),
+            )
+            if path[0] in FLAT_NODE_WRITABLE_STRUCTS:
+                flat_node.set_writable()
+            skill_node_handle.flat_nodes[path] = flat_node
+            skill_node_handle.flat_values[path] = _flat_value(value)
 
     def read_skill_data(self, skill: BaseSkill) -> None:
         """read skill data from opc ua server
@@ -209,20 +806,142 @@ class SkillServer_OPCUA(SkillServer):
         """
         skill_name = skill.data.stSkillDataDefault.strName
         skill_node_handle = self.skillNodeHandles[skill_name]
-        # stSkillCommand
-        d = skill_node_handle.skill_Command_node.read_value()
-        mapVar(d, skill.data.stSkillCommand)
-        # mark stSkillCommand
-        skill_node_handle.stSkillCommand_marker = copy.deepcopy(
-            skill.data.stSkillCommand
-        )
-        # stSkillDataCommand
-        d = skill_node_handle.skill_DataCommand_node.read_value()
-        mapVar(d, skill.data.stSkillDataCommand)
-        # mark stSkillDataCommand
-        skill_node_handle.stSkillDataCommand_marker = copy.deepcopy(
-            skill.data.stSkillDataCommand
-        )
+        # stSkillCommand, skip if node not written since last read/write,
+        # otherwise queue client command for skill runtime
+        dv = skill_node_handle.skill_Command_node.read_data_value()
+        skill_node_handle.read_count += 1
+        if dv is not skill_node_handle.stSkillCommand_datavalue:
+            command = mapVar(dv.Value.Value, ST_SkillCommand())
+            self._post_node_command(skill, command)
+            skill_node_handle.stSkillCommand_datavalue = dv
+            # mark stSkillCommand as written by client
+            skill_node_handle.stSkillCommand_marker = command
+        else:
+            skill_node_handle.read_skipped_count += 1
+        # stSkillDataCommand, skip mapping if node not written since last read/write
+        dv = skill_node_handle.skill_DataCommand_node.read_data_value()
+        skill_node_handle.read_count += 1
+        if dv is not skill_node_handle.stSkillDataCommand_datavalue:
+            mapVar(dv.Value.Value, skill.data.stSkillDataCommand)
+            skill_node_handle.stSkillDataCommand_datavalue = dv
+            # mark stSkillDataCommand
+            skill_node_handle.stSkillDataCommand_marker = copy.deepcopy(
+                skill.data.stSkillDataCommand
+            )
+        else:
+            skill_node_handle.read_skipped_count += 1
+        # flattened nodes, read after marking so changes are written back to struct nodes
+        if self.flat_nodes:
+            self._read_flat_nodes(skill, skill_node_handle)
+
+    def _post_node_command(self, skill: BaseSkill, command: ST_SkillCommand) -> None:
+        """queue command written to command nodes by client, log warning if command queue is full"""
+        try:
+            skill.data_exchange.post_command(command)
+        except queue.Full as e:
+            if self.logger:
+                self.logger.warning(
+                    f"Skill '{skill.data.stSkillDataDefault.strName}': command dropped, {e}"
+                )
+
+    def get_read_statistics(self) -> dict[str, tuple[int, int]]:
+        """get number of skipped (unchanged) and total struct node reads for each skill
+
+        Returns:
+            dict[str, tuple[int, int]]: skill name -> (skipped reads, total reads)
+        """
+        return {
+            skill_name: (
+                skill_node_handle.read_skipped_count,
+                skill_node_handle.read_count,
+            )
+            for skill_name, skill_node_handle in self.skillNodeHandles.items()
+        }
+
+    def _read_flat_nodes(
+        self, skill: BaseSkill, skill_node_handle: Skill_Node_Handle
+    ) -> None:
+        """apply client writes on flattened nodes to skill data
+
+        Args:
+            skill (BaseSkill): skill object
+            skill_node_handle (Skill_Node_Handle): node handle of skill
+        """
+        command = ST_SkillCommand()
+        command_written = False
+        for path, flat_node in skill_node_handle.flat_nodes.items():
+            if path[0] not in FLAT_NODE_WRITABLE_STRUCTS:
+                continue
+            dv = flat_node.read_data_value()
+            if dv is skill_node_handle.flat_datavalues.get(path):
+                continue
+            value = dv.Value.Value
+            skill_node_handle.flat_datavalues[path] = dv
+            skill_node_handle.flat_values[path] = value
+            if path[0] == "stSkillCommand":
+                # collect command flags, queued as one command
+                if value is True:
+                    set_path_value(command, path[1:], True)
+                    command_written = True
+            else:
+                set_path_value(skill.data, path, value)
+        if command_written:
+            self._post_node_command(skill, command)
+
+    def _write_flat_nodes(
+        self,
+        snapshot: SkillDataSnapshot,
+        skill_node_handle: Skill_Node_Handle,
+        force: bool = False,
+    ) -> None:
+        """write changed skill data fields to flattened nodes.
+        Writable nodes are only written, if not written by a client since last read.
+
+        Args:
+            snapshot (SkillDataSnapshot): skill data snapshot to write
+            skill_node_handle (Skill_Node_Handle): node handle of skill
+            force (bool, optional): write all flattened nodes. Defaults to False.
+        """
+        for path, flat_node in skill_node_handle.flat_nodes.items():
+            value = _flat_value(get_path_value(snapshot, path))
+            if not force and value == skill_node_handle.flat_values[path]:
+                continue
+            if path[0] in FLAT_NODE_WRITABLE_STRUCTS:
+                dv = self._write_if_unchanged(
+                    flat_node,
+                    value,
+                    _flat_variant_type(value),
+                    None if force else skill_node_handle.flat_datavalues.get(path),
+                )
+                if dv is None:
+                    continue
+                skill_node_handle.flat_datavalues[path] = dv
+            else:
+                flat_node.write_value(value, _flat_variant_type(value))
+            skill_node_handle.flat_values[path] = value
+
+    def _write_if_unchanged(
+        self,
+        node: SyncNode,
+        value,
+        varianttype: ua.VariantType,
+        expected: ua.DataValue = None,
+    ) -> ua.DataValue:
+        """write value to node, only if node was not written by a client since expected data value was read.
+
+        Args:
+            node (SyncNode): node to write
+            value (): value to write
+            varianttype (ua.VariantType): variant type of value
+            expected (ua.DataValue, optional): last read or written data value of node, None to write unconditionally. Defaults to None.
+
+        Returns:
+            ua.DataValue: written data value or None, if node was written by a client
+        """
+        dv = to_datavalue(value, varianttype)
+        if self.address_space_access.compare_and_write(node.nodeid, dv, expected):
+            return dv
+        return None
 
     def write_skill_data(self, skill: BaseSkill) -> None:
         """write skill data to opc ua server nodes
@@ -240,56 +959,93 @@ class SkillServer_OPCUA(SkillServer):
         """
         skill_name = skill.data.stSkillDataDefault.strName
         skill_node_handle = self.skillNodeHandles[skill_name]
-        # stSkillCommand, only if changed since last read_skill_data
+        # consistent skill data published by skill runtime
+        snapshot = skill.data_exchange.snapshot()
+        # written values are never mutated, their encoding is shared by all subscribed clients
+        # stSkillCommand, only if changed since last read_skill_data and not written by client since
+        if force or snapshot.stSkillCommand != skill_node_handle.stSkillCommand_marker:
+            d = OPCUA_Types[ST_SkillCommand]()
+            mapVar(snapshot.stSkillCommand, d)
+            ENCODED_BYTES_CACHE.publish(d)
+            dv = self._write_if_unchanged(
+                skill_node_handle.skill_Command_node,
+                d,
+                ua.VariantType.ExtensionObject,
+                None if force else skill_node_handle.stSkillCommand_datavalue,
+            )
+            if dv is not None:
+                skill_node_handle.stSkillCommand_datavalue = dv
+                skill_node_handle.stSkillCommand_marker = snapshot.stSkillCommand
+        # stSkillState, only if changed since last write
         if (
             force
-            or skill.data.stSkillCommand != skill_node_handle.stSkillCommand_marker
+            or snapshot.stSkillState is not skill_node_handle.stSkillState_published
         ):
-            d = OPCUA_Types[ST_SkillCommand]()
-            mapVar(skill.data.stSkillCommand, d)
-            skill_node_handle.skill_Command_node.write_value(
+            d = OPCUA_Types[ST_SkillState]()
+            mapVar(snapshot.stSkillState, d)
+            ENCODED_BYTES_CACHE.publish(d)
+            skill_node_handle.skill_State_node.write_value(
                 d, ua.VariantType.ExtensionObject
             )
-        # stSkillState
-        d = OPCUA_Types[ST_SkillState]()
-        mapVar(skill.data.stSkillState, d)
-        skill_node_handle.skill_State_node.write_value(
-            d, ua.VariantType.ExtensionObject
-        )
-        # stSkillDataDefault
-        d = OPCUA_Types[ST_SkillData]()
-        if skill.data.stSkillDataDefault.iParameterCount > 0:
-            d.astParameters = [
-                OPCUA_Types[ST_Parameter]()
-                for _ in range(skill.data.stSkillDataDefault.iParameterCount)
-            ]
-
-        mapVar(skill.data.stSkillDataDefault, d)
-        skill_node_handle.skill_DataDefault_node.write_value(
-            d, ua.VariantType.ExtensionObject
-        )
-        # stSkillDataCommand, only if changed since last read_skill_data
+            skill_node_handle.stSkillState_published = snapshot.stSkillState
+        # stSkillDataDefault, only if changed since last write
         if (
             force
-            or skill.data.stSkillDataCommand
-            != skill_node_handle.stSkillDataCommand_marker
+            or snapshot.stSkillDataDefault
+            is not skill_node_handle.stSkillDataDefault_published
         ):
             d = OPCUA_Types[ST_SkillData]()
-            if skill.data.stSkillDataDefault.iParameterCount > 0:
+            if snapshot.stSkillDataDefault.iParameterCount > 0:
                 d.astParameters = [
                     OPCUA_Types[ST_Parameter]()
-                    for _ in range(skill.data.stSkillDataDefault.iParameterCount)
+                    for _ in range(snapshot.stSkillDataDefault.iParameterCount)
                 ]
-            mapVar(skill.data.stSkillDataCommand, d)
-            skill_node_handle.skill_DataCommand_node.write_value(
+            mapVar(snapshot.stSkillDataDefault, d)
+            ENCODED_BYTES_CACHE.publish(d)
+            skill_node_handle.skill_DataDefault_node.write_value(
                 d, ua.VariantType.ExtensionObject
             )
+            skill_node_handle.stSkillDataDefault_published = snapshot.stSkillDataDefault
+        # stSkillDataCommand, only if changed since last read_skill_data and not written by client since
+        if (
+            force
+            or snapshot.stSkillDataCommand
+            != skill_node_handle.stSkillDataCommand_marker
+        ):
+            d = OPCUA_Types[ST_SkillData]()
+            if snapshot.stSkillDataDefault.iParameterCount > 0:
+                d.astParameters = [
+                    OPCUA_Types[ST_Parameter]()
+                    for _ in range(snapshot.stSkillDataDefault.iParameterCount)
+                ]
+            mapVar(snapshot.stSkillDataCommand, d)
+            ENCODED_BYTES_CACHE.publish(d)
+            dv = self._write_if_unchanged(
+                skill_node_handle.skill_DataCommand_node,
+                d,
+                ua.VariantType.ExtensionObject,
+                None if force else skill_node_handle.stSkillDataCommand_datavalue,
+            )
+            if dv is not None:
+                skill_node_handle.stSkillDataCommand_datavalue = dv
+                skill_node_handle.stSkillDataCommand_marker = (
+                    snapshot.stSkillDataCommand
+                )
+        # sequence number of last applied command, only if changed
+        if force or snapshot.command_seq != skill_node_handle.command_seq_published:
+            skill_node_handle.command_seq_node.write_value(
+                snapshot.command_seq, ua.VariantType.UInt32
+            )
+            skill_node_handle.command_seq_published = snapshot.command_seq
+        # flattened nodes, only changed fields
+        if self.flat_nodes:
+            self._write_flat_nodes(snapshot, skill_node_handle, force)
 
 
 def register_skill_type_to_asyncua_server(
     cls, server: Server, OPCUA_Types: dict, logger: logging.Logger = None
 ):
-    """register skill types to asyncua ua module
+    """register skill types to asyncua ua module, with precompiled binary encoders/decoders (opcua_codec)
 
     Args:
         server (Server): asyncua.sync.Server object
@@ -363,5 +1119,116 @@ def register_skill_type_to_asyncua_server(
 
     datatypes = server.load_data_type_definitions()
     OPCUA_Types[cls] = datatypes[cls.__name__ + OPCUA_TYPE_SUFFIX]
+    # precompiled binary encoder/decoder of registered type
+    register_skill_type_codecs([OPCUA_Types[cls]])
     if logger:
         logger.info(f"Registered {cls.__name__ + OPCUA_TYPE_SUFFIX} at opc ua server.")
+
+
+def _method_argument(
+    name: str,
+    datatype: ua.VariantType | ua.NodeId,
+    description: str,
+    array: bool = False,
+) -> ua.Argument:
+    """create opc ua method argument description
+
+    Args:
+        name (str): argument name
+        datatype (ua.VariantType | ua.NodeId): built in type or data type node id of argument
+        description (str): argument description
+        array (bool, optional): argument is one dimensional array. Defaults to False.
+
+    Returns:
+        ua.Argument: method argument
+    """
+    argument = ua.Argument()
+    argument.Name = name
+    if isinstance(datatype, ua.VariantType):
+        datatype = ua.NodeId(datatype.value)
+    argument.DataType = datatype
+    argument.ValueRank = 1 if array else -1
+    argument.ArrayDimensions = [0] if array else []
+    argument.Description = ua.LocalizedText(description)
+    return argument
+
+
+def _method_error(status_code: int) -> ua.CallMethodResult:
+    """create opc ua method call result with error status code"""
+    result = ua.CallMethodResult()
+    result.StatusCode = ua.StatusCode(status_code)
+    return result
+
+
+def _error_status_code(error: Exception) -> int:
+    """get opc ua status code of command queueing error"""
+    if isinstance(error, queue.Full):
+        return ua.StatusCodes.BadResourceUnavailable
+    return ua.StatusCodes.BadInvalidArgument
+
+
+def get_flat_fields(data, struct_names: list[str]) -> list[tuple[tuple, object]]:
+    """get paths and values of all scalar fields of skill data structs.
+    Lists (astParameters) are flattened to the strValue of each list element.
+
+    Args:
+        data (SkillDataHandle): skill data handle
+        struct_names (list[str]): names of skill data structs to flatten
+
+    Returns:
+        list[tuple[tuple, object]]: list of (path, value), path as tuple of attribute names and list indices
+    """
+    flat_fields = []
+
+    def _flatten(obj, path: tuple):
+        if isinstance(obj, list):
+            for idx, elem in enumerate(obj):
+                if hasattr(elem, "strValue"):
+                    flat_fields.append((path + (idx, "strValue"), elem.strValue))
+        elif dataclasses.is_dataclass(obj):
+            for field in dataclasses.fields(obj):
+                _flatten(getattr(obj, field.name), path + (field.name,))
+        elif isinstance(obj, (bool, int, str)):
+            flat_fields.append((path, obj))
+
+    for struct_name in struct_names:
+        struct = getattr(data, struct_name)
+        if struct_name == "stSkillDataCommand":
+            # only parameter values of data structs
+            _flatten(struct.astParameters, (struct_name, "astParameters"))
+        else:
+            _flatten(struct, (struct_name,))
+    return flat_fields
+
+
+def get_path_value(root, path: tuple):
+    """get value of attribute path (tuple of attribute names and list indices) from root object"""
+    obj = root
+    for key in path:
+        obj = obj[key] if isinstance(key, int) else getattr(obj, key)
+    return obj
+
+
+def set_path_value(root, path: tuple, value) -> None:
+    """set value of attribute path (tuple of attribute names and list indices) in root object"""
+    obj = get_path_value(root, path[:-1])
+    if isinstance(path[-1], int):
+        obj[path[-1]] = value
+    else:
+        setattr(obj, path[-1], value)
+
+
+def _flat_value(value):
+    """convert skill data value (e.g. IntEnum) to plain opc ua node value"""
+    if isinstance(value, bool) or isinstance(value, str):
+        return value
+    return int(value)
+
+
+def _flat_variant_type(value) -> ua.VariantType:
+    """get opc ua variant type of flattened node value, see register_skill_type_to_asyncua_server"""
+    if isinstance(value, bool):
+        return ua.VariantType.Boolean
+    if isinstance(value, str):
+        return ua.VariantType.String
+    return ua.VariantType.Int32
@@ -68,10 +68,10 @@ class SkillServer_OPCUA_VC(SkillServer_OPCUA):
             VC_NODE_SKILL_COMPLETE,
             False,
         )
-        self.skillNodeHandles_vc[skill_name].skill_statecomplete_node = (
+        skill_statecomplete_node_vc.set_writable(True)
+        self.skillNodeHandles_vc[skill_name].skill_statecomplete_node = self._fast_node(
             skill_statecomplete_node_vc
         )
-        skill_statecomplete_node_vc.set_writable(True)
         # vc skill state node
         skill_eActiveState_node_vc = skill_node_vc.add_variable(
             ua.NodeId(
@@ -81,7 +81,7 @@ class SkillServer_OPCUA_VC(SkillServer_OPCUA):
             VC_NODE_SKILL_STATE,
             0,
         )
-        self.skillNodeHandles_vc[skill_name].skill_eActiveState_node = (
+        self.skillNodeHandles_vc[skill_name].skill_eActiveState_node = self._fast_node(
             skill_eActiveState_node_vc
         )
 
@@ -0,0 +1,98 @@
+from sbc_statemachine.skilldatatypes import ST_SkillState
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+STATE_TABLE_FIELDS = [
+    ("eActiveState", "i4"),
+    ("eActiveMode", "i4"),
+    ("eActiveCommand", "i4"),
+    ("bError", "?"),
+    ("udiErrorID", "u4"),
+]  # stSkillState fields of state table
+STATE_TABLE_VERSION_FIELD = ("version", "u8")  # incremented before and after write
+
+
+class SkillStateTable:
+    """columnar table of the states of all skills (numpy structured array, one row per skill).
+    Rows are written by the skill runtimes in BaseSkill._set_SkillState, only if the state changed.
+    Each row has a version counter, odd while the row is written, so readers find changed rows with one vectorised comparison.
+    """
+
+    def __init__(self, skill_names: list[str]) -> None:
+        """columnar table of the states of all skills (numpy structured array, one row per skill).
+
+        Args:
+            skill_names (list[str]): names of skills, in row order
+
+        Raises:
+            ImportError: if numpy is not installed
+        """
+        if numpy is None:
+            raise ImportError("SkillStateTable requires numpy!")
+        self.skill_names = list(skill_names)
+        self.index = {skill_name: i for i, skill_name in enumerate(self.skill_names)}
+        self.rows = numpy.zeros(
+            len(self.skill_names),
+            dtype=STATE_TABLE_FIELDS + [STATE_TABLE_VERSION_FIELD],
+        )
+        self._read_versions = numpy.zeros(len(self.skill_names), dtype="u8")
+
+    def attach(self, skill) -> None:
+        """attach skill to its row, BaseSkill._set_SkillState writes the row from then on
+
+        Args:
+            skill (BaseSkill): skill with name in skill_names
+        """
+        skill.state_table_index = self.index[skill.data.stSkillDataDefault.strName]
+        skill.state_table = self
+        self.write(skill.state_table_index, skill.data.stSkillState)
+
+    def write(self, index: int, state: ST_SkillState) -> bool:
+        """write state to row, if changed. Call from skill runtime of row only.
+
+        Args:
+            index (int): row index of skill
+            state (ST_SkillState): state of skill
+
+        Returns:
+            bool: True, if row changed
+        """
+        row = self.rows[index].item()
+        values = tuple(getattr(state, name) for name, _ in STATE_TABLE_FIELDS)
+        if row[: len(STATE_TABLE_FIELDS)] == values and row[-1] > 0:
+            return False
+        version = row[-1]
+        self.rows["version"][index] = version + 1  # odd: writing
+        for (name, _), value in zip(STATE_TABLE_FIELDS, values):
+            self.rows[name][index] = value
+        self.rows["version"][index] = version + 2
+        return True
+
+    def changed_rows(self) -> tuple:
+        """get rows changed since last call, rows being written are returned with next call
+
+        Returns:
+            tuple[numpy.ndarray, numpy.ndarray]: row indices, copy of changed rows
+        """
+        rows = self.rows.copy()
+        versions = rows["version"]
+        changed = numpy.flatnonzero(
+            (versions != self._read_versions) & (versions % 2 == 0)
+        )
+        self._read_versions[changed] = versions[changed]
+        return changed, rows[changed]
+
+    def count(self, field: str, value) -> int:
+        """count skills with field equal value, e.g. count("eActiveState", ESkillStates.Execute)
+
+        Args:
+            field (str): field name, see STATE_TABLE_FIELDS
+            value (): field value
+
+        Returns:
+            int: number of skills
+        """
+        return int(numpy.count_nonzero(self.rows[field] == value))
@@ -0,0 +1,209 @@
+import json
+import time
+import asyncio
+import itertools
+import threading
+import contextlib
+
+# chrome trace process id of all spans
+TRACE_PID = 1
+
+
+class Tracer:
+    """records timeline spans of the runtime (skill cycle phases, server cycle, asyncua loop lag) into a preallocated ring buffer
+    and dumps them in Chrome trace event format (chrome://tracing, https://ui.perfetto.dev).
+    Recording is started and stopped at runtime (start, stop), the recording threads only check the flag enabled while stopped.
+    Spans are stored in fixed size lists indexed by an atomic counter, so recording takes no lock and allocates no containers.
+    If more spans than capacity are recorded, the oldest spans are overwritten.
+    """
+
+    def __init__(self, capacity: int = 65536, path: str = "sbc_trace.json") -> None:
+        """records timeline spans of the runtime into a preallocated ring buffer and dumps them in Chrome trace event format
+
+        Args:
+            capacity (int, optional): max number of recorded spans. Defaults to 65536.
+            path (str, optional): default file path of dump. Defaults to "sbc_trace.json".
+        """
+        self.capacity = capacity
+        self.path = path
+        self.enabled = False
+        self._names: list[str] = [""] * capacity
+        self._categories: list[str] = [""] * capacity
+        self._thread_ids: list[int] = [0] * capacity
+        self._starts: list[float] = [0.0] * capacity
+        self._ends: list[float] = [0.0] * capacity
+        self._thread_names: dict[int, str] = {}
+        self._count = itertools.count()
+        # number of recorded spans
+        self._recorded = 0
+        self._start_time = time.perf_counter()
+        # probed asyncio loop and probe interval, see probe_loop
+        self._probe_loop: asyncio.AbstractEventLoop = None
+        self._probe_interval = 0.01
+        self._probing = False
+
+    @staticmethod
+    def time() -> float:
+        """get time of spans, time.perf_counter
+
+        Returns:
+            float: time in seconds
+        """
+        return time.perf_counter()
+
+    def start(self) -> None:
+        """clear ring buffer and start recording"""
+        self.enabled = False
+        self._count = itertools.count()
+        self._recorded = 0
+        self._names[:] = [""] * self.capacity
+        self._thread_names.clear()
+        self._start_time = time.perf_counter()
+        self.enabled = True
+        if self._probe_loop is not None:
+            self._probe_loop.call_soon_threadsafe(self._start_probe)
+
+    def stop(self) -> None:
+        """stop recording, recorded spans are kept until next start"""
+        self.enabled = False
+
+    def record(self, name: str, category: str, start: float, end: float) -> None:
+        """record span of current thread, ignored if not enabled
+
+        Args:
+            name (str): span name, e.g. "run_skill:Execute"
+            category (str): span category, e.g. "skill"
+            start (float): start time, see time
+            end (float): end time, see time
+        """
+        if not self.enabled:
+            return
+        thread_id = threading.get_ident()
+        if thread_id not in self._thread_names:
+            self._thread_names[thread_id] = threading.current_thread().name
+        # next of itertools.count is atomic
+        count = next(self._count)
+        index = count % self.capacity
+        self._names[index] = name
+        self._categories[index] = category
+        self._thread_ids[index] = thread_id
+        self._starts[index] = start
+        self._ends[index] = end
+        self._recorded = max(self._recorded, count + 1)
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str):
+        """context recording a span of the enclosed code, if enabled
+
+        Args:
+            name (str): span name
+            category (str): span category
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, category, start, time.perf_counter())
+
+    def spans(self) -> list[tuple[str, str, int, float, float]]:
+        """get recorded spans, oldest first
+
+        Returns:
+            list[tuple[str, str, int, float, float]]: (name, category, thread id, start, end) of each span
+        """
+        count = self._recorded
+        first = max(count - self.capacity, 0)
+        spans = []
+        for i in range(first, count):
+            index = i % self.capacity
+            if not self._names[index]:
+                continue
+            spans.append(
+                (
+                    self._names[index],
+                    self._categories[index],
+                    self._thread_ids[index],
+                    self._starts[index],
+                    self._ends[index],
+                )
+            )
+        return spans
+
+    def trace_events(self) -> dict:
+        """get recorded spans in Chrome trace event format
+
+        Returns:
+            dict: trace with complete events ("ph": "X") in microseconds since start and thread name metadata events
+        """
+        events = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": TRACE_PID,
+                "tid": thread_id,
+                "args": {"name": thread_name},
+            }
+            for thread_id, thread_name in list(self._thread_names.items())
+        ]
+        for name, category, thread_id, start, end in self.spans():
+            events.append(
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "pid": TRACE_PID,
+                    "tid": thread_id,
+                    "ts": (start - self._start_time) * 1e6,
+                    "dur": (end - start) * 1e6,
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump(self, path: str = None) -> str:
+        """write recorded spans in Chrome trace event format to json file
+
+        Args:
+            path (str, optional): file path. Defaults to None (self.path).
+
+        Returns:
+            str: file path
+        """
+        path = path or self.path
+        with open(path, "w") as f:
+            json.dump(self.trace_events(), f)
+        return path
+
+    def probe_loop(
+        self, loop: asyncio.AbstractEventLoop, interval: float = 0.01
+    ) -> None:
+        """record lag of asyncio loop (e.g. asyncua loop) as spans "loop_lag" while enabled:
+        a callback is scheduled every interval, a span is recorded from its scheduled to its actual call time.
+        Probing stops while not enabled and is started again by start.
+
+        Args:
+            loop (asyncio.AbstractEventLoop): running loop
+            interval (float, optional): probe interval in seconds. Defaults to 0.01.
+        """
+        self._probe_loop = loop
+        self._probe_interval = interval
+        loop.call_soon_threadsafe(self._start_probe)
+
+    def _start_probe(self) -> None:
+        """start probing, if enabled and not probing yet. Called in probed loop."""
+        if self.enabled and not self._probing:
+            self._probing = True
+            self._probe(time.perf_counter())
+
+    def _probe(self, scheduled: float) -> None:
+        """record lag of probe call and schedule next probe, while enabled. Called in probed loop."""
+        if not self.enabled:
+            self._probing = False
+            return
+        now = time.perf_counter()
+        self.record("loop_lag", "asyncua", scheduled, now)
+        self._probe_loop.call_later(
+            self._probe_interval, self._probe, now + self._probe_interval
+        )
@@ -0,0 +1,104 @@
+import gc
+import time
+import threading
+import unittest
+from sbc_server.clock import VirtualClock
+from sbc_server.allocdiagnostics import AllocationDiagnostics, CYCLE_PHASES
+from sbc_server.skillruntimethread import SkillRuntimeThread
+from sbc_server.skillserver_opcua import SkillServer_OPCUA
+from sbc_server.tracer import Tracer
+from test_baseskill import BaseSkillImplementation
+from test_skillserver_opcua import TestSkill
+
+# max mean peak allocated bytes per cycle and phase in steady state (Idle, no client)
+ALLOCATION_BUDGET = {
+    "read_skill_data_extern": 64 * 1024,
+    "run_skill": 16 * 1024,
+    "write_skill_data_extern": 128 * 1024,
+}
+
+
+class TestAllocationDiagnostics(unittest.TestCase):
+
+    def test_gc_pauses(self):
+        diagnostics = AllocationDiagnostics()
+        diagnostics.start()
+        gc_pause = diagnostics.gc_monitor.total_pause
+        diagnostics.measure("TestSkill", "run_skill", lambda: [{} for _ in range(100)])
+        gc.collect()
+        diagnostics.end_cycle("TestSkill", 1.0, 0.5, gc_pause)
+        diagnostics.stop()
+        report = diagnostics.report()
+        self.assertGreater(
+            report["phases"]["TestSkill"]["run_skill"]["alloc_bytes_mean"], 0
+        )
+        self.assertGreaterEqual(report["gc"][2]["count"], 1)
+        self.assertEqual(report["overruns"]["TestSkill"]["overruns_with_gc"], 1)
+
+    def test_lock_wait(self):
+        diagnostics = AllocationDiagnostics()
+        diagnostics.start()
+        thread = threading.Thread(
+            target=diagnostics.measure, args=("Skill1", "run_skill", time.sleep, 0.2)
+        )
+        thread.start()
+        time.sleep(0.05)
+        diagnostics.measure("Skill2", "run_skill", lambda: None)
+        thread.join()
+        diagnostics.stop()
+        # waited for measured phase of other thread
+        self.assertGreater(diagnostics.lock_wait(), 0.1)
+
+    def test_traced(self):
+        # diagnosed cycles also record tracer spans
+        diagnostics = AllocationDiagnostics()
+        tracer = Tracer()
+        runtime = SkillRuntimeThread(
+            skill=BaseSkillImplementation("TestSkill"),
+            read_skill_data_extern=lambda skill: None,
+            write_skill_data_extern=lambda skill: None,
+            tracer=tracer,
+            alloc_diagnostics=diagnostics,
+        )
+        diagnostics.start()
+        tracer.start()
+        runtime.run_cycle_instrumented()
+        tracer.stop()
+        diagnostics.stop()
+        phases = diagnostics.report()["phases"]["TestSkill"]
+        for phase in CYCLE_PHASES:
+            self.assertEqual(phases[phase]["cycles"], 1)
+        names = [span[0] for span in tracer.spans()]
+        self.assertIn("read_skill_data_extern", names)
+        self.assertIn("write_skill_data_extern", names)
+        self.assertIn("cycle", names)
+
+    def test_allocation_budget(self):
+        diagnostics = AllocationDiagnostics()
+        skill_server = SkillServer_OPCUA(
+            [TestSkill()],
+            skill_cycletime=0.05,
+            port=4853,
+            alloc_diagnostics=diagnostics,
+            clock=VirtualClock(),
+        )
+        skill_server.start()
+        diagnostics.start()
+        # warm up caches (encoders, unchanged values)
+        skill_server.clock.sleep(1.0)
+        diagnostics.reset()
+        skill_server.clock.sleep(2.0)
+        diagnostics.stop()
+        skill_server.stop()
+        phases = diagnostics.report()["phases"]["SleepSkill"]
+        for phase in CYCLE_PHASES:
+            self.assertGreater(phases[phase]["cycles"], 0)
+            self.assertLess(
+                phases[phase]["alloc_bytes_mean"],
+                ALLOCATION_BUDGET[phase],
+                msg=f"Allocations of phase {phase} exceed budget",
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -161,3 +161,25 @@ class TestBaseSkillImplementation(unittest.TestCase):
         self.skill.data.stSkillCommand.stCommand_Mode.Offline = True
         self.skill.run_cycle()
         self.assertEqual(self.skill.mode, ESkillModes.Offline)
+
+    def test_observers(self):
+        self.skill = BaseSkillImplementation("TestSkill")
+        transitions = []
+        commands = []
+        self.skill.on_state_change(
+            lambda event: transitions.append((event.old_state, event.new_state))
+        )
+        self.skill.on_command(lambda event: commands.append(event.command))
+        self.skill.data.stSkillCommand.stCommand_State.Start = True
+        for _ in range(4):
+            self.skill.run_cycle()
+        self.assertEqual(
+            transitions,
+            [
+                (ESkillStates.Idle, ESkillStates.Starting),
+                (ESkillStates.Starting, ESkillStates.Execute),
+                (ESkillStates.Execute, ESkillStates.Completing),
+                (ESkillStates.Completing, ESkillStates.Completed),
+            ],
+        )
+        self.assertEqual(commands[0], ESkillCommands.Start)
@@ -0,0 +1,74 @@
+import time
+import threading
+import unittest
+from sbc_statemachine.skilldatatypes import ST_SkillCommand
+from sbc_statemachine.skillstatemachinetypes import ESkillStates
+from sbc_server.clock import VirtualClock
+from sbc_server.cycletimer import CycleTimer
+from sbc_server.skillserver import SkillServer
+from test_baseskill import BaseSkillImplementation
+
+
+class TestVirtualClock(unittest.TestCase):
+
+    def test_cycle_order(self):
+        clock = VirtualClock()
+        cycles = []
+
+        def run(name: str, cycletime: float):
+            cycle_timer = CycleTimer(
+                cycletime, use_cycletime_correction=False, epoch=0.0, clock=clock
+            )
+            for _ in range(4):
+                cycle_timer.start_cycle()
+                cycles.append((clock.time(), name))
+                cycle_timer.end_cycle()
+            clock.detach()
+
+        threads = [
+            threading.Thread(target=run, args=("fast", 0.1)),
+            threading.Thread(target=run, args=("slow", 0.25)),
+        ]
+        for thread in threads:
+            clock.attach(thread)
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # cycle start times are deterministic
+        self.assertEqual(
+            sorted((round(t, 6), name) for t, name in cycles),
+            [
+                (0.0, "fast"),
+                (0.0, "slow"),
+                (0.1, "fast"),
+                (0.2, "fast"),
+                (0.25, "slow"),
+                (0.3, "fast"),
+                (0.5, "slow"),
+                (0.75, "slow"),
+            ],
+        )
+
+    def test_skillserver(self):
+        clock = VirtualClock()
+        skill = BaseSkillImplementation("TestSkill")
+        skill_server = SkillServer(
+            [skill], skill_cycletime=0.5, clock=clock, aligned_cycles=True
+        )
+        t_start = time.perf_counter()
+        skill_server.start()
+        command = ST_SkillCommand()
+        command.stCommand_State.Start = True
+        (seq,) = skill_server.submit_commands([("TestSkill", command, None)])
+        clock.sleep(60.0)
+        snapshot = skill.data_exchange.snapshot()
+        self.assertEqual(snapshot.command_seq, seq)
+        self.assertEqual(snapshot.stSkillState.eActiveState, ESkillStates.Completed)
+        skill_server.stop()
+        self.assertGreaterEqual(clock.time(), 60.0)
+        self.assertLess(time.perf_counter() - t_start, 60.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
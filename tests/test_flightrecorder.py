@@ -0,0 +1,53 @@
+import os
+import json
+import tempfile
+import unittest
+from sbc_statemachine.skilldatatypes import ST_Parameter
+from sbc_statemachine.skillstatemachinetypes import ESkillStates
+from sbc_server.flightrecorder import FlightRecorder
+from sbc_server.skillrunner import SkillRunner
+from test_baseskill import BaseSkillImplementation
+
+
+class TestFlightRecorder(unittest.TestCase):
+
+    def test_record(self):
+        skill = BaseSkillImplementation("TestSkill")
+        skill.data.stSkillDataCommand.astParameters.append(
+            ST_Parameter(strName="Count", strValue="1")
+        )
+        runner = SkillRunner([skill])
+        with tempfile.TemporaryDirectory() as directory:
+            recorder = FlightRecorder(skill, capacity=4, dump_dir=directory)
+            runner.start("TestSkill")
+            for _ in range(6):
+                runner.step()
+                recorder.record()
+            # only last cycles kept
+            records = recorder.records()
+            self.assertEqual(len(records), 4)
+            self.assertEqual(recorder.count, 6)
+            self.assertTrue(all(record["command_seq"] == 1 for record in records))
+            self.assertTrue(all(not record["parameters"] for record in records))
+            skill.data.stSkillDataCommand.astParameters[0].strValue = "2"
+            recorder.record()
+            self.assertEqual(recorder.records()[-1]["parameters"], {"Count": "2"})
+            # dumped once on abort
+            runner.command("TestSkill", "Abort")
+            for _ in range(3):
+                runner.step()
+                recorder.record()
+            self.assertEqual(runner.state("TestSkill"), ESkillStates.Aborted)
+            self.assertEqual(len(os.listdir(directory)), 1)
+            # dump on demand
+            path = recorder.dump()
+            with open(path) as f:
+                dump = json.load(f)
+            self.assertEqual(dump["skill"], "TestSkill")
+            self.assertEqual(dump["reason"], "on demand")
+            self.assertEqual(dump["records"][-1]["state"], "Aborted")
+            self.assertEqual(len(os.listdir(directory)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
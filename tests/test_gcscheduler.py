@@ -0,0 +1,141 @@
+import gc
+import time
+import unittest
+from sbc_server.gcscheduler import GCScheduler
+from sbc_server.cycletimer import CycleTimer
+from sbc_server.skillserver import SkillServer
+from test_baseskill import BaseSkillImplementation
+
+
+class Garbage:
+    def __init__(self) -> None:
+        self.ref = self
+
+
+class TestGCScheduler(unittest.TestCase):
+
+    def tearDown(self):
+        gc.enable()
+        gc.unfreeze()
+
+    def test_start_stop(self):
+        thresholds = gc.get_threshold()
+        gc_scheduler = GCScheduler(thresholds=(100, 10, 10))
+        gc_scheduler.start()
+        self.assertFalse(gc.isenabled())
+        self.assertGreater(gc.get_freeze_count(), 0)
+        self.assertEqual(gc.get_threshold(), (100, 10, 10))
+        gc_scheduler.stop()
+        self.assertTrue(gc.isenabled())
+        self.assertEqual(gc.get_freeze_count(), 0)
+        self.assertEqual(gc.get_threshold(), thresholds)
+
+    def test_collect_in_slack(self):
+        gc_scheduler = GCScheduler(thresholds=(100, 10, 10), min_slack=(0.0, 0.0, 1.0))
+        gc_scheduler.start()
+        try:
+            garbage = [Garbage() for _ in range(200)]
+            del garbage
+            # no collection while other cycle is running
+            gc_scheduler.enter_cycle()
+            gc_scheduler.enter_cycle()
+            self.assertEqual(gc_scheduler.leave_cycle(0.01), 0.0)
+            self.assertEqual(gc_scheduler.deferred, 1)
+            # no collection without slack
+            gc_scheduler.min_slack = (0.005, 0.005, 1.0)
+            self.assertEqual(gc_scheduler.leave_cycle(0.001), 0.0)
+            self.assertEqual(gc_scheduler.idle_collections, [0, 0, 0])
+            gc_scheduler.enter_cycle()
+            self.assertGreater(gc_scheduler.leave_cycle(0.01), 0.0)
+            self.assertEqual(gc_scheduler.idle_collections[0], 1)
+            self.assertLessEqual(gc.get_count()[0], 100)
+        finally:
+            gc_scheduler.stop()
+        statistics = gc_scheduler.statistics()
+        self.assertEqual(statistics["pauses"][0]["count"], 1)
+        self.assertGreaterEqual(statistics["pauses"][0]["collected"], 200)
+
+    def test_forced_collection(self):
+        gc_scheduler = GCScheduler(thresholds=(100, 10, 10), force_factor=2)
+        gc_scheduler.start()
+        try:
+            garbage = [Garbage() for _ in range(300)]
+            del garbage
+            gc_scheduler.enter_cycle()
+            gc_scheduler.enter_cycle()
+            self.assertGreater(gc_scheduler.leave_cycle(0.0), 0.0)
+            self.assertEqual(gc_scheduler.forced_collections, 1)
+        finally:
+            gc_scheduler.stop()
+
+    def test_forced_collection_single_cycle(self):
+        gc_scheduler = GCScheduler(thresholds=(100, 10, 10), force_factor=2)
+        gc_scheduler.start()
+        try:
+            for _ in range(20):
+                gc_scheduler.enter_cycle()
+                garbage = [Garbage() for _ in range(300)]
+                del garbage
+                gc_scheduler.leave_cycle(0.0)
+            # no slack and no other cycle running
+            self.assertGreater(gc_scheduler.forced_collections, 0)
+            self.assertLessEqual(gc.get_count()[0], 2 * 100 + 300)
+        finally:
+            gc_scheduler.stop()
+
+    def test_cycletimer(self):
+        gc_scheduler = GCScheduler(thresholds=(100, 10, 10))
+        cycle_timer = CycleTimer(
+            cycletime=0.01, use_cycletime_correction=False, gc_scheduler=gc_scheduler
+        )
+        gc_scheduler.start()
+        try:
+            for _ in range(5):
+                cycle_timer.start_cycle()
+                garbage = [Garbage() for _ in range(200)]
+                del garbage
+                tsleep = cycle_timer.end_cycle()
+                self.assertLess(tsleep, 0.01)
+        finally:
+            gc_scheduler.stop()
+        self.assertEqual(gc_scheduler.idle_collections[0], 5)
+        self.assertEqual(gc_scheduler.forced_collections, 0)
+
+    def test_cycle_exception(self):
+        gc_scheduler = GCScheduler(thresholds=(100, 10, 10))
+        failing_timer = CycleTimer(cycletime=0.01, gc_scheduler=gc_scheduler)
+        cycle_timer = CycleTimer(
+            cycletime=0.01, use_cycletime_correction=False, gc_scheduler=gc_scheduler
+        )
+        gc_scheduler.start()
+        try:
+            try:
+                failing_timer.start_cycle()
+                raise RuntimeError("cycle failed")
+            except RuntimeError:
+                pass
+            finally:
+                failing_timer.cancel_cycle()
+            cycle_timer.start_cycle()
+            garbage = [Garbage() for _ in range(200)]
+            del garbage
+            cycle_timer.end_cycle()
+        finally:
+            gc_scheduler.stop()
+        # collection not deferred by cancelled cycle
+        self.assertEqual(gc_scheduler.idle_collections[0], 1)
+
+    def test_skillserver(self):
+        gc_scheduler = GCScheduler()
+        skill_server = SkillServer(
+            [BaseSkillImplementation("TestSkill")],
+            skill_cycletime=0.01,
+            gc_scheduler=gc_scheduler,
+        )
+        skill_server.start()
+        time.sleep(0.2)
+        self.assertTrue(gc_scheduler.enabled)
+        self.assertFalse(gc.isenabled())
+        skill_server.stop()
+        self.assertFalse(gc_scheduler.enabled)
+        self.assertTrue(gc.isenabled())
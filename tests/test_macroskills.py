@@ -0,0 +1,94 @@
+import unittest
+from sbc_statemachine.skilldatahandle import SkillDataHandle, ST_Parameter
+from sbc_statemachine.skilldatatypes import ST_SkillCommand
+from sbc_statemachine.skillstatemachinetypes import ESkillStates, EStateResult
+from sbc_server.baseskill import BaseSkill
+from sbc_server.macroskills import MacroSkill, MacroStep
+
+
+class EchoSkill(BaseSkill):
+    """copies parameter In to parameter Out"""
+
+    def __init__(self, skill_name: str):
+        data = SkillDataHandle(skillName=skill_name)
+        for name in ["In", "Out"]:
+            data.stSkillDataDefault.astParameters.append(
+                ST_Parameter(strName=name, strValue="")
+            )
+            data.stSkillDataDefault.iParameterCount += 1
+        data.reset_SkillDataCommand()
+        super().__init__(data=data)
+
+    def S02_Execute_Execute(self) -> EStateResult:
+        self.data.get_Parameter_byName("Out", False).strValue = (
+            self.data.get_Parameter_byName("In", False).strValue
+        )
+        return EStateResult.Done
+
+
+class TestMacroSkill(unittest.TestCase):
+
+    def test_sequence(self):
+        skill_a = EchoSkill("A")
+        skill_b = EchoSkill("B")
+        macro = MacroSkill(
+            "Macro",
+            steps=[
+                MacroStep([skill_a], {"A": {"In": "$Macro.X"}}),
+                MacroStep([skill_b], {"B": {"In": "$A.Out"}}),
+            ],
+            parameters=[
+                ST_Parameter(strName="X", strValue="42"),
+                ST_Parameter(strName="Y", strValue=""),
+            ],
+            outputs={"Y": "$B.Out"},
+        )
+        start = ST_SkillCommand()
+        start.stCommand_State.Start = True
+        macro.data_exchange.post_command(start)
+        for _ in range(50):
+            for skill in [macro, skill_a, skill_b]:
+                skill.run_cycle()
+            if macro.state == ESkillStates.Completed:
+                break
+        self.assertEqual(macro.state, ESkillStates.Completed)
+        self.assertEqual(macro.data.get_Parameter_byName("Y", False).strValue, "42")
+
+    def test_step_timeout(self):
+        skill_a = EchoSkill("A")
+        macro = MacroSkill("Macro", steps=[MacroStep([skill_a])], step_timeout=0.0)
+        start = ST_SkillCommand()
+        start.stCommand_State.Start = True
+        # child completed, not Idle
+        skill_a.data_exchange.post_command(start)
+        for _ in range(10):
+            skill_a.run_cycle()
+        self.assertEqual(skill_a.state, ESkillStates.Completed)
+        start = ST_SkillCommand()
+        start.stCommand_State.Start = True
+        macro.data_exchange.post_command(start)
+        for _ in range(10):
+            macro.run_cycle()
+        self.assertTrue(macro.data.stSkillState.bError)
+
+    def test_start_step_failed(self):
+        skill_a = EchoSkill("A")
+        skill_b = EchoSkill("B")
+        # link of B not resolvable, A already started
+        macro = MacroSkill(
+            "Macro",
+            steps=[MacroStep([skill_a, skill_b], {"B": {"In": "$Unknown.Out"}})],
+        )
+        start = ST_SkillCommand()
+        start.stCommand_State.Start = True
+        macro.data_exchange.post_command(start)
+        for _ in range(10):
+            macro.run_cycle()
+        self.assertTrue(macro.data.stSkillState.bError)
+        # Start and Stop queued for A only, B stays Idle
+        self.assertEqual(skill_a.data_exchange.pending_commands(), 2)
+        self.assertEqual(skill_b.data_exchange.pending_commands(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
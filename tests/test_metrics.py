@@ -0,0 +1,70 @@
+import time
+import unittest
+import urllib.request
+from sbc_statemachine.skilldatatypes import ST_SkillCommand
+from sbc_server.clock import VirtualClock
+from sbc_server.metrics import Histogram, MetricsExporter
+from sbc_server.skillserver import SkillServer
+from test_baseskill import BaseSkillImplementation
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_histogram(self):
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in [0.05, 0.1, 0.5, 2.0]:
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [2, 1, 1])
+        self.assertEqual(histogram.count, 4)
+        self.assertAlmostEqual(histogram.sum, 2.65)
+
+    def test_skillserver(self):
+        metrics = MetricsExporter(port=0)
+        skill = BaseSkillImplementation("TestSkill")
+        skill_server = SkillServer([skill], skill_cycletime=0.02, metrics=metrics)
+        skill_server.start()
+        command = ST_SkillCommand()
+        command.stCommand_State.Start = True
+        skill.data_exchange.post_command(command)
+        time.sleep(0.5)
+        with urllib.request.urlopen(
+            f"http://127.0.0.1:{metrics.port}/metrics"
+        ) as response:
+            text = response.read().decode("utf-8")
+        skill_server.stop()
+        self.assertIn(
+            'sbc_skill_cycle_duration_seconds_bucket{skill="TestSkill",le="+Inf"}',
+            text,
+        )
+        self.assertIn(
+            'sbc_skill_command_latency_seconds_count{skill="TestSkill"} 1', text
+        )
+        self.assertIn(
+            'sbc_skill_state_entries_total{skill="TestSkill",state="Starting"}', text
+        )
+        self.assertIn('sbc_skill_exceptions_total{skill="TestSkill"} 0', text)
+        # http server stopped with skill server
+        self.assertIsNone(metrics.http_server)
+
+    def test_virtual_clock_durations(self):
+        # execution durations are measured in real time, virtual time does not advance in a cycle
+        metrics = MetricsExporter(port=0)
+        skill = BaseSkillImplementation("TestSkill")
+        skill_server = SkillServer(
+            [skill], skill_cycletime=0.02, metrics=metrics, clock=VirtualClock()
+        )
+        skill_server.start()
+        skill_server.clock.sleep(0.5)
+        skill_server.stop()
+        skill_metrics = metrics.skills["TestSkill"]
+        for histogram in [
+            skill_metrics.cycle_duration,
+            skill_metrics.read_duration,
+            skill_metrics.write_duration,
+        ]:
+            self.assertGreater(histogram.count, 0)
+            self.assertGreater(histogram.sum, 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+from asyncua.common.utils import Buffer
+from asyncua.ua import ua_binary
+from sbc_server.skillserver_opcua import (
+    Server,
+    ST_Skill,
+    ST_SkillData,
+    ST_Parameter,
+    OPCUA_Types,
+    register_skill_type_to_asyncua_server,
+)
+from sbc_server import opcua_codec
+from sbc_server.opcua_codec import SERIALIZERS, DESERIALIZERS
+
+
+def generic_to_binary(obj) -> bytes:
+    """encode extension object with asyncua's generic dataclass serializer"""
+    serializer = opcua_codec._original_create_dataclass_serializer(type(obj))
+    type_id = ua_binary.nodeid_to_binary(
+        ua_binary.ua.extension_object_typeids[type(obj).__name__]
+    )
+    body = serializer(obj)
+    return b"".join(
+        (
+            type_id,
+            ua_binary.Primitives.Byte.pack(0x01),
+            ua_binary.Primitives.Bytes.pack(body),
+        )
+    )
+
+
+def test_opcua_codec():
+    server = Server()
+    server.set_endpoint("opc.tcp://0.0.0.0:4843")
+    server.start()
+    register_skill_type_to_asyncua_server(ST_Skill, server, OPCUA_Types)
+    assert OPCUA_Types[ST_SkillData] in SERIALIZERS
+    assert OPCUA_Types[ST_SkillData] in DESERIALIZERS
+    d = OPCUA_Types[ST_SkillData]()
+    d.strName = "CodecSkill"
+    d.iParameterCount = 2
+    d.astParameters = [
+        OPCUA_Types[ST_Parameter](strName="p1", strValue="1.0"),
+        OPCUA_Types[ST_Parameter](strName="p2", strValue=None),
+    ]
+    encoded = ua_binary.extensionobject_to_binary(d)
+    assert encoded == generic_to_binary(d)
+    assert ua_binary.extensionobject_from_binary(Buffer(encoded)) == d
+    # changed values of the same object are encoded again
+    d.strName = "ChangedSkill"
+    d.iParameterCount = 1
+    d.astParameters[0].strValue = "2.0"
+    decoded = ua_binary.extensionobject_from_binary(
+        Buffer(ua_binary.extensionobject_to_binary(d))
+    )
+    assert decoded == d
+    assert decoded.strName == "ChangedSkill"
+    assert decoded.astParameters[0].strValue == "2.0"
+    # encoding of published values is cached, not published values are encoded on every call
+    cache = opcua_codec.ENCODED_BYTES_CACHE
+    hits = cache.hits
+    ua_binary.extensionobject_to_binary(d)
+    assert cache.hits == hits
+    published = OPCUA_Types[ST_SkillData](strName="PublishedSkill")
+    cache.publish(published)
+    encoded = ua_binary.extensionobject_to_binary(published)
+    assert encoded == generic_to_binary(published)
+    assert ua_binary.extensionobject_to_binary(published) == encoded
+    assert cache.hits == hits + 1
+    server.stop()
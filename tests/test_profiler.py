@@ -0,0 +1,44 @@
+import os
+import time
+import tempfile
+import unittest
+from sbc_server.skillserver import SkillServer
+from test_baseskill import BaseSkillImplementation
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_profile(self):
+        with tempfile.TemporaryDirectory() as directory:
+            skill_server = SkillServer(
+                [BaseSkillImplementation("TestSkill")],
+                skill_cycletime=0.01,
+                profile_dir=directory,
+            )
+            skill_server.start()
+            skill_request = skill_server.profile("TestSkill", 0.2)
+            # one profile at a time
+            with self.assertRaises(RuntimeError):
+                skill_server.profile(skill_server.server_name, 0.2)
+            self.assertTrue(skill_request.done.wait(5.0))
+            with self.assertRaises(KeyError):
+                skill_server.profile("UnknownSkill", 0.2)
+            server_request = skill_server.profile(skill_server.server_name, 0.2)
+            self.assertTrue(server_request.done.wait(5.0))
+            time.sleep(0.1)
+            skill_server.stop()
+            # done requests removed by server cycle
+            self.assertEqual(skill_server.profile_requests, [])
+            self.assertIn("run_cycle", skill_request.stats)
+            self.assertIn("server_cycle", server_request.stats)
+            self.assertTrue(os.path.isfile(skill_request.path))
+            self.assertTrue(os.path.isfile(server_request.path))
+        # profiling done, not profiled anymore
+        self.assertIsNone(
+            skill_server.skill_runtime_threads["TestSkill"].profile_request
+        )
+        self.assertIsNone(skill_server.server_profile_request)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import time
+import unittest
+from functools import partial
+from sbc_statemachine.skilldatatypes import ST_SkillCommand
+from test_baseskill import BaseSkillImplementation, ESkillStates
+from sbc_server.proxyskill import SkillWorker
+
+
+class TestSkillWorker(unittest.TestCase):
+
+    def test_worker(self):
+        worker = SkillWorker(
+            [partial(BaseSkillImplementation, "WorkerSkill")], cycletime=0.05
+        )
+        worker.start()
+        proxy = worker.proxies["WorkerSkill"]
+        start = ST_SkillCommand()
+        start.stCommand_State.Start = True
+        proxy.data_exchange.post_command(start)
+        for _ in range(100):
+            proxy.run_cycle()
+            if proxy.data.stSkillState.eActiveState != ESkillStates.Idle:
+                break
+            time.sleep(0.05)
+        self.assertNotEqual(proxy.data.stSkillState.eActiveState, ESkillStates.Idle)
+        # crashed worker is restarted
+        worker.process.kill()
+        worker.process.join()
+        self.assertTrue(worker.check())
+        # restarted in background, check does not block
+        for _ in range(600):
+            if worker.is_alive():
+                break
+            time.sleep(0.05)
+        self.assertEqual(worker.restart_count, 1)
+        self.assertTrue(worker.is_alive())
+        # skill data of restarted worker taken in cycle of proxy
+        proxy.run_cycle()
+        self.assertIsNone(worker.take_restart("WorkerSkill"))
+        self.assertEqual(proxy.data_exchange.applied_seq, 1)
+        worker.stop()
+
+    def test_create_proxies(self):
+        worker = SkillWorker([partial(BaseSkillImplementation, "WorkerSkill")])
+        proxies = worker.create_proxies()
+        self.assertEqual(list(proxies), ["WorkerSkill"])
+        self.assertIsNone(worker.process)
+        # stop of not started worker
+        worker.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import queue
+import unittest
+from sbc_statemachine.skilldatatypes import ST_SkillCommand
+from sbc_statemachine.skillstatemachinetypes import ESkillStates
+from test_baseskill import BaseSkillImplementation
+
+
+class TestSkillDataExchange(unittest.TestCase):
+
+    def test_commands_applied_in_order(self):
+        skill = BaseSkillImplementation("TestSkill", init_state=ESkillStates.Idle)
+        start = ST_SkillCommand()
+        start.stCommand_State.Start = True
+        abort = ST_SkillCommand()
+        abort.stCommand_State.Abort = True
+        skill.data_exchange.post_command(start)
+        skill.data_exchange.post_command(abort)
+        self.assertEqual(skill.data_exchange.pending_commands(), 2)
+        skill.run_cycle()
+        self.assertEqual(skill.state, ESkillStates.Starting)
+        skill.run_cycle()
+        self.assertEqual(skill.state, ESkillStates.Aborting)
+        self.assertEqual(skill.data_exchange.pending_commands(), 0)
+
+    def test_snapshot(self):
+        skill = BaseSkillImplementation("TestSkill", init_state=ESkillStates.Idle)
+        first = skill.data_exchange.snapshot()
+        skill.run_cycle()
+        second = skill.data_exchange.snapshot()
+        self.assertGreater(second.seq, first.seq)
+        # unchanged structs are shared between snapshots
+        self.assertIs(second.stSkillDataDefault, first.stSkillDataDefault)
+        skill.data.stSkillCommand.stCommand_State.Start = True
+        skill.run_cycle()
+        third = skill.data_exchange.snapshot()
+        self.assertEqual(third.stSkillState.eActiveState, ESkillStates.Starting.value)
+        # published snapshots are not mutated by the skill runtime
+        self.assertEqual(second.stSkillState.eActiveState, ESkillStates.Idle.value)
+
+    def test_command_queue_bounded(self):
+        skill = BaseSkillImplementation("TestSkill", init_state=ESkillStates.Idle)
+        for seq in range(1, skill.data_exchange.maxsize + 1):
+            self.assertEqual(skill.data_exchange.post_command(ST_SkillCommand()), seq)
+        with self.assertRaises(queue.Full):
+            skill.data_exchange.post_command(ST_SkillCommand())
+        with self.assertRaises(KeyError):
+            skill.data_exchange.post_command(ST_SkillCommand(), {"Unknown": "1"})
+        skill.run_cycle()
+        self.assertEqual(skill.data_exchange.snapshot().command_seq, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
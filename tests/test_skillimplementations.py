@@ -0,0 +1,48 @@
+import json
+import unittest
+from sbc_statemachine.skilldatatypes import ST_SkillCommand
+from sbc_statemachine.skillstatemachinetypes import ESkillStates
+from sbc_server.skillimplementations import PythonFunctionBatchExecuteSkill
+
+
+def scale(value: float = 1.0, factor: float = 2.0) -> float:
+    """multiply value with factor"""
+    return value * factor
+
+
+class TestPythonFunctionBatchExecuteSkill(unittest.TestCase):
+
+    def test_batch(self):
+        skill = PythonFunctionBatchExecuteSkill(scale, max_workers=4)
+        skill.data.get_Parameter_byName("value", False).strValue = "[1, 2, 3]"
+        start = ST_SkillCommand()
+        start.stCommand_State.Start = True
+        skill.data_exchange.post_command(start)
+        for _ in range(100):
+            skill.run_cycle()
+            if skill.state == ESkillStates.Completed:
+                break
+        self.assertEqual(skill.state, ESkillStates.Completed)
+        self.assertEqual(
+            json.loads(skill.data.get_Parameter_byName("Return", False).strValue),
+            [2.0, 4.0, 6.0],
+        )
+        self.assertEqual(
+            skill.data.get_Parameter_byName("Progress", False).strValue, "100.0"
+        )
+
+    def test_shutdown(self):
+        skill = PythonFunctionBatchExecuteSkill(scale, max_workers=1)
+        executor = skill.executor
+        skill.shutdown()
+        self.assertIsNone(skill.executor)
+        with self.assertRaises(RuntimeError):
+            executor.submit(scale)
+        # passed executor is not shut down
+        skill = PythonFunctionBatchExecuteSkill(scale, executor=executor)
+        skill.shutdown()
+        self.assertIs(skill.executor, executor)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import queue
+import unittest
+from test_baseskill import BaseSkillImplementation, ESkillStates
+from sbc_server.skillpool import SkillPool
+from sbc_server.clock import VirtualClock
+
+
+class TestSkillPool(unittest.TestCase):
+
+    def test_dispatch(self):
+        skill_pool = SkillPool(
+            "PoolSkill", lambda: BaseSkillImplementation("PoolSkill"), replicas=2
+        )
+        skill_pool.clock = VirtualClock()
+        self.assertEqual(list(skill_pool.replicas), ["PoolSkill_1", "PoolSkill_2"])
+        self.assertEqual(skill_pool.dispatch()[0], "PoolSkill_1")
+        self.assertEqual(skill_pool.dispatch()[0], "PoolSkill_2")
+        with self.assertRaises(queue.Full):
+            skill_pool.dispatch()
+        for skill in skill_pool.skills:
+            skill.run_cycle()
+            self.assertEqual(skill.state, ESkillStates.Starting)
+        skill_pool.update()
+        self.assertEqual(skill_pool.idle_replicas(), 0)
+        # utilisation in clock time
+        skill_pool.clock.sleep(1.0)
+        skill_pool.update()
+        self.assertEqual(skill_pool.utilisation(), 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
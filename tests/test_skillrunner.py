@@ -0,0 +1,39 @@
+import unittest
+from sbc_statemachine.skillstatemachinetypes import ESkillStates
+from sbc_server.skillrunner import SkillRunner
+from test_baseskill import BaseSkillImplementation
+
+
+class TestSkillRunner(unittest.TestCase):
+
+    def test_run_until(self):
+        runner = SkillRunner([BaseSkillImplementation("TestSkill")])
+        runner.start("TestSkill")
+        self.assertEqual(runner.state("TestSkill"), ESkillStates.Idle)
+        runner.step()
+        self.assertEqual(runner.state("TestSkill"), ESkillStates.Starting)
+        cycles = runner.run_until("TestSkill", ESkillStates.Completed)
+        self.assertGreater(cycles, 0)
+        self.assertEqual(runner.cycle_count, cycles + 1)
+        with self.assertRaises(TimeoutError):
+            runner.run_until("TestSkill", ESkillStates.Execute, max_cycles=10)
+        with self.assertRaises(KeyError):
+            runner.start("UnknownSkill")
+        with self.assertRaises(KeyError):
+            runner.command("TestSkill", "UnknownCommand")
+
+    def test_execute(self):
+        runner = SkillRunner(
+            [
+                BaseSkillImplementation("TestSkill"),
+                BaseSkillImplementation("TestSkill2"),
+            ]
+        )
+        for _ in range(100):
+            self.assertEqual(runner.execute("TestSkill"), {})
+        self.assertEqual(runner.state("TestSkill"), ESkillStates.Idle)
+        self.assertEqual(runner.state("TestSkill2"), ESkillStates.Idle)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+from asyncua.sync import Client, ua
+from sbc_server.clock import VirtualClock
+from sbc_server.skillserver_opcua import SkillServer_OPCUA
+from sbc_server.skillserver_aggregator import SkillServer_Aggregator
+from test_skillserver_opcua import TestSkill, wait_for
+
+
+def test_skillserver_aggregator():
+    downstream_servers = [
+        SkillServer_OPCUA([TestSkill(name="SkillA")], port=4847, clock=VirtualClock()),
+        SkillServer_OPCUA([TestSkill(name="SkillB")], port=4848, clock=VirtualClock()),
+    ]
+    # start returns when servers run
+    for downstream_server in downstream_servers:
+        downstream_server.start()
+    aggregator = SkillServer_Aggregator(
+        ["opc.tcp://127.0.0.1:4847", "opc.tcp://127.0.0.1:4848"],
+        port=4854,
+        clock=VirtualClock(),
+    )
+    aggregator.start()
+    assert aggregator.get_skill_names() == ["SkillA", "SkillB"]
+    with Client("opc.tcp://127.0.0.1:4854") as client:
+        for skill_name, downstream_server in zip(
+            aggregator.get_skill_names(), downstream_servers
+        ):
+            # commands forwarded to downstream server
+            skill_node = client.get_node(ua.NodeId(skill_name, 2))
+            seq = skill_node.call_method(ua.NodeId(skill_name + ".Start", 2))
+            # state changes mirrored by subscription
+            applied_node = client.get_node(
+                ua.NodeId(skill_name + ".CommandSeqApplied", 2)
+            )
+            assert wait_for(
+                downstream_server.clock, lambda: applied_node.read_value() == seq
+            )
+    aggregator.stop()
+    for downstream_server in downstream_servers:
+        downstream_server.stop()
@@ -0,0 +1,50 @@
+import os
+import socket
+import tempfile
+import pytest
+from sbc_server.skillserver_ipc import (
+    EIPCMessage,
+    EIPCStatus,
+    SkillServer_IPC,
+    SkillClient_IPC,
+)
+from sbc_server.clock import VirtualClock
+from test_skillserver_opcua import TestSkill
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="no unix domain sockets")
+def test_skillserver_ipc():
+    socket_path = os.path.join(tempfile.gettempdir(), "test_skillserver_ipc.sock")
+    skill_server_IPC = SkillServer_IPC(
+        [TestSkill(), TestSkill(name="TestSkill2")],
+        socket_path=socket_path,
+        clock=VirtualClock(),
+    )
+    # start returns when server runs
+    skill_server_IPC.start()
+    with SkillClient_IPC(socket_path) as client:
+        assert client.skill_names == ["SleepSkill", "TestSkill2"]
+        seq = client.command("SleepSkill", "Reset")
+        assert client.command("SleepSkill", "", {"Count": "3"}) == seq + 1
+        with pytest.raises(KeyError):
+            client.command("SleepSkill", "", {"Unknown": "1"})
+        with pytest.raises(KeyError):
+            client.command("UnknownSkill", "Start")
+        skill_server_IPC.clock.sleep(5 * 0.5)
+        state = client.get_state("SleepSkill")
+        assert state.command_seq == seq + 1
+        assert not state.bError
+        assert client.get_parameters("SleepSkill") == {"Count": "3"}
+    skill_server_IPC.stop()
+    assert not os.path.exists(socket_path)
+
+
+def test_skillserver_ipc_not_encodable():
+    skill = TestSkill()
+    skill_server_IPC = SkillServer_IPC([skill], socket_path="unused.sock")
+    # udiErrorID out of range of unsigned payload field
+    skill.data.stSkillState.udiErrorID = -1
+    skill.data_exchange.publish(skill.data)
+    status, response = skill_server_IPC.handle_message(EIPCMessage.State, 0, b"")
+    assert status == EIPCStatus.InternalError
+    assert response == b""
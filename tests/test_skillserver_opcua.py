@@ -1,10 +1,16 @@
+import os
 import time
+import pytest
+from asyncua.sync import Client, ua
 from sbc_server.baseskill import BaseSkill
+from sbc_server.clock import VirtualClock
 from sbc_server.skillserver_opcua import (
     SkillServer_OPCUA,
     ST_Parameter,
+    SERVER_FOLDER_NAME,
 )
 from sbc_statemachine.skilldatahandle import SkillDataHandle
+from sbc_statemachine.skillstatemachinetypes import ESkillStates
 
 
 class TestSkill(BaseSkill):
@@ -18,6 +24,16 @@ class TestSkill(BaseSkill):
         super().__init__(data)
 
 
+def wait_for(clock: VirtualClock, condition, timeout: float = 10.0) -> bool:
+    """advance virtual time of server until condition is true, for at most timeout seconds of real time (e.g. subscriptions)"""
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        clock.sleep(0.5)
+    return True
+
+
 def test_skillserver_opcua():
     skill_server_OPCUA = SkillServer_OPCUA(
         [TestSkill(), TestSkill(name="TestSkill2")],
@@ -39,3 +55,188 @@ def test_skillserver_opcua():
     # wait
     time.sleep(1.0)
     skill_server_OPCUA.stop()
+
+
+def test_skillserver_opcua_flat_nodes():
+    skill_server_OPCUA = SkillServer_OPCUA(
+        [TestSkill()],
+        port=4842,
+        flat_nodes=True,
+        clock=VirtualClock(),
+    )
+    skill_server_OPCUA.start()
+    skillNodeHandle = skill_server_OPCUA.skillNodeHandles["SleepSkill"]
+    assert ("stSkillState", "eActiveState") in skillNodeHandle.flat_nodes
+    assert (
+        "stSkillCommand",
+        "stCommand_State",
+        "Start",
+    ) in skillNodeHandle.flat_nodes
+    assert (
+        "stSkillDataCommand",
+        "astParameters",
+        0,
+        "strValue",
+    ) in skillNodeHandle.flat_nodes
+    # write start command on flattened node
+    skillNodeHandle.flat_nodes[
+        ("stSkillCommand", "stCommand_State", "Start")
+    ].write_value(True)
+    skill_server_OPCUA.clock.sleep(5 * 0.5)
+    assert (
+        skillNodeHandle.flat_nodes[("stSkillState", "eActiveState")].read_value()
+        == skillNodeHandle.skill_State_node.read_value().eActiveState
+    )
+    assert (
+        skillNodeHandle.flat_nodes[
+            ("stSkillCommand", "stCommand_State", "Start")
+        ].read_value()
+        is False
+    )
+    skill_server_OPCUA.stop()
+
+
+def test_skillserver_opcua_command_methods():
+    skill_server_OPCUA = SkillServer_OPCUA(
+        [TestSkill()],
+        port=4844,
+        clock=VirtualClock(),
+    )
+    skill_server_OPCUA.start()
+    skill = skill_server_OPCUA.skill_runtime_threads["SleepSkill"].skill
+    with Client("opc.tcp://127.0.0.1:4844") as client:
+        skill_node = client.get_node(ua.NodeId("SleepSkill", 2))
+        seq = skill_node.call_method(
+            ua.NodeId("SleepSkill.SetParameters", 2),
+            ua.Variant(["Count"], ua.VariantType.String),
+            ua.Variant(["3"], ua.VariantType.String),
+        )
+        assert skill_node.call_method(ua.NodeId("SleepSkill.Start", 2)) == seq + 1
+        skill_server_OPCUA.clock.sleep(5 * 0.5)
+        assert (
+            client.get_node(ua.NodeId("SleepSkill.CommandSeqApplied", 2)).read_value()
+            == seq + 1
+        )
+    assert skill.data.get_Parameter_byName("Count", False).strValue == "3"
+    skill_server_OPCUA.stop()
+
+
+def test_skillserver_opcua_skill_status():
+    skill_server_OPCUA = SkillServer_OPCUA(
+        [TestSkill(), TestSkill(name="TestSkill2")],
+        port=4845,
+        clock=VirtualClock(),
+    )
+    skill_server_OPCUA.start()
+    with Client("opc.tcp://127.0.0.1:4845") as client:
+        client.load_data_type_definitions()
+        server_node = client.get_node(ua.NodeId("SkillServer", 2))
+        status = client.get_node(
+            ua.NodeId("SkillServer.astSkillStatus", 2)
+        ).read_value()
+        assert [s.strName for s in status] == ["SleepSkill", "TestSkill2"]
+        assert (
+            server_node.call_method(ua.NodeId("SkillServer.GetSkillStatus", 2))
+            == status
+        )
+    skill_server_OPCUA.stop()
+
+
+def test_skillserver_opcua_submit_commands():
+    skill_server_OPCUA = SkillServer_OPCUA(
+        [TestSkill(), TestSkill(name="TestSkill2")],
+        port=4846,
+        aligned_cycles=True,
+        clock=VirtualClock(),
+    )
+    skill_server_OPCUA.start()
+    skills = [
+        skill_server_OPCUA.skill_runtime_threads[skill_name].skill
+        for skill_name in ["SleepSkill", "TestSkill2"]
+    ]
+    with Client("opc.tcp://127.0.0.1:4846") as client:
+        server_node = client.get_node(ua.NodeId("SkillServer", 2))
+        # invalid entry, nothing queued
+        results, seqs = server_node.call_method(
+            ua.NodeId("SkillServer.SubmitCommands", 2),
+            ua.Variant(["SleepSkill", "UnknownSkill"], ua.VariantType.String),
+            ua.Variant(["Start", "Start"], ua.VariantType.String),
+            ua.Variant([], ua.VariantType.String),
+        )
+        assert results[0].is_good() and not results[1].is_good()
+        assert seqs == [0, 0]
+        results, seqs = server_node.call_method(
+            ua.NodeId("SkillServer.SubmitCommands", 2),
+            ua.Variant(["SleepSkill", "TestSkill2"], ua.VariantType.String),
+            ua.Variant(["Start", "Start"], ua.VariantType.String),
+            ua.Variant(['{"Count": 2}', ""], ua.VariantType.String),
+        )
+        assert all(result.is_good() for result in results)
+        assert seqs == [1, 1]
+    skill_server_OPCUA.clock.sleep(5 * 0.5)
+    assert skills[0].data.get_Parameter_byName("Count", False).strValue == "2"
+    assert all(skill.data_exchange.snapshot().command_seq == 1 for skill in skills)
+    skill_server_OPCUA.stop()
+
+
+class EventHandler:
+    def __init__(self):
+        self.events = []
+
+    def event_notification(self, event):
+        self.events.append(event)
+
+
+def test_skillserver_opcua_state_events():
+    skill_server_OPCUA = SkillServer_OPCUA(
+        [TestSkill()],
+        port=4851,
+        state_events=True,
+        clock=VirtualClock(),
+    )
+    skill_server_OPCUA.start()
+    with Client("opc.tcp://127.0.0.1:4851") as client:
+        event_type = client.nodes.base_event_type.get_child(
+            "2:SkillStateTransitionEventType"
+        )
+        handler = EventHandler()
+        subscription = client.create_subscription(50, handler)
+        subscription.subscribe_events(client.nodes.server, event_type)
+        skill_node = client.get_node(ua.NodeId("SleepSkill", 2))
+        skill_node.call_method(ua.NodeId("SleepSkill.Start", 2))
+        # events are delivered by subscription in real time
+        assert wait_for(skill_server_OPCUA.clock, lambda: handler.events)
+        subscription.delete()
+    assert handler.events
+    assert all(event.SourceName == "SleepSkill" for event in handler.events)
+    assert all(event.OldState != event.NewState for event in handler.events)
+    assert handler.events[0].NewState == ESkillStates.Starting
+    skill_server_OPCUA.stop()
+
+
+def test_skillserver_opcua_profile():
+    skill_server_OPCUA = SkillServer_OPCUA(
+        [TestSkill()],
+        port=4852,
+        profiling=True,
+        clock=VirtualClock(),
+    )
+    skill_server_OPCUA.start()
+    with Client("opc.tcp://127.0.0.1:4852") as client:
+        skill_node = client.get_node(ua.NodeId("SleepSkill", 2))
+        path = skill_node.call_method(
+            ua.NodeId("SleepSkill.Profile", 2),
+            ua.Variant(1.0, ua.VariantType.Double),
+        )
+        stats_node = client.get_node(ua.NodeId("SleepSkill.ProfileStats", 2))
+        assert wait_for(skill_server_OPCUA.clock, stats_node.read_value)
+        stats = stats_node.read_value()
+    assert "run_cycle" in stats
+    assert os.path.isfile(path)
+    os.remove(path)
+    skill_server_OPCUA.stop()
+
+
+def test_skillserver_opcua_reserved_name():
+    with pytest.raises(KeyError):
+        SkillServer_OPCUA([TestSkill(SERVER_FOLDER_NAME)])
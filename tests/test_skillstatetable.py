@@ -0,0 +1,36 @@
+import unittest
+from sbc_statemachine.skillstatemachinetypes import ESkillStates
+from sbc_server.skillstatetable import SkillStateTable, numpy
+from test_baseskill import BaseSkillImplementation
+
+
+@unittest.skipIf(numpy is None, "numpy not installed")
+class TestSkillStateTable(unittest.TestCase):
+
+    def test_changed_rows(self):
+        skills = [
+            BaseSkillImplementation(f"TestSkill_{i}", init_state=ESkillStates.Idle)
+            for i in range(3)
+        ]
+        table = SkillStateTable(
+            [skill.data.stSkillDataDefault.strName for skill in skills]
+        )
+        for skill in skills:
+            table.attach(skill)
+        indices, _ = table.changed_rows()
+        self.assertEqual(list(indices), [0, 1, 2])
+        # unchanged state does not change rows
+        for skill in skills:
+            skill.run_cycle()
+        indices, _ = table.changed_rows()
+        self.assertEqual(len(indices), 0)
+        skills[1].data.stSkillCommand.stCommand_State.Start = True
+        skills[1].run_cycle()
+        indices, rows = table.changed_rows()
+        self.assertEqual(list(indices), [1])
+        self.assertEqual(rows["eActiveState"][0], ESkillStates.Starting.value)
+        self.assertEqual(table.count("eActiveState", ESkillStates.Idle.value), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
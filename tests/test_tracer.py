@@ -0,0 +1,84 @@
+import os
+import json
+import time
+import asyncio
+import threading
+import tempfile
+import unittest
+from sbc_server.tracer import Tracer
+from sbc_server.skillserver import SkillServer
+from test_baseskill import BaseSkillImplementation
+
+
+class TestTracer(unittest.TestCase):
+
+    def test_ring_buffer(self):
+        tracer = Tracer(capacity=4)
+        tracer.record("ignored", "test", 0.0, 1.0)
+        tracer.start()
+        for i in range(6):
+            tracer.record(f"span{i}", "test", float(i), i + 0.5)
+        tracer.stop()
+        tracer.record("ignored", "test", 0.0, 1.0)
+        # oldest spans overwritten
+        self.assertEqual(
+            [span[0] for span in tracer.spans()], ["span2", "span3", "span4", "span5"]
+        )
+        tracer.start()
+        self.assertEqual(tracer.spans(), [])
+
+    def test_probe_loop(self):
+        tracer = Tracer()
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        try:
+            tracer.probe_loop(loop, interval=0.001)
+            time.sleep(0.05)
+            self.assertEqual(tracer.spans(), [])
+            tracer.start()
+            time.sleep(0.05)
+            tracer.stop()
+            count = len(tracer.spans())
+            self.assertGreater(count, 0)
+            # probe not rescheduled while not recording
+            time.sleep(0.05)
+            self.assertEqual(len(tracer.spans()), count)
+            self.assertFalse(tracer._probing)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    def test_skillserver(self):
+        tracer = Tracer()
+        skill_server = SkillServer(
+            [BaseSkillImplementation("TestSkill")],
+            skill_cycletime=0.01,
+            tracer=tracer,
+        )
+        skill_server.start()
+        tracer.start()
+        time.sleep(0.2)
+        tracer.stop()
+        skill_server.stop()
+        names = {span[0] for span in tracer.spans()}
+        self.assertIn("server_cycle", names)
+        self.assertIn("cycle", names)
+        self.assertTrue(any(name.startswith("run_skill:") for name in names))
+        with tempfile.TemporaryDirectory() as directory:
+            path = tracer.dump(os.path.join(directory, "trace.json"))
+            with open(path) as f:
+                trace = json.load(f)
+        thread_names = [
+            event["args"]["name"]
+            for event in trace["traceEvents"]
+            if event["ph"] == "M"
+        ]
+        self.assertIn("TestSkill_RuntimeThread", thread_names)
+        spans = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+        self.assertTrue(all(span["dur"] >= 0.0 for span in spans))
+
+
+if __name__ == "__main__":
+    unittest.main()